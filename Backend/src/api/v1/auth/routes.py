@@ -5,13 +5,13 @@
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request
-from passlib.context import CryptContext
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.config.logger import configure_logger
 from src.domain.models import User
 from src.repository.base import update_item, get_item
 from src.repository.user import get_user_by_username
+from src.security.passwords import verify_password
 from src.security.security import create_access_token, create_refresh_token, verify_token, authenticated
 from src.database.db import get_db
 from .schemas import LoginSchema, TokenSchema, UserReadSchema
@@ -19,8 +19,6 @@ from .schemas import LoginSchema, TokenSchema, UserReadSchema
 router = APIRouter()
 logger = configure_logger()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 @router.post("/login", response_model=TokenSchema, status_code=status.HTTP_200_OK)
 async def login(
     credentials: LoginSchema,
@@ -33,9 +31,10 @@ async def login(
         * 401 ― неверные учётные данные.
         * 403 ― пользователь неактивен.
     """
-    logger.debug(f"Attempting login with credentials: {credentials.model_dump()}")
+    logger.debug(f"Attempting login for user {credentials.username}")
     user = await get_user_by_username(session, credentials.username.strip())  # Обрезаем пробелы
-    if not pwd_context.verify(credentials.password, user.password):
+    password_ok, new_hash = await verify_password(credentials.password, user.password)
+    if not password_ok:
         logger.debug(f"Login failed: invalid password for user {credentials.username}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -51,9 +50,13 @@ async def login(
     access_token = create_access_token({"sub": str(user.id), "role": user.role})
     refresh_token = create_refresh_token({"sub": str(user.id), "role": user.role})
     user.refresh_token = refresh_token
-    await update_item(session, User, user.id, refresh_token=refresh_token)
-    logger.info(f"Пользователь {user.username} авторизовался, token: {access_token}")
-    logger.debug(f"Login successful, returning token: {access_token}")
+    update_kwargs = {"refresh_token": refresh_token}
+    if new_hash is not None:
+        # Стоимость bcrypt изменилась — сохраняем пароль с новым хешем
+        logger.info(f"Rehashing password for user {user.username}")
+        update_kwargs["password"] = new_hash
+    await update_item(session, User, user.id, **update_kwargs)
+    logger.info(f"Пользователь {user.username} авторизовался")
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 @router.post("/refresh", response_model=TokenSchema, status_code=status.HTTP_200_OK)
@@ -77,7 +80,7 @@ async def refresh_token(
         )
 
     refresh_token = auth.split(" ", 1)[1]
-    logger.debug(f"Attempting to refresh token with: {refresh_token}")
+    logger.debug("Attempting to refresh token")
     try:
         payload = verify_token(refresh_token, "refresh")
         user_id = payload.get("sub")
@@ -116,8 +119,7 @@ async def read_current_user(
     """
     Возвращает данные текущего пользователя.
     """
-    logger.debug(f"Request to /me with headers: {dict(request.headers)}")
-    logger.info(f"Request to /me, headers: {dict(request.headers)}")
+    logger.debug(f"Request to /me for user {claims['sub']}")
     user = await get_item(session, User, int(claims["sub"]))  # Преобразуем sub в int
     logger.debug(f"Retrieved user data: {user.username}")
     return user
\ No newline at end of file
@@ -0,0 +1,69 @@
+# TestWise/Backend/src/api/v1/caching.py
+# -*- coding: utf-8 -*-
+"""
+ETag / ``If-None-Match`` для редко меняющихся GET-эндпоинтов.
+
+``cached_json`` строит сильный ETag из ключа ресурса и текущих версий его
+областей (см. ``src.cache.store``):
+
+* ETag совпал с ``If-None-Match`` — ``304`` без обращения к БД;
+* тело с такими версиями есть в LRU — ``200`` из кэша, тоже без БД;
+* иначе ответ строится обработчиком и кладётся в LRU.
+
+``Cache-Control: private, no-cache`` — браузер хранит ответ, но каждый раз
+переспрашивает сервер (и получает дешёвый 304).
+"""
+
+import hashlib
+from typing import Any, Awaitable, Callable, Hashable, Sequence
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from src.cache.store import record, responses, scope_name, versions
+from src.config.settings import settings
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(key: Hashable, scopes: Sequence[str], current: Sequence[int]) -> str:
+    raw = repr((versions.epoch, key, tuple(zip(scopes, current)))).encode()
+    return f'"{hashlib.sha256(raw).hexdigest()[:32]}"'
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    """Слабое сравнение ``If-None-Match`` (RFC 9110, 13.1.2)."""
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or etag in (tag.removeprefix("W/") for tag in candidates)
+
+
+async def cached_json(
+    request: Request,
+    key: Hashable,
+    scopes: Sequence[Any],
+    build: Callable[[], Awaitable[Any]],
+) -> Any:
+    """Отдаёт результат ``build()`` с ETag, 304 и кэшированием тела по версиям ``scopes``."""
+    if not settings.cache_enabled:
+        return await build()
+
+    names = [scope_name(scope) for scope in scopes]
+    current = versions.get(names)
+    etag = make_etag(key, names, current)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        record("not_modified")
+        return Response(status_code=304, headers=headers)
+
+    entry = (key, tuple(names), current)
+    body = responses.get(entry)
+    if body is None:
+        record("misses")
+        body = JSONResponse(content=jsonable_encoder(await build())).body
+        responses.put(entry, body)
+    else:
+        record("hits")
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -11,18 +11,29 @@ from __future__ import annotations
 from typing import List
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, Query, Response, status, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.api.v1.pagination import PageParams, page_params, set_page_headers
 from src.config.logger import configure_logger
 from src.database.db import get_db
-from src.domain.models import Group, GroupStudents, GroupTeachers
-from src.repository.base import update_item, archive_item, delete_item_permanently, get_item
-from src.repository.group import create_group, update_student_status, add_student_to_group
+from src.domain.models import Group, GroupStudents, GroupTeachers, Topic
+from src.repository.base import update_item, archive_item, delete_item_permanently, get_item, list_items_page
+from src.repository.group import (
+    ADDED,
+    RESTORED,
+    UNCHANGED,
+    add_members_bulk,
+    create_group,
+    update_student_status,
+)
 from src.security.security import admin_only, admin_or_teacher, authenticated
+from src.service.export import ExportFormat, group_progress_export, load_topic_sections
 from .schemas import (
     GroupCreateSchema,
+    GroupMembershipBulkRead,
     GroupReadSchema,
     GroupStudentCreate,
     GroupStudentRead,
@@ -42,10 +53,15 @@ logger = configure_logger()
 
 @router.get("", response_model=List[GroupReadSchema])
 async def list_groups_endpoint(
+    response: Response,
+    params: PageParams = Depends(page_params),
     session: AsyncSession = Depends(get_db),
     _claims: dict = Depends(admin_or_teacher),
 ):
-    """Возвращает список групп.
+    """Возвращает список групп (постранично, по id).
+
+    Args:
+        params (PageParams): ``limit`` / ``after`` / ``with_total``.
 
     Returns:
         List[GroupReadSchema]: Список групп.
@@ -54,9 +70,11 @@ async def list_groups_endpoint(
         HTTPException: Если доступ запрещен (403).
     """
     logger.debug("Listing all groups")
-    stmt = select(Group).where(Group.is_archived == False)
-    res = await session.execute(stmt)
-    groups = res.scalars().all()
+    page = await list_items_page(
+        session, Group, limit=params.limit, after=params.after, with_total=params.with_total, is_archived=False
+    )
+    set_page_headers(response, page)
+    groups = page.items
     logger.debug(f"Retrieved {len(groups)} groups")
     return [
         GroupReadSchema.model_validate({
@@ -255,7 +273,7 @@ async def create_group_endpoint(
     Raises:
         HTTPException: Если данные некорректны (400).
     """
-    logger.debug(f"Creating group with data: {group_data.model_dump()}")
+    logger.debug("Creating group {}", group_data.name)
     group = await create_group(
         session,
         name=group_data.name,
@@ -290,19 +308,44 @@ async def add_students_endpoint(
         payload (GroupStudentCreate): Список ID студентов.
             - user_ids (List[int]): Список ID пользователей (обязательно, минимум 1).
 
+    Все ID проверяются одним запросом и добавляются одной транзакцией; при
+    любом неподходящем ID ничего не записывается. Итог по каждому ID —
+    в ``POST /{group_id}/students/bulk``.
+
     Returns:
-        List[GroupStudentRead]: Список добавленных связей студентов.
+        List[GroupStudentRead]: Связи запрошенных студентов с группой.
 
     Raises:
-        HTTPException: Если группа или студенты не найдены (404).
+        HTTPException: Если группа или студенты не найдены (404),
+            пользователь не студент (422).
     """
-    logger.debug(f"Adding students to group {group_id} with payload: {payload.model_dump()}")
-    students: List[GroupStudentRead] = []
-    for user_id in payload.user_ids:
-        gs = await add_student_to_group(session, user_id, group_id)
-        students.append(GroupStudentRead.model_validate(gs))
-    logger.debug(f"Added {len(students)} students to group {group_id}")
-    return students
+    logger.debug("Adding {} students to group {}", len(payload.user_ids), group_id)
+    await add_members_bulk(session, group_id, payload.user_ids, strict=True)
+    links = await _membership_links(session, GroupStudents, group_id, payload.user_ids)
+    logger.debug(f"Added {len(links)} students to group {group_id}")
+    return [GroupStudentRead.model_validate(link) for link in links]
+
+@router.post("/{group_id}/students/bulk", response_model=GroupMembershipBulkRead)
+async def add_students_bulk_endpoint(
+    group_id: int,
+    payload: GroupStudentCreate,
+    session: AsyncSession = Depends(get_db),
+    _claims: dict = Depends(admin_or_teacher),
+):
+    """Массово зачисляет студентов: подходящие ID добавляются, остальные отклоняются.
+
+    Args:
+        group_id (int): ID группы.
+        payload (GroupStudentCreate): Список ID студентов.
+
+    Returns:
+        GroupMembershipBulkRead: Итог по каждому ID (added/restored/unchanged/not_found/wrong_role).
+
+    Raises:
+        NotFoundError: Если группа не найдена (404).
+    """
+    results = await add_members_bulk(session, group_id, payload.user_ids)
+    return _bulk_summary(group_id, results)
 
 @router.post("/{group_id}/teachers", response_model=List[GroupTeacherRead])
 async def add_teachers_endpoint(
@@ -319,23 +362,48 @@ async def add_teachers_endpoint(
             - user_ids (List[int]): Список ID пользователей (обязательно, минимум 1).
 
     Returns:
-        List[GroupTeacherRead]: Список назначенных учителей.
+        List[GroupTeacherRead]: Связи запрошенных учителей с группой.
 
     Raises:
-        HTTPException: Если группа или учителя не найдены (404).
+        HTTPException: Если группа или учителя не найдены (404),
+            пользователь не учитель и не админ (422).
     """
-    logger.debug(f"Adding teachers to group {group_id} with payload: {payload.model_dump()}")
-    teachers: List[GroupTeacherRead] = []
-    for user_id in payload.user_ids:
-        stmt = select(GroupTeachers).where(GroupTeachers.group_id == group_id, GroupTeachers.user_id == user_id)
-        res = await session.execute(stmt)
-        if not res.scalar_one_or_none():
-            gt = GroupTeachers(group_id=group_id, user_id=user_id)
-            session.add(gt)
-            await session.commit()
-            teachers.append(GroupTeacherRead.model_validate(gt))
-    logger.debug(f"Added {len(teachers)} teachers to group {group_id}")
-    return teachers
+    logger.debug("Adding {} teachers to group {}", len(payload.user_ids), group_id)
+    await add_members_bulk(session, group_id, payload.user_ids, teachers=True, strict=True)
+    links = await _membership_links(session, GroupTeachers, group_id, payload.user_ids)
+    logger.debug(f"Assigned {len(links)} teachers to group {group_id}")
+    return [GroupTeacherRead.model_validate(link) for link in links]
+
+@router.post("/{group_id}/teachers/bulk", response_model=GroupMembershipBulkRead)
+async def add_teachers_bulk_endpoint(
+    group_id: int,
+    payload: GroupTeacherCreate,
+    session: AsyncSession = Depends(get_db),
+    _claims: dict = Depends(admin_only),
+):
+    """Массово назначает учителей с итогом по каждому ID (см. ``add_students_bulk_endpoint``)."""
+    results = await add_members_bulk(session, group_id, payload.user_ids, teachers=True)
+    return _bulk_summary(group_id, results)
+
+async def _membership_links(session: AsyncSession, model: type, group_id: int, user_ids: List[int]) -> list:
+    res = await session.execute(
+        select(model).where(model.group_id == group_id, model.user_id.in_(user_ids)).order_by(model.user_id)
+    )
+    return list(res.scalars().all())
+
+def _bulk_summary(group_id: int, results: dict[int, str]) -> GroupMembershipBulkRead:
+    counts = {status_: 0 for status_ in (ADDED, RESTORED, UNCHANGED)}
+    for outcome in results.values():
+        if outcome in counts:
+            counts[outcome] += 1
+    return GroupMembershipBulkRead(
+        group_id=group_id,
+        added=counts[ADDED],
+        restored=counts[RESTORED],
+        unchanged=counts[UNCHANGED],
+        rejected=len(results) - sum(counts.values()),
+        results=[{"user_id": user_id, "status": outcome} for user_id, outcome in results.items()],
+    )
 
 @router.post("/{group_id}/archive", status_code=status.HTTP_204_NO_CONTENT)
 async def archive_group_endpoint(
@@ -402,7 +470,7 @@ async def update_group_endpoint(
     Raises:
         HTTPException: Если группа не найдена (404).
     """
-    logger.debug(f"Updating group {group_id} with data: {group_data.model_dump()}")
+    logger.debug("Updating group {}: fields {}", group_id, sorted(group_data.model_fields_set))
     group = await update_item(
         session, Group, group_id, **group_data.model_dump(exclude_unset=True)
     )
@@ -441,7 +509,7 @@ async def update_student_status_endpoint(
     Raises:
         HTTPException: Если связь не найдена (404).
     """
-    logger.debug(f"Updating status for student {user_id} in group {group_id} with payload: {payload.model_dump()}")
+    logger.debug("Updating status for student {} in group {} to {}", user_id, group_id, payload.status)
     gs = await update_student_status(session, user_id, group_id, payload.status)
     logger.debug(f"Status updated for student {user_id} in group {group_id}")
     return GroupStudentRead.model_validate(gs)
@@ -536,4 +604,36 @@ async def delete_group_permanently_endpoint(
     """
     logger.debug(f"Permanently deleting group with ID: {group_id}")
     await delete_item_permanently(session, Group, group_id)
-    logger.info(f"Группа {group_id} удалена окончательно")
\ No newline at end of file
+    logger.info(f"Группа {group_id} удалена окончательно")
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+@router.get("/{group_id}/progress/export", response_class=StreamingResponse)
+async def export_group_progress_endpoint(
+    group_id: int,
+    topic_id: int = Query(..., description="Тема, по разделам которой строится матрица"),
+    format: ExportFormat = Query("csv", description="csv или ndjson"),
+    session: AsyncSession = Depends(get_db),
+    _claims: dict = Depends(admin_or_teacher),
+):
+    """Потоковый экспорт матрицы прогресса группы: студенты × разделы темы.
+
+    Args:
+        group_id (int): ID группы.
+        topic_id (int): ID темы.
+        format (str): ``csv`` (по умолчанию) или ``ndjson``.
+
+    Returns:
+        StreamingResponse: Строка на каждого активного студента группы.
+
+    Raises:
+        NotFoundError: Группа или тема не найдены (404).
+    """
+    await get_item(session, Group, group_id)
+    await get_item(session, Topic, topic_id)
+    sections = await load_topic_sections(session, topic_id)
+    logger.debug(f"Exporting progress of group {group_id} for topic {topic_id} ({len(sections)} sections)")
+    return group_progress_export(group_id, topic_id, sections, format)
@@ -5,7 +5,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -124,4 +124,23 @@ class GroupTeacherRead(BaseModel):
     is_archived: bool
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+# ---------------------------------------------------------------------------
+# Bulk membership schemas
+# ---------------------------------------------------------------------------
+
+class MembershipResult(BaseModel):
+    """Итог по одному ID массовой операции."""
+    user_id: int
+    status: Literal["added", "restored", "unchanged", "not_found", "wrong_role"]
+
+class GroupMembershipBulkRead(BaseModel):
+    """Результат массового зачисления студентов / назначения учителей."""
+    group_id: int
+    added: int
+    restored: int
+    unchanged: int
+    rejected: int
+    results: List[MembershipResult]
@@ -0,0 +1,51 @@
+# TestWise/Backend/src/api/v1/pagination.py
+# -*- coding: utf-8 -*-
+"""
+Общие параметры keyset-пагинации для списочных эндпоинтов.
+
+Тело ответа остаётся списком (совместимо с фронтендом); курсор следующей
+страницы и общее число записей передаются заголовками:
+
+* ``X-Next-Cursor`` — передать в ``after`` для следующей страницы
+  (отсутствует на последней странице);
+* ``X-Total-Count`` — только при ``with_total=true``.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import Query, Response
+
+from src.repository.base import Page
+
+MAX_PAGE_SIZE = 1000
+# Размер страницы по умолчанию там, где полный список может быть огромным
+DEFAULT_PAGE_SIZE = 500
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+@dataclass
+class PageParams:
+    limit: Optional[int] = None
+    after: Optional[str] = None
+    with_total: bool = False
+
+    def limit_or(self, default: int) -> int:
+        return self.limit if self.limit is not None else default
+
+
+def page_params(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы"),
+    after: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor"),
+    with_total: bool = Query(False, description="Вернуть общее число записей в X-Total-Count"),
+) -> PageParams:
+    return PageParams(limit=limit, after=after, with_total=with_total)
+
+
+def set_page_headers(response: Response, page: Page) -> None:
+    if page.next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    if page.total is not None:
+        response.headers[TOTAL_COUNT_HEADER] = str(page.total)
@@ -12,11 +12,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.api.v1.profile.schemas import ProfileRead, MyTopicsResponse  # Импорт новой схемы
 from src.config.logger import configure_logger
-from src.domain.models import TopicProgress, SectionProgress, SubsectionProgress, TestAttempt, Group, GroupTeachers, Topic, User
+from src.domain.models import TopicProgress, SectionProgress, SubsectionProgress, TestAttempt, Group, GroupTeachers
 from src.security.security import authenticated
 from src.database.db import get_db
 from src.api.v1.groups.schemas import GroupReadSchema
-from src.api.v1.topics.schemas import TopicReadSchema  # Импорт схемы тем
+from src.api.v1.topics.schemas import topic_read_from_row
+from src.repository.topic import list_topic_rows
 
 router = APIRouter()
 logger = configure_logger()
@@ -149,31 +150,11 @@ async def get_my_topics_endpoint(
         logger.debug(f"Access denied for role: {user_role}")
         raise HTTPException(status_code=403, detail="Доступ запрещен: только учителя и админы могут просматривать свои темы")
 
-    # Формируем запрос в зависимости от роли
-    if user_role == "admin":
-        stmt = select(Topic).where(Topic.is_archived == False)
-    else:  # teacher
-        stmt = select(Topic).where(Topic.creator_id == user_id, Topic.is_archived == False)
-
-    res = await session.execute(stmt)
-    topics = res.scalars().all()
-    logger.debug(f"Query result: {len(topics)} topics found")
-
-    # Получаем полное имя создателя для каждой темы
-    result = [
-        TopicReadSchema.model_validate({
-            "id": t.id,
-            "title": t.title,
-            "description": t.description,
-            "category": t.category,
-            "image": t.image,
-            "created_at": t.created_at,
-            "is_archived": t.is_archived,
-            "progress": None,  # Прогресс не требуется для этой ручки
-            "creator_full_name": (await session.execute(select(User.full_name).where(User.id == t.creator_id))).scalar_one_or_none() or "Неизвестно",
-        })
-        for t in topics
-    ]
+    # Один запрос: темы + имя создателя (прогресс для этой ручки не нужен)
+    creator_id = None if user_role == "admin" else user_id
+    rows = await list_topic_rows(session, creator_id=creator_id, is_archived=False)
+    logger.debug(f"Query result: {len(rows)} topics found")
+    result = [topic_read_from_row(row) for row in rows]
 
     logger.debug(f"Retrieved {len(result)} topics for user {user_id}")
     return MyTopicsResponse(topics=result)
\ No newline at end of file
@@ -9,24 +9,46 @@
 * GET /api/v1/progress/subsections  — прогресс по подсекциям
 * GET /api/v1/progress/tests        — история попыток тестов
 
+и массовый пересчёт для админа:
+
+* POST /api/v1/progress/recompute   — прогресс группы (или пользователей) по теме
+
 ✔ Студент может запрашивать только *свой* прогресс.
-✔ Учитель / админ — любой, либо по `user_id` в query-param.
+✔ Учитель / админ — любой, либо по `user_id` / `group_id` в query-param.
+
+Списки постраничные (`limit`, `after`, `with_total`, см. `api.v1.pagination`);
+без фильтра по пользователю страница — не более 500 записей.
 
 Примечание: Клиент может агрегировать данные в формат StudentProgress,
 используя комбинацию этих эндпоинтов.
 """
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.api.v1.pagination import DEFAULT_PAGE_SIZE, PageParams, page_params, set_page_headers
 from src.config.logger import configure_logger
-from src.domain.enums import Role
-from src.domain.models import TopicProgress, SectionProgress, SubsectionProgress, TestAttempt
-from src.security.security import authenticated
+from src.domain.enums import GroupStudentStatus, Role
+from src.domain.models import (
+    Group,
+    GroupStudents,
+    SectionProgress,
+    SubsectionProgress,
+    TestAttempt,
+    Topic,
+    TopicProgress,
+    User,
+)
+from src.repository.base import get_item, paginate
+from src.security.security import admin_only, authenticated
+from src.service.progress import recompute_progress_bulk
 from src.database.db import get_db
+from src.utils.exceptions import NotFoundError
 
 from .schemas import (
+    ProgressRecomputeRequest,
+    ProgressRecomputeResult,
     TopicProgressRead,
     SectionProgressRead,
     SubsectionProgressRead,
@@ -56,13 +78,50 @@ def _resolve_user_id(
 
 # -------------------------- endpoints ---------------------------------------
 
+async def _list_progress(
+    session: AsyncSession,
+    response: Response,
+    model: type,
+    uid: int | None,
+    group_id: int | None,
+    params: PageParams,
+    **filters,
+) -> list:
+    """
+    Общая выборка прогресса: фильтры на стороне БД и keyset-пагинация по id.
+    Без фильтра по пользователю страница ограничена ``DEFAULT_PAGE_SIZE``.
+    """
+    stmt = select(model).filter_by(**{k: v for k, v in filters.items() if v is not None})
+    if uid is not None:
+        stmt = stmt.where(model.user_id == uid)
+    elif group_id is not None:
+        stmt = stmt.where(
+            model.user_id.in_(
+                select(GroupStudents.user_id).where(
+                    GroupStudents.group_id == group_id,
+                    GroupStudents.is_archived == False,
+                )
+            )
+        )
+    limit = params.limit if uid is not None else params.limit_or(DEFAULT_PAGE_SIZE)
+    page = await paginate(
+        session, stmt, [model.id], limit=limit, after=params.after, with_total=params.with_total
+    )
+    set_page_headers(response, page)
+    logger.debug(f"Retrieved {len(page.items)} {model.__name__} records")
+    return page.items
+
 @router.get(
     "/topics",
     response_model=list[TopicProgressRead],
     dependencies=[Depends(authenticated)],
 )
 async def list_topic_progress(
+    response: Response,
     user_id: int | None = Query(None, description="Фильтр по пользователю"),
+    group_id: int | None = Query(None, description="Студенты группы (учитель / админ)"),
+    topic_id: int | None = Query(None, description="Фильтр по теме"),
+    params: PageParams = Depends(page_params),
     session: AsyncSession = Depends(get_db),
     claims: dict = Depends(authenticated),
 ):
@@ -71,14 +130,9 @@ async def list_topic_progress(
     """
     logger.debug(f"Fetching topic progress, user_id: {claims['sub']}, requested: {user_id}")
     uid = _resolve_user_id(user_id, claims)
-
-    stmt = select(TopicProgress)
-    if uid is not None:
-        stmt = stmt.where(TopicProgress.user_id == uid)
-
-    rows = (await session.execute(stmt)).scalars().all()
-    logger.debug(f"Retrieved {len(rows)} topic progress records")
-    return rows
+    return await _list_progress(
+        session, response, TopicProgress, uid, group_id, params, topic_id=topic_id
+    )
 
 @router.get(
     "/sections",
@@ -86,7 +140,11 @@ async def list_topic_progress(
     dependencies=[Depends(authenticated)],
 )
 async def list_section_progress(
+    response: Response,
     user_id: int | None = Query(None, description="Фильтр по пользователю"),
+    group_id: int | None = Query(None, description="Студенты группы (учитель / админ)"),
+    section_id: int | None = Query(None, description="Фильтр по секции"),
+    params: PageParams = Depends(page_params),
     session: AsyncSession = Depends(get_db),
     claims: dict = Depends(authenticated),
 ):
@@ -95,14 +153,9 @@ async def list_section_progress(
     """
     logger.debug(f"Fetching section progress, user_id: {claims['sub']}, requested: {user_id}")
     uid = _resolve_user_id(user_id, claims)
-
-    stmt = select(SectionProgress)
-    if uid is not None:
-        stmt = stmt.where(SectionProgress.user_id == uid)
-
-    rows = (await session.execute(stmt)).scalars().all()
-    logger.debug(f"Retrieved {len(rows)} section progress records")
-    return rows
+    return await _list_progress(
+        session, response, SectionProgress, uid, group_id, params, section_id=section_id
+    )
 
 @router.get(
     "/subsections",
@@ -110,7 +163,11 @@ async def list_section_progress(
     dependencies=[Depends(authenticated)],
 )
 async def list_subsection_progress(
+    response: Response,
     user_id: int | None = Query(None, description="Фильтр по пользователю"),
+    group_id: int | None = Query(None, description="Студенты группы (учитель / админ)"),
+    subsection_id: int | None = Query(None, description="Фильтр по подсекции"),
+    params: PageParams = Depends(page_params),
     session: AsyncSession = Depends(get_db),
     claims: dict = Depends(authenticated),
 ):
@@ -119,14 +176,9 @@ async def list_subsection_progress(
     """
     logger.debug(f"Fetching subsection progress, user_id: {claims['sub']}, requested: {user_id}")
     uid = _resolve_user_id(user_id, claims)
-
-    stmt = select(SubsectionProgress)
-    if uid is not None:
-        stmt = stmt.where(SubsectionProgress.user_id == uid)
-
-    rows = (await session.execute(stmt)).scalars().all()
-    logger.debug(f"Retrieved {len(rows)} subsection progress records")
-    return rows
+    return await _list_progress(
+        session, response, SubsectionProgress, uid, group_id, params, subsection_id=subsection_id
+    )
 
 @router.get(
     "/tests",
@@ -134,7 +186,11 @@ async def list_subsection_progress(
     dependencies=[Depends(authenticated)],
 )
 async def list_test_attempts(
+    response: Response,
     user_id: int | None = Query(None, description="Фильтр по пользователю"),
+    group_id: int | None = Query(None, description="Студенты группы (учитель / админ)"),
+    test_id: int | None = Query(None, description="Фильтр по тесту"),
+    params: PageParams = Depends(page_params),
     session: AsyncSession = Depends(get_db),
     claims: dict = Depends(authenticated),
 ):
@@ -143,11 +199,86 @@ async def list_test_attempts(
     """
     logger.debug(f"Fetching test attempts, user_id: {claims['sub']}, requested: {user_id}")
     uid = _resolve_user_id(user_id, claims)
+    return await _list_progress(
+        session, response, TestAttempt, uid, group_id, params, test_id=test_id
+    )
 
-    stmt = select(TestAttempt)
-    if uid is not None:
-        stmt = stmt.where(TestAttempt.user_id == uid)
+@router.post(
+    "/recompute",
+    response_model=ProgressRecomputeResult,
+    dependencies=[Depends(admin_only)],
+)
+async def recompute_progress(
+    payload: ProgressRecomputeRequest,
+    session: AsyncSession = Depends(get_db),
+):
+    """
+    Массово пересчитывает прогресс по секциям и темам.
+
+    * Пользователи — активные студенты `group_id`, явный `user_ids`
+      (все должны существовать, иначе 404) или (если задан только
+      `topic_id`) все, у кого есть прогресс по теме.
+    * Темы — `topic_id` или неархивные темы, по которым у этих
+      пользователей уже есть прогресс.
+    """
+    logger.debug(
+        "Bulk progress recompute: group {}, {} users, topic {}",
+        payload.group_id, len(payload.user_ids or ()), payload.topic_id,
+    )
+    if payload.group_id is None and not payload.user_ids and payload.topic_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Either group_id, user_ids or topic_id must be provided",
+        )
+
+    if payload.topic_id is not None:
+        await get_item(session, Topic, payload.topic_id)
+
+    user_ids: set[int] = set(payload.user_ids or [])
+    if user_ids:
+        res = await session.execute(select(User.id).where(User.id.in_(user_ids), User.is_archived == False))
+        missing = sorted(user_ids - set(res.scalars().all()))
+        if missing:
+            raise NotFoundError(resource_type="User", resource_id=", ".join(map(str, missing)))
+    if payload.group_id is not None:
+        await get_item(session, Group, payload.group_id)
+        res = await session.execute(
+            select(GroupStudents.user_id).where(
+                GroupStudents.group_id == payload.group_id,
+                GroupStudents.status == GroupStudentStatus.ACTIVE,
+                GroupStudents.is_archived == False,
+            )
+        )
+        user_ids.update(res.scalars().all())
+    elif not user_ids:
+        res = await session.execute(
+            select(TopicProgress.user_id).where(TopicProgress.topic_id == payload.topic_id)
+        )
+        user_ids.update(res.scalars().all())
+
+    if payload.topic_id is not None:
+        topic_ids = [payload.topic_id]
+    elif user_ids:
+        # Темы, которые пользователи ещё не открывали, не получают строк прогресса
+        res = await session.execute(
+            select(TopicProgress.topic_id)
+            .join(Topic, Topic.id == TopicProgress.topic_id)
+            .where(TopicProgress.user_id.in_(user_ids), Topic.is_archived == False)
+            .distinct()
+        )
+        topic_ids = list(res.scalars().all())
+    else:
+        topic_ids = []
+
+    summary = await recompute_progress_bulk(session, user_ids, topic_ids)
 
-    rows = (await session.execute(stmt)).scalars().all()
-    logger.debug(f"Retrieved {len(rows)} test attempt records")
-    return rows
\ No newline at end of file
+    rows = []
+    if user_ids and topic_ids:
+        res = await session.execute(
+            select(TopicProgress).where(
+                TopicProgress.user_id.in_(user_ids), TopicProgress.topic_id.in_(topic_ids)
+            )
+        )
+        rows = res.scalars().all()
+    logger.debug(f"Recomputed progress: {summary}")
+    return ProgressRecomputeResult(**summary, topic_progress=rows)
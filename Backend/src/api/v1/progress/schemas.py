@@ -4,9 +4,9 @@ Pydantic-схемы для прогресса пользователей.
 """
 
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from src.domain.enums import ProgressStatus
 
@@ -18,7 +18,7 @@ class TopicProgressRead(BaseModel):
     completion_percentage: float
     last_accessed: datetime
     created_at: datetime
-    updated_at: datetime
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -31,7 +31,7 @@ class SectionProgressRead(BaseModel):
     completion_percentage: float
     last_accessed: datetime
     created_at: datetime
-    updated_at: datetime
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -43,7 +43,7 @@ class SubsectionProgressRead(BaseModel):
     is_viewed: bool
     viewed_at: Optional[datetime] = None
     created_at: datetime
-    updated_at: datetime
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -59,7 +59,24 @@ class TestAttemptRead(BaseModel):
     started_at: datetime
     completed_at: Optional[datetime] = None
     created_at: datetime
-    updated_at: datetime
+    updated_at: Optional[datetime] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ProgressRecomputeRequest(BaseModel):
+    """Область массового пересчёта: группа или список пользователей × тема (или все темы)."""
+    group_id: Optional[int] = None
+    user_ids: Optional[List[int]] = None
+    topic_id: Optional[int] = None
+
+    class Config:
+        json_schema_extra = {
+            "example": {"group_id": 1, "topic_id": 2}
+        }
+
+class ProgressRecomputeResult(BaseModel):
+    users: int
+    topics: int
+    sections: int
+    topic_progress: List[TopicProgressRead] = Field(default_factory=list)
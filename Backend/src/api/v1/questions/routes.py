@@ -5,14 +5,16 @@
 """
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
+from src.api.v1.caching import cached_json
+from src.cache import invalidate
 from src.config.logger import configure_logger
 from src.database.db import get_db
 from src.domain.enums import Role
-from src.domain.models import Question
+from src.domain.models import Question, Test
 from src.repository.base import (
     get_item,
     update_item,
@@ -22,6 +24,7 @@ from src.repository.base import (
 )
 from src.repository.question import create_question
 from src.security.security import require_roles, authenticated
+from src.service.regrade import start_regrade
 from .schemas import (
     QuestionCreateSchema,
     QuestionReadSchema,
@@ -31,6 +34,9 @@ from .schemas import (
 router = APIRouter()
 logger = configure_logger()
 
+# Поля, изменение которых меняет результат проверки
+_ANSWER_KEY_FIELDS = {"options", "correct_answer", "question_type"}
+
 
 @router.post(
     "",
@@ -74,11 +80,12 @@ async def create_question_endpoint(
     dependencies=[Depends(authenticated)],
 )
 async def list_questions_endpoint(
+    request: Request,
     test_id: Optional[int] = None,
     session: AsyncSession = Depends(get_db),
 ):
     """
-    Возвращает список вопросов для теста.
+    Возвращает список вопросов для теста (с ETag; 304, если вопросы не менялись).
 
     - **test_id**: обязательный query-параметр.
     """
@@ -87,13 +94,17 @@ async def list_questions_endpoint(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Параметр test_id обязателен",
         )
-    questions = await list_items(
-        session,
-        Question,
-        is_archived=False,
-        test_id=test_id,
-    )
-    return [QuestionReadSchema.model_validate(q) for q in questions]
+
+    async def build() -> List[QuestionReadSchema]:
+        questions = await list_items(
+            session,
+            Question,
+            is_archived=False,
+            test_id=test_id,
+        )
+        return [QuestionReadSchema.model_validate(q) for q in questions]
+
+    return await cached_json(request, ("test_questions", test_id), [Test, Question], build)
 
 
 @router.post(
@@ -172,12 +183,17 @@ async def update_question_endpoint(
     - **body**: QuestionUpdateSchema с изменёнными полями.
     """
     update_data = question_data.model_dump(exclude_unset=True)
-    return await update_item(
+    question = await update_item(
         session,
         Question,
         question_id,
         **update_data,
     )
+    # Ключ ответа изменился — перепроверяем уже сданные попытки в фоне
+    if update_data.keys() & _ANSWER_KEY_FIELDS:
+        job = start_regrade(question.test_id)
+        logger.info(f"Question {question_id} key changed, regrade job {job.id} for test {question.test_id}")
+    return question
 
 
 @router.delete(
@@ -235,6 +251,7 @@ async def restore_question_endpoint(
         is_archived=True,
     )
     question.is_archived = False
+    invalidate(session, Question)
     await session.commit()
     return {"detail": "Вопрос восстановлен"}
 
@@ -4,18 +4,21 @@
 
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
+from src.api.v1.caching import cached_json
+from src.api.v1.pagination import PageParams, page_params, set_page_headers
+from src.cache import invalidate
 from src.config.logger import configure_logger
-from src.domain.models import Section, SectionProgress, Subsection
-from src.repository.base import list_items, get_item, update_item, archive_item, delete_item_permanently
+from src.domain.models import Section, Subsection, Topic
+from src.repository.base import get_item, paginate, update_item, archive_item, delete_item_permanently
 from src.repository.topic import create_section
 from src.security.security import admin_or_teacher, authenticated
 from src.database.db import get_db
-from src.service.progress import calculate_section_progress
+from src.service.progress import get_section_progress_row
 from .schemas import (
     SectionCreateSchema,
     SectionProgressRead,
@@ -39,7 +42,7 @@ async def create_section_endpoint(
         session: AsyncSession = Depends(get_db),
         _claims: dict = Depends(admin_or_teacher),
 ):
-    logger.debug(f"Creating section with payload: {payload.model_dump()}")
+    logger.debug("Creating section in topic {}", payload.topic_id)
     section = await create_section(
         session,
         topic_id=payload.topic_id,
@@ -54,17 +57,24 @@ async def create_section_endpoint(
 
 @router.get("", response_model=List[SectionReadSchema])
 async def list_sections_endpoint(
+        response: Response,
         topic_id: Optional[int] = None,
+        params: PageParams = Depends(page_params),
         session: AsyncSession = Depends(get_db),
         _claims: dict = Depends(authenticated),
 ):
     logger.debug(f"Fetching sections with topic_id: {topic_id}")
-    filters = {"is_archived": False}
+    stmt = select(Section).where(Section.is_archived == False)
     if topic_id:
-        filters["topic_id"] = topic_id
-    sections = await list_items(session, Section, **filters)
-    logger.debug(f"Retrieved {len(sections)} sections")
-    return [SectionReadSchema.model_validate(s) for s in sections]
+        stmt = stmt.where(Section.topic_id == topic_id)
+    # Порядок разделов внутри темы; id делает ключ курсора уникальным
+    page = await paginate(
+        session, stmt, [Section.order, Section.id],
+        limit=params.limit, after=params.after, with_total=params.with_total,
+    )
+    set_page_headers(response, page)
+    logger.debug(f"Retrieved {len(page.items)} sections")
+    return [SectionReadSchema.model_validate(s) for s in page.items]
 
 
 @router.get("/{section_id}", response_model=SectionReadSchema)
@@ -86,7 +96,7 @@ async def update_section_endpoint(
         session: AsyncSession = Depends(get_db),
         _claims: dict = Depends(admin_or_teacher),
 ):
-    logger.debug(f"Updating section {section_id} with payload: {payload.model_dump()}")
+    logger.debug("Updating section {}: fields {}", section_id, sorted(payload.model_fields_set))
     section = await update_item(session, Section, section_id, **payload.model_dump(exclude_unset=True))
     logger.debug(f"Section {section_id} updated")
     return SectionReadSchema.model_validate(section)
@@ -123,6 +133,7 @@ async def restore_section_endpoint(
     logger.debug(f"Restoring section with ID: {section_id}")
     section = await get_item(session, Section, section_id, is_archived=True)
     section.is_archived = False
+    invalidate(session, Section)
     await session.commit()
     logger.info(f"Раздел {section_id} восстановлен")
 
@@ -150,11 +161,7 @@ async def get_section_progress_endpoint(
 ):
     logger.debug(f"Fetching progress for section {section_id}, user_id: {claims['sub']}")
     user_id = claims["sub"] or claims["id"]
-    await calculate_section_progress(session, user_id, section_id, commit=True)
-
-    stmt = select(SectionProgress).where(SectionProgress.user_id == user_id, SectionProgress.section_id == section_id)
-    res = await session.execute(stmt)
-    progress = res.scalar_one_or_none()
+    progress = await get_section_progress_row(session, user_id, section_id)
     if progress is None:
         logger.debug(f"No progress found for section {section_id}, user_id {user_id}")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Progress not found")
@@ -165,23 +172,28 @@ async def get_section_progress_endpoint(
 @router.get("/{section_id}/subsections", response_model=SectionWithSubsections)
 async def list_subsections_endpoint(
     section_id: int,
+    request: Request,
     session: AsyncSession = Depends(get_db),
     _claims: dict = Depends(authenticated),
 ):
     logger.debug(f"Listing subsections for section {section_id}")
-    section = await get_item(session, Section, section_id, is_archived=False)
-    stmt = select(Subsection) \
-        .where(Subsection.section_id == section_id, Subsection.is_archived == False) \
-        .order_by(Subsection.order)
-    res = await session.execute(stmt)
-    subs = res.scalars().all()
-    logger.debug(f"Retrieved {len(subs)} subsections for section {section_id}")
-    return SectionWithSubsections.model_validate(
-        {
-            **section.__dict__,
-            "subsections": [
-                SubsectionReadSchema.model_validate(s)
-                for s in subs
-            ],
-        }
-    )
+
+    async def build() -> SectionWithSubsections:
+        section = await get_item(session, Section, section_id, is_archived=False)
+        stmt = select(Subsection) \
+            .where(Subsection.section_id == section_id, Subsection.is_archived == False) \
+            .order_by(Subsection.order)
+        res = await session.execute(stmt)
+        subs = res.scalars().all()
+        logger.debug(f"Retrieved {len(subs)} subsections for section {section_id}")
+        return SectionWithSubsections.model_validate(
+            {
+                **section.__dict__,
+                "subsections": [
+                    SubsectionReadSchema.model_validate(s)
+                    for s in subs
+                ],
+            }
+        )
+
+    return await cached_json(request, ("section_subsections", section_id), [Topic, Section, Subsection], build)
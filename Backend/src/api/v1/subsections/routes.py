@@ -74,7 +74,7 @@ async def create_subsection_json(
             detail="PDF subsections must be uploaded via multipart/form-data",
         )
 
-    logger.debug(f"Creating TEXT subsection via JSON: {payload.model_dump()}")
+    logger.debug("Creating TEXT subsection in section {} via JSON", payload.section_id)
     sub = await create_subsection(
         session=session,
         section_id=payload.section_id,
@@ -0,0 +1,7 @@
+# TestWise/Backend/src/api/v1/system/__init__.py
+# -*- coding: utf-8 -*-
+"""
+Этот модуль экспортирует роутер служебных эндпоинтов в API TestWise.
+"""
+
+from .routes import router
@@ -0,0 +1,119 @@
+# TestWise/Backend/src/api/v1/system/routes.py
+# -*- coding: utf-8 -*-
+"""
+Служебные маршруты FastAPI (только для администратора).
+
+* GET /api/v1/system/database — активные настройки движка БД и пула
+* GET /api/v1/system/password-hashing — очередь и счётчики пула bcrypt
+* GET /api/v1/system/attempt-expiry — метрики сборщика просроченных попыток
+* GET /api/v1/system/cache — попадания / 304 / версии кэша ответов
+* GET /api/v1/system/backups — список бэкапов и состояние фонового бэкапа
+* POST /api/v1/system/backups — запустить бэкап в фоне
+"""
+
+from fastapi import APIRouter, Depends, status
+
+from src.cache import cache_stats
+from src.config.logger import configure_logger
+from src.database.backup import backup_job_status, list_backups, start_backup_job, zstandard
+from src.database.db import get_database_diagnostics
+from src.security.passwords import password_hasher_stats
+from src.security.security import admin_only
+from src.service.expiry import expiry_stats
+from src.utils.exceptions import ConflictError, ValidationError
+from .schemas import (
+    AttemptExpiryStatsRead,
+    BackupCreateRequest,
+    BackupListRead,
+    CacheStatsRead,
+    DatabaseDiagnosticsRead,
+    PasswordHasherStatsRead,
+)
+
+router = APIRouter()
+logger = configure_logger()
+
+
+@router.get(
+    "/database",
+    response_model=DatabaseDiagnosticsRead,
+    dependencies=[Depends(admin_only)],
+)
+async def database_diagnostics_endpoint():
+    """
+    Возвращает диалект, состояние пула соединений и применённые PRAGMA (SQLite).
+    """
+    diagnostics = await get_database_diagnostics()
+    logger.debug(f"Database diagnostics: {diagnostics}")
+    return diagnostics
+
+
+@router.get(
+    "/password-hashing",
+    response_model=PasswordHasherStatsRead,
+    dependencies=[Depends(admin_only)],
+)
+async def password_hashing_stats_endpoint():
+    """
+    Возвращает глубину очереди и счётчики пула хеширования паролей.
+    """
+    return password_hasher_stats()
+
+
+@router.get(
+    "/attempt-expiry",
+    response_model=AttemptExpiryStatsRead,
+    dependencies=[Depends(admin_only)],
+)
+async def attempt_expiry_stats_endpoint():
+    """
+    Возвращает счётчики фонового сборщика просроченных попыток.
+    """
+    return expiry_stats()
+
+
+@router.get(
+    "/cache",
+    response_model=CacheStatsRead,
+    dependencies=[Depends(admin_only)],
+)
+async def cache_stats_endpoint():
+    """
+    Возвращает счётчики кэша ответов (200 из кэша, промахи, 304, поднятые версии).
+    """
+    return cache_stats()
+
+
+@router.get(
+    "/backups",
+    response_model=BackupListRead,
+    dependencies=[Depends(admin_only)],
+)
+async def list_backups_endpoint():
+    """
+    Возвращает бэкапы (новые первыми) и состояние последнего фонового бэкапа.
+    """
+    return {**backup_job_status(), "backups": await list_backups()}
+
+
+@router.post(
+    "/backups",
+    response_model=BackupListRead,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(admin_only)],
+)
+async def create_backup_endpoint(payload: BackupCreateRequest | None = None):
+    """
+    Запускает бэкап в фоне; результат виден в ``GET /api/v1/system/backups``.
+
+    Raises:
+        ValidationError: сжатие zstd запрошено, но пакет ``zstandard`` не установлен.
+        ConflictError: бэкап или восстановление уже выполняется.
+    """
+    compression = payload.compression if payload else None
+    if compression == "zstd" and zstandard is None:
+        raise ValidationError(detail="Для сжатия zstd установите пакет zstandard")
+    if not start_backup_job(compression):
+        raise ConflictError(detail="Бэкап уже выполняется")
+    logger.info(f"Запущен фоновый бэкап (compression={compression or 'default'})")
+    return {**backup_job_status(), "in_progress": True, "backups": await list_backups()}
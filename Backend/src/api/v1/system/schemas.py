@@ -0,0 +1,96 @@
+# TestWise/Backend/src/api/v1/system/schemas.py
+# -*- coding: utf-8 -*-
+"""
+Pydantic-схемы для служебных эндпоинтов (диагностика).
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic import BaseModel
+
+
+class DatabaseDiagnosticsRead(BaseModel):
+    """
+    Активный профиль подключения к БД.
+    """
+    dialect: str
+    driver: str
+    pool: Dict[str, Any]
+    pragmas: Dict[str, Any]
+
+
+class AttemptExpiryStatsRead(BaseModel):
+    """
+    Счётчики фонового сборщика просроченных попыток.
+    """
+    running: bool
+    interval_seconds: int
+    runs: int
+    swept_total: int
+    last_swept: int
+    last_run_at: Optional[datetime] = None
+    last_duration_ms: Optional[float] = None
+    errors: int
+    last_error: Optional[str] = None
+
+
+class CacheStatsRead(BaseModel):
+    """
+    Счётчики кэша ответов с ETag.
+    """
+    enabled: bool
+    backend: str
+    size: int
+    maxsize: int
+    hits: int
+    misses: int
+    not_modified: int
+    bumps: int
+
+
+class PasswordHasherStatsRead(BaseModel):
+    """
+    Состояние пула потоков bcrypt.
+    """
+    workers: int
+    max_queue: int
+    bcrypt_rounds: int
+    in_flight: int
+    queued: int
+    max_queued: int
+    completed: int
+    rejected: int
+    rehashed: int
+    avg_wait_ms: float
+    avg_run_ms: float
+
+
+class BackupCreateRequest(BaseModel):
+    """
+    Параметры ручного бэкапа; без тела используется ``BACKUP_COMPRESSION``.
+    """
+    compression: Optional[Literal["none", "gzip", "zstd"]] = None
+
+
+class BackupRead(BaseModel):
+    """
+    Файл бэкапа.
+    """
+    name: str
+    size_bytes: int
+    created_at: datetime
+    compression: str
+    sha256: Optional[str] = None
+
+
+class BackupListRead(BaseModel):
+    """
+    Список бэкапов и состояние последнего фонового бэкапа.
+    """
+    in_progress: bool
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    last_backup: Optional[str] = None
+    last_error: Optional[str] = None
+    backups: List[BackupRead]
@@ -6,7 +6,8 @@
 from datetime import datetime
 from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -17,12 +18,16 @@ from src.api.v1.tests.schemas import (
     TestSubmitSchema,
     TestAttemptRead,
     TestStartResponseSchema,
+    RegradeJobRead,
+    AttemptAnswersPatch,
+    AttemptAnswersSaved,
+    AttemptAnswersRead,
 )
 from src.config.logger import configure_logger
 from src.database.db import get_db
 from src.domain.enums import Role
-from src.domain.models import Test, Question, TestAttempt
-from src.repository.base import get_item, list_items
+from src.domain.models import Test, Question
+from src.repository.base import list_items
 from src.repository.test import (
     create_test,
     update_test,
@@ -32,11 +37,16 @@ from src.repository.test import (
     delete_test_permanently,
     list_tests,
     get_test,
-    get_test_attempts,
+    get_last_scores,
+    get_test_attempt,
 )
 from src.security.security import admin_or_teacher, authenticated, require_roles
-from src.service.tests import submit_test, start_test
+from src.service.autosave import get_saved_answers, save_answers
+from src.service.export import ExportFormat, attempts_export
+from src.service.regrade import get_regrade_job, start_regrade
+from src.service.tests import open_attempt, submit_test
 from src.service.progress import check_test_availability
+from src.utils.exceptions import NotFoundError, PermissionDeniedError
 
 router = APIRouter()
 logger = configure_logger()
@@ -56,7 +66,7 @@ async def create_test_endpoint(
     payload: TestCreateSchema,
     session: AsyncSession = Depends(get_db),
 ):
-    logger.debug(f"Creating test with payload: {payload.model_dump()}")
+    logger.debug("Creating {} test", payload.type)
     test = await create_test(
         session=session,
         title=payload.title,
@@ -95,9 +105,7 @@ async def get_test_endpoint(
 
     # Последний результат текущего пользователя
     user_id = claims["sub"]
-    attempts = await get_test_attempts(session, user_id, test_id)
-    last = max(attempts, key=lambda a: a.started_at) if attempts else None
-    last_score = last.score if last else None
+    last_score = (await get_last_scores(session, user_id, [test_id]))[test_id]
 
     return TestReadSchema.model_validate({
         **test.__dict__,
@@ -116,9 +124,8 @@ async def update_test_endpoint(
     payload: TestCreateSchema,
     session: AsyncSession = Depends(get_db),
 ):
-    logger.debug(f"Updating test {test_id} with payload: {payload.model_dump()}")
     update_data = payload.model_dump(exclude_unset=True)
-    logger.debug(f"Update data: {update_data}")
+    logger.debug("Updating test {}: fields {}", test_id, sorted(update_data))
     updated = await update_test(session, test_id, **update_data)
     return TestReadSchema.model_validate(
         {**updated.__dict__, "questions": [], "last_score": None}
@@ -170,17 +177,15 @@ async def list_tests_endpoint(
     logger.debug(f"Retrieved {len(tests)} tests")
 
     user_id = claims["sub"]
-    out: List[TestReadSchema] = []
-    for t in tests:
-        attempts = await get_test_attempts(session, user_id, t.id)
-        last = max(attempts, key=lambda a: a.started_at) if attempts else None
-        last_score = last.score if last else None
-
-        out.append(TestReadSchema.model_validate({
+    last_scores = await get_last_scores(session, user_id, [t.id for t in tests])
+    out: List[TestReadSchema] = [
+        TestReadSchema.model_validate({
             **t.__dict__,
             "questions": [],
-            "last_score": last_score,
-        }))
+            "last_score": last_scores[t.id],
+        })
+        for t in tests
+    ]
 
     return out
 
@@ -198,6 +203,7 @@ async def start_test_endpoint(
     test_id: int,
     session: AsyncSession = Depends(get_db),
     claims: dict[str, Any] = Depends(authenticated),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", max_length=64),
 ):
     logger.debug(f"Starting test {test_id} for user_id: {claims['sub']}")
     user_id = claims["sub"]
@@ -205,33 +211,9 @@ async def start_test_endpoint(
     if not await check_test_availability(session, user_id, test_id):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Тест недоступен")
 
+    # Вставка-или-возврат: повторы и двойные клики получают ту же открытую попытку
     test = await get_test(session, test_id)
-    now = datetime.now()
-
-    stmt = (
-        select(TestAttempt)
-        .where(
-            TestAttempt.user_id == user_id,
-            TestAttempt.test_id == test_id,
-            TestAttempt.completed_at.is_(None),
-        )
-        .order_by(TestAttempt.started_at.desc())
-    )
-    existing = (await session.execute(stmt)).scalars().first()
-
-    if existing:
-        if not test.duration or test.duration <= 0:
-            attempt = existing
-        else:
-            elapsed = (now - existing.started_at).total_seconds() / 60
-            if elapsed <= test.duration:
-                attempt = existing
-            else:
-                existing.completed_at = now
-                await session.commit()
-                attempt = await start_test(session, user_id, test_id)
-    else:
-        attempt = await start_test(session, user_id, test_id)
+    attempt = await open_attempt(session, user_id, test, idempotency_key)
 
     q_stmt = select(Question).where(Question.test_id == test_id)
     questions = (await session.execute(q_stmt)).scalars().all()
@@ -257,23 +239,126 @@ async def submit_test_endpoint(
     payload: TestSubmitSchema,
     session: AsyncSession = Depends(get_db),
     claims: dict[str, Any] = Depends(authenticated),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", max_length=64),
 ):
-    logger.debug(f"Submitting test {test_id} for user_id: {claims['sub']} with payload: {payload.model_dump()}")
-    # Валидация
-    for a in payload.answers:
-        q = await get_item(session, Question, a["question_id"])
-        if q.test_id != test_id:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Не тот тест для вопроса")
-
+    logger.debug(
+        "Submitting attempt {} of test {} for user {}: {} answers",
+        payload.attempt_id, test_id, claims["sub"], len(payload.answers),
+    )
+    # Принадлежность вопросов тесту проверяется внутри submit_test по ключу ответов
     attempt = await submit_test(
         session=session,
         attempt_id=payload.attempt_id,
         answers={a["question_id"]: a["answer"] for a in payload.answers},
+        test_id=test_id,
+        idempotency_key=idempotency_key,
     )
     logger.debug(f"Test {test_id} submitted, score: {attempt.score}")
     return attempt
 
 
+@router.get(
+    "/attempts/export",
+    response_class=StreamingResponse,
+    dependencies=[Depends(admin_or_teacher)],
+)
+async def export_attempts_endpoint(
+    test_id: Optional[int] = Query(None, description="Фильтр по тесту"),
+    user_id: Optional[int] = Query(None, description="Фильтр по пользователю"),
+    group_id: Optional[int] = Query(None, description="Активные студенты группы"),
+    started_from: Optional[datetime] = Query(None, description="Начаты не раньше"),
+    started_to: Optional[datetime] = Query(None, description="Начаты раньше"),
+    completed_only: bool = Query(False, description="Только завершённые"),
+    format: ExportFormat = Query("csv", description="csv или ndjson"),
+):
+    """
+    Потоковый экспорт попыток (CSV / NDJSON); все фильтры применяются в SQL.
+    """
+    logger.debug(f"Exporting attempts: test_id={test_id}, user_id={user_id}, group_id={group_id}")
+    return attempts_export(
+        format,
+        test_id=test_id,
+        user_id=user_id,
+        group_id=group_id,
+        started_from=started_from,
+        started_to=started_to,
+        completed_only=completed_only,
+    )
+
+
+@router.patch(
+    "/attempts/{attempt_id}/answers",
+    response_model=AttemptAnswersSaved,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(require_roles(Role.STUDENT))],
+)
+async def autosave_answers_endpoint(
+    attempt_id: int,
+    payload: AttemptAnswersPatch,
+    session: AsyncSession = Depends(get_db),
+    claims: dict[str, Any] = Depends(authenticated),
+):
+    """
+    Автосохранение: дельты буферизуются и пишутся в журнал фоновой задачей.
+    """
+    answers = {a["question_id"]: a["answer"] for a in payload.answers}
+    pending = await save_answers(session, claims["sub"], attempt_id, answers)
+    return {"attempt_id": attempt_id, "accepted": len(answers), "pending": pending}
+
+
+@router.get(
+    "/attempts/{attempt_id}/answers",
+    response_model=AttemptAnswersRead,
+    dependencies=[Depends(require_roles(Role.STUDENT))],
+)
+async def get_saved_answers_endpoint(
+    attempt_id: int,
+    session: AsyncSession = Depends(get_db),
+    claims: dict[str, Any] = Depends(authenticated),
+):
+    """Автосохранённые ответы попытки — клиент восстанавливает по ним состояние."""
+    attempt = await get_test_attempt(session, attempt_id)
+    if attempt.user_id != claims["sub"]:
+        raise PermissionDeniedError(detail="Чужая попытка")
+    return {"attempt_id": attempt_id, "answers": await get_saved_answers(session, attempt_id)}
+
+
+# ---------------------------------------------------------------------------#
+# Перепроверка (учителя / админы)                                            #
+# ---------------------------------------------------------------------------#
+
+@router.post(
+    "/{test_id}/regrade",
+    response_model=RegradeJobRead,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(admin_or_teacher)],
+)
+async def regrade_test_endpoint(
+    test_id: int,
+    session: AsyncSession = Depends(get_db),
+):
+    """
+    Запускает фоновую перепроверку всех завершённых попыток теста по текущему ключу.
+    Прогресс — в ``GET /tests/regrade-jobs/{job_id}``.
+    """
+    await get_test(session, test_id)
+    job = start_regrade(test_id)
+    return job.as_dict()
+
+
+@router.get(
+    "/regrade-jobs/{job_id}",
+    response_model=RegradeJobRead,
+    dependencies=[Depends(admin_or_teacher)],
+)
+async def get_regrade_job_endpoint(job_id: str):
+    """Возвращает состояние задачи перепроверки."""
+    job = get_regrade_job(job_id)
+    if job is None:
+        raise NotFoundError(resource_type="RegradeJob", resource_id=job_id)
+    return job.as_dict()
+
+
 # ---------------------------------------------------------------------------#
 # Archive / Restore / Permanent Delete                                       #
 # ---------------------------------------------------------------------------#
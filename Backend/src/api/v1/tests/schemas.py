@@ -5,7 +5,7 @@ Pydantic‑схемы для работы с тестами.
 """
 
 from datetime import datetime
-from typing import Any, List, Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -82,6 +82,27 @@ class TestSubmitSchema(BaseModel):
     time_spent: int      # сек
 
 
+class AttemptAnswersPatch(BaseModel):
+    """
+    Дельты автосохранения: только изменённые ответы.
+    """
+    answers: List[dict]  # [{"question_id": int, "answer": Any}]
+
+
+class AttemptAnswersSaved(BaseModel):
+    attempt_id: int
+    accepted: int
+    pending: int = Field(description="Вопросов в буфере, ещё не записанных в журнал")
+
+
+class AttemptAnswersRead(BaseModel):
+    """
+    Сохранённое состояние ответов открытой попытки (для восстановления клиента).
+    """
+    attempt_id: int
+    answers: Dict[int, Any]
+
+
 class TestAttemptRead(BaseModel):
     """
     Полное состояние попытки.
@@ -98,3 +119,20 @@ class TestAttemptRead(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class RegradeJobRead(BaseModel):
+    """
+    Состояние фоновой перепроверки попыток теста.
+    """
+    id: str
+    test_id: int
+    status: str
+    total: int
+    processed: int
+    changed: int
+    passes: int = 0
+    completion_percentage: Optional[float] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
@@ -1,36 +1,50 @@
 # -*- coding: utf-8 -*-
-"""API v1 › Topics routes with progress endpoints."""
+"""API v1 › Topics routes with progress endpoints.
+
+``GET /topics/{id}`` отдаёт ETag и отвечает 304 по версиям тем, пользователей
+(ФИО создателя) и — для студента — его прогресса (см. ``api.v1.caching``).
+``GET /topics/{id}/tree`` отдаёт тему со всеми разделами, подразделами и
+тестами одним ответом, кэшируется так же.
+"""
 
 from __future__ import annotations
 
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.api.v1.caching import cached_json
+from src.cache import progress_scope
 from src.config.logger import configure_logger
 from src.domain.enums import Role
-from src.domain.models import Topic, TopicProgress, User
+from src.domain.models import Section, Subsection, Test, Topic, User
 from src.repository.topic import (
     create_topic,
-    get_topic,
     update_topic,
     delete_topic,
     archive_topic,
     restore_topic,
     delete_topic_permanently,
+    list_topic_rows,
+    get_topic_tree,
 )
+from src.repository.test import get_last_scores
 from src.security.security import admin_or_teacher, authenticated
+from src.utils.exceptions import NotFoundError
 from src.database.db import get_db
-from src.service.progress import calculate_topic_progress
+from src.service.progress import get_topic_progress_row, get_tree_progress
 from .schemas import (
     TopicCreateSchema,
     TopicProgressRead,
     TopicReadSchema,
     TopicUpdateSchema,
     TopicBaseReadSchema,
+    TopicTreeRead,
+    topic_read_from_row,
 )
+from ..tests.schemas import TestReadSchema
 
 router = APIRouter()
 logger = configure_logger()
@@ -59,7 +73,7 @@ async def create_topic_endpoint(
     Raises:
         HTTPException: Если данные недействительны.
     """
-    logger.debug(f"Creating topic with data: {topic_data.model_dump()}")
+    logger.debug("Creating topic for user {}", claims["sub"])
     creator_id = claims["sub"]  # Берем user_id из claims
     topic = await create_topic(
         session,
@@ -91,87 +105,102 @@ async def list_topics_endpoint(
     claims: dict = Depends(authenticated),
 ):
     logger.debug(f"Listing topics for user_id: {claims['sub']}")
-    stmt = select(Topic)
-    res = await session.execute(stmt)
-    topics = res.scalars().all()
-
+    # Прогресс подтягиваем только для студентов — одним запросом вместе с именем создателя
     user_role = Role(claims["role"])
-    if user_role == Role.STUDENT:
-        progress_stmt = select(TopicProgress).where(TopicProgress.user_id == claims["sub"])
-        prog_res = await session.execute(progress_stmt)
-        by_topic = {tp.topic_id: tp for tp in prog_res.scalars().all()}
-        result = [
-            TopicReadSchema.model_validate({
-                "id": t.id,
-                "title": t.title,
-                "description": t.description,
-                "category": t.category,
-                "image": t.image,
-                "created_at": t.created_at,
-                "is_archived": t.is_archived,
-                "progress": by_topic.get(t.id) if by_topic.get(t.id) else None,
-                "creator_full_name": (await session.execute(select(User.full_name).where(User.id == t.creator_id))).scalar_one_or_none() or "Неизвестно",
-            })
-            for t in topics
-        ]
-    else:
-        result = [
-            TopicReadSchema.model_validate({
-                "id": t.id,
-                "title": t.title,
-                "description": t.description,
-                "category": t.category,
-                "image": t.image,
-                "created_at": t.created_at,
-                "is_archived": t.is_archived,
-                "progress": None,
-                "creator_full_name": (await session.execute(select(User.full_name).where(User.id == t.creator_id))).scalar_one_or_none() or "Неизвестно",
-            })
-            for t in topics
-        ]
+    progress_user_id = claims["sub"] if user_role == Role.STUDENT else None
+    rows = await list_topic_rows(session, progress_user_id=progress_user_id)
+    result = [topic_read_from_row(row) for row in rows]
     logger.debug(f"Retrieved {len(result)} topics")
     return result
 
 @router.get("/{topic_id}", response_model=TopicReadSchema)
 async def get_topic_endpoint(
     topic_id: int,
+    request: Request,
     session: AsyncSession = Depends(get_db),
     claims: dict = Depends(authenticated),
 ):
     logger.debug(f"Fetching topic with ID: {topic_id} for user_id: {claims['sub']}")
-    topic = await get_topic(session, topic_id)
     user_role = Role(claims["role"])
-    creator_full_name = (await session.execute(select(User.full_name).where(User.id == topic.creator_id))).scalar_one_or_none() or "Неизвестно"
-    if user_role == Role.STUDENT:
-        tp_stmt = select(TopicProgress).where(
-            TopicProgress.user_id == claims["sub"], TopicProgress.topic_id == topic_id
+    progress_user_id = claims["sub"] if user_role == Role.STUDENT else None
+    scopes = [Topic, User]
+    if progress_user_id is not None:
+        scopes.append(progress_scope(progress_user_id))
+
+    async def build() -> TopicReadSchema:
+        rows = await list_topic_rows(
+            session, progress_user_id=progress_user_id, topic_id=topic_id, is_archived=False
+        )
+        if not rows:
+            raise NotFoundError(resource_type="Topic", resource_id=topic_id)
+        result = topic_read_from_row(rows[0])
+        logger.debug(
+            f"Topic {topic_id} retrieved with progress: "
+            f"{result.progress.completion_percentage if result.progress else None}"
         )
-        tp_res = await session.execute(tp_stmt)
-        tp = tp_res.scalar_one_or_none()
-        logger.debug(f"Topic {topic_id} retrieved with progress: {tp.completion_percentage if tp else None}")
-        return TopicReadSchema.model_validate({
-            "id": topic.id,
-            "title": topic.title,
-            "description": topic.description,
-            "category": topic.category,
-            "image": topic.image,
-            "created_at": topic.created_at,
-            "is_archived": topic.is_archived,
-            "progress": tp if tp else None,
+        return result
+
+    return await cached_json(request, ("topic", topic_id, progress_user_id), scopes, build)
+
+@router.get("/{topic_id}/tree", response_model=TopicTreeRead)
+async def get_topic_tree_endpoint(
+    topic_id: int,
+    request: Request,
+    progress: bool = Query(False, description="Добавить прогресс и последние оценки вызывающего"),
+    session: AsyncSession = Depends(get_db),
+    claims: dict = Depends(authenticated),
+):
+    """
+    Тема → разделы → подразделы и тесты (плюс итоговые тесты темы) одним ответом.
+
+    Дерево читается одним запросом темы и ``selectinload`` по коллекциям;
+    с ``progress=true`` добавляются прогресс вызывающего по теме, разделам и
+    подразделам и ``last_score`` тестов. Ответ кэшируется по версиям контента
+    (и прогресса вызывающего) и поддерживает If-None-Match → 304.
+    """
+    logger.debug(f"Fetching tree of topic {topic_id}, progress={progress}, user_id: {claims['sub']}")
+    user_id = claims["sub"] if progress else None
+    scopes = [Topic, Section, Subsection, Test, User]
+    if user_id is not None:
+        scopes.append(progress_scope(user_id))
+
+    async def build() -> TopicTreeRead:
+        topic, creator_full_name = await get_topic_tree(session, topic_id)
+        sections = topic.sections
+        tests = [*topic.global_tests, *(t for s in sections for t in s.tests)]
+
+        topic_progress, section_progress, subsection_progress, last_scores = None, {}, {}, {}
+        if user_id is not None:
+            topic_progress, section_progress, subsection_progress = await get_tree_progress(
+                session, user_id, topic_id,
+                [s.id for s in sections],
+                [sub.id for s in sections for sub in s.subsections],
+            )
+            last_scores = await get_last_scores(session, user_id, [t.id for t in tests])
+
+        def test_read(test: Test) -> TestReadSchema:
+            return TestReadSchema.model_validate({**test.__dict__, "questions": [], "last_score": last_scores.get(test.id)})
+
+        return TopicTreeRead.model_validate({
+            **topic.__dict__,
             "creator_full_name": creator_full_name,
+            "progress": topic_progress,
+            "sections": [
+                {
+                    **section.__dict__,
+                    "progress": section_progress.get(section.id),
+                    "subsections": [
+                        {**sub.__dict__, "progress": subsection_progress.get(sub.id)}
+                        for sub in section.subsections
+                    ],
+                    "tests": [test_read(t) for t in section.tests],
+                }
+                for section in sections
+            ],
+            "tests": [test_read(t) for t in topic.global_tests],
         })
-    logger.debug(f"Topic {topic_id} retrieved without progress")
-    return TopicReadSchema.model_validate({
-        "id": topic.id,
-        "title": topic.title,
-        "description": topic.description,
-        "category": topic.category,
-        "image": topic.image,
-        "created_at": topic.created_at,
-        "is_archived": topic.is_archived,
-        "progress": None,
-        "creator_full_name": creator_full_name,
-    })
+
+    return await cached_json(request, ("topic_tree", topic_id, user_id), scopes, build)
 
 @router.put("/{topic_id}", response_model=TopicReadSchema)
 async def update_topic_endpoint(
@@ -180,7 +209,7 @@ async def update_topic_endpoint(
     session: AsyncSession = Depends(get_db),
     _claims: dict = Depends(admin_or_teacher),
 ):
-    logger.debug(f"Updating topic {topic_id} with data: {topic_data.model_dump()}")
+    logger.debug("Updating topic {}: fields {}", topic_id, sorted(topic_data.model_fields_set))
     topic = await update_topic(session, topic_id, **topic_data.model_dump(exclude_unset=True))
     await session.refresh(topic)
     logger.debug(f"Topic {topic_id} updated")
@@ -217,11 +246,7 @@ async def get_topic_progress_endpoint(
 ):
     logger.debug(f"Fetching progress for topic {topic_id}, user_id: {claims['sub']}")
     user_id = claims["sub"]
-    await calculate_topic_progress(session, user_id, topic_id, commit=True)
-
-    tp_stmt = select(TopicProgress).where(TopicProgress.user_id == user_id, TopicProgress.topic_id == topic_id)
-    tp_res = await session.execute(tp_stmt)
-    tp = tp_res.scalar_one_or_none()
+    tp = await get_topic_progress_row(session, user_id, topic_id)
     if tp is None:
         logger.debug(f"No progress found for topic {topic_id}, user_id {user_id}")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Progress not found")
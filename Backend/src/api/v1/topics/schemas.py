@@ -2,10 +2,13 @@
 """Pydantic schemas for Topic endpoints."""
 
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel
 
+from src.api.v1.sections.schemas import SectionProgressRead, SectionReadSchema
+from src.api.v1.subsections.schemas import SubsectionProgressRead, SubsectionReadSchema
+from src.api.v1.tests.schemas import TestReadSchema
 from src.domain.enums import ProgressStatus
 
 class TopicCreateSchema(BaseModel):
@@ -56,4 +59,41 @@ class TopicReadSchema(BaseModel):
     creator_full_name: str  # Заменили creator_id на creator_full_name
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class TopicTreeSubsection(SubsectionReadSchema):
+    progress: Optional[SubsectionProgressRead] = None
+
+class TopicTreeSection(SectionReadSchema):
+    progress: Optional[SectionProgressRead] = None
+    subsections: List[TopicTreeSubsection]
+    tests: List[TestReadSchema]
+
+class TopicTreeRead(TopicReadSchema):
+    """Тема целиком: разделы → подразделы и тесты, плюс итоговые тесты темы."""
+    sections: List[TopicTreeSection]
+    tests: List[TestReadSchema]
+
+def topic_read_from_row(row) -> TopicReadSchema:
+    """Build ``TopicReadSchema`` from a row produced by ``list_topic_rows``."""
+    progress = None
+    if row.progress_id is not None:
+        progress = {
+            "id": row.progress_id,
+            "topic_id": row.id,
+            "completion_percentage": row.progress_completion_percentage,
+            "status": row.progress_status,
+            "last_accessed": row.progress_last_accessed,
+        }
+    return TopicReadSchema.model_validate({
+        "id": row.id,
+        "title": row.title,
+        "description": row.description,
+        "category": row.category,
+        "image": row.image,
+        "created_at": row.created_at,
+        "is_archived": row.is_archived,
+        "progress": progress,
+        "creator_full_name": row.creator_full_name,
+    })
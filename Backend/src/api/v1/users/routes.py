@@ -4,9 +4,10 @@
 ~~~~~~~~~~~~~~~~~~~~~~~~
 Полный набор эндпоинтов для управления пользователями:
 - CRUD
+- массовый импорт из CSV / XLSX
 - фильтрация
 - массовое обновление ролей/статуса
-- экспорт в CSV
+- потоковый экспорт в CSV / NDJSON
 - сброс пароля
 
 Учтены права доступа: admin_only, admin_or_teacher.
@@ -14,36 +15,47 @@
 
 from __future__ import annotations
 
-import csv
 import secrets
-from io import StringIO
 from typing import List, Optional
 
 from fastapi import (
     APIRouter,
     Body,
     Depends,
+    File,
     HTTPException,
     Query,
+    Response,
     status,
+    UploadFile,
 )
-from fastapi.responses import FileResponse
-from passlib.context import CryptContext
-from sqlalchemy import select
+from fastapi.responses import StreamingResponse
+from sqlalchemy import or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.api.v1.pagination import PageParams, page_params, set_page_headers
 from src.config.logger import configure_logger
 from src.database.db import get_db
 from src.domain.enums import Role
 from src.domain.models import User
-from src.repository.base import get_item, update_item, archive_item, delete_item_permanently
-from src.repository.user import create_user
+from src.repository.base import get_item, update_item, archive_item, delete_item_permanently, paginate
+from src.repository.group import ADDED, RESTORED
+from src.repository.user import bulk_update_users, create_user
+from src.security.passwords import hash_password
+from src.service.export import ExportFormat, users_export
+from src.service.user_import import import_users, read_records
 from src.security.security import admin_only, admin_or_teacher
-from .schemas import UserCreateSchema, UserReadSchema, UserUpdateSchema
+from .schemas import (
+    UserBulkResultRead,
+    UserBulkUpdateSchema,
+    UserCreateSchema,
+    UserImportReport,
+    UserReadSchema,
+    UserUpdateSchema,
+)
 
 router = APIRouter()
 logger = configure_logger()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 # ---------------------------------------------------------------------------
@@ -72,7 +84,7 @@ async def create_user_endpoint(
     Raises:
         HTTPException: Если имя пользователя уже существует (400).
     """
-    logger.debug(f"Creating user with data: {user_data.model_dump()}")
+    logger.debug("Creating user {} with role {}", user_data.username, user_data.role)
     existing_user = await session.execute(
         select(User).where(User.username == user_data.username)
     )
@@ -91,6 +103,82 @@ async def create_user_endpoint(
     return UserReadSchema.model_validate(user)
 
 
+# ---------------------------------------------------------------------------
+# Bulk import
+# ---------------------------------------------------------------------------
+
+@router.post("/import", response_model=UserImportReport)
+async def import_users_endpoint(
+    file: UploadFile = File(..., description="CSV (UTF-8, разделитель , ; или таб) или XLSX"),
+    group_id: Optional[int] = Query(None, description="Зачислить импортированных студентов в группу"),
+    batch_size: Optional[int] = Query(None, ge=1, le=2000, description="Строк в пакете вставки"),
+    session: AsyncSession = Depends(get_db),
+    _claims: dict = Depends(admin_only),
+):
+    """Массово создаёт пользователей из файла, с отчётом по каждой строке.
+
+    Args:
+        file (UploadFile): Файл с колонками username, full_name и
+            необязательными password, role, is_active.
+        group_id (int, optional): Группа для зачисления (студенты из файла,
+            включая уже существующих).
+        batch_size (int, optional): Размер пакета; по умолчанию USER_IMPORT_BATCH_SIZE.
+
+    Returns:
+        UserImportReport: Итоги и статус каждой строки (created / exists /
+            duplicate / invalid); сгенерированные пароли — в поле password.
+
+    Raises:
+        HTTPException: Нет обязательных колонок (422), группа не найдена (404).
+    """
+    logger.debug(f"Importing users from {file.filename} ({file.content_type}), group={group_id}")
+    records = read_records(file.file, file.filename, file.content_type)
+    rows = await import_users(session, records, group_id=group_id, batch_size=batch_size)
+    counts = {name: 0 for name in ("created", "exists", "duplicate", "invalid")}
+    for row in rows:
+        counts[row.status] += 1
+    return UserImportReport(
+        total=len(rows),
+        enrolled=sum(1 for row in rows if row.group in (ADDED, RESTORED)),
+        rows=rows,
+        **counts,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Export (объявлен до /{user_id}, иначе путь перехватывается им)
+# ---------------------------------------------------------------------------
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_users(
+    search: Optional[str] = Query(None, description="Поиск по логину или ФИО"),
+    role: Optional[str] = Query(None, description="Фильтр по роли (admin/student/teacher/all)"),
+    is_active: Optional[bool] = Query(None, description="Фильтр по статусу активности"),
+    format: ExportFormat = Query("csv", description="csv или ndjson"),
+    _claims: dict = Depends(admin_only),
+):
+    """Потоковый экспорт пользователей в CSV / NDJSON.
+
+    Args:
+        search (str, optional): Поиск по логину или ФИО.
+        role (str, optional): Фильтр по роли.
+        is_active (bool, optional): Фильтр по статусу активности.
+        format (str): ``csv`` (по умолчанию) или ``ndjson``.
+
+    Returns:
+        StreamingResponse: Файл, отдаваемый по мере чтения из БД.
+
+    Raises:
+        HTTPException: Неизвестная роль (422).
+    """
+    try:
+        role_filter = Role(role) if role and role != "all" else None
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Unknown role: {role}")
+    logger.debug(f"Exporting users: search={search}, role={role}, is_active={is_active}, format={format}")
+    return users_export(format, search=search, role=role_filter, is_active=is_active)
+
+
 # ---------------------------------------------------------------------------
 # Read (single)
 # ---------------------------------------------------------------------------
@@ -124,14 +212,19 @@ async def get_user_endpoint(
 
 @router.get("", response_model=List[UserReadSchema])
 async def list_users_endpoint(
-        role: Optional[Role] = Query(None, description="Filter by role (admin/student/teacher)"),
+    response: Response,
+    role: Optional[Role] = Query(None, description="Filter by role (admin/student/teacher)"),
+    search: Optional[str] = Query(None, min_length=1, description="Подстрока логина или ФИО"),
+    params: PageParams = Depends(page_params),
     session: AsyncSession = Depends(get_db),
     claims: dict = Depends(admin_or_teacher),
 ):
-    """Возвращает список пользователей с фильтром по роли.
+    """Возвращает список пользователей с фильтром по роли (постранично, по id).
 
     Args:
         role (Role, optional): Фильтр по роли. Defaults to None.
+        search (str, optional): Подстрока логина или ФИО. Defaults to None.
+        params (PageParams): ``limit`` / ``after`` / ``with_total``.
 
     Returns:
         List[UserReadSchema]: Список пользователей.
@@ -154,13 +247,14 @@ async def list_users_endpoint(
     if role is not None:
         stmt = stmt.where(User.role == role)
 
-    res = await session.execute(stmt)
-    users = list(res.scalars().all())
-    # logger.debug(f"Retrieved List of users: {[(users[i].username, users[i].full_name,
-    #                                            users[i].role, users[i].is_active, users[i].created_at,
-    #                                            users[i].last_login,) for i in range(len(users))]}")
-    logger.debug(f"Retrieved {len(users)} users")
-    return users
+    if search:
+        pattern = f"%{search}%"
+        stmt = stmt.where(or_(User.username.ilike(pattern), User.full_name.ilike(pattern)))
+
+    page = await paginate(session, stmt, [User.id], limit=params.limit, after=params.after, with_total=params.with_total)
+    set_page_headers(response, page)
+    logger.debug(f"Retrieved {len(page.items)} users")
+    return page.items
 
 
 # ---------------------------------------------------------------------------
@@ -188,10 +282,10 @@ async def update_user_endpoint(
     Raises:
         HTTPException: Если пользователь не найден (404).
     """
-    logger.debug(f"Updating user {user_id} with data: {user_data.model_dump()}")
+    logger.debug("Updating user {}: fields {}", user_id, sorted(user_data.model_fields_set))
     update_kwargs = user_data.model_dump(exclude_unset=True)
     if "password" in update_kwargs:
-        update_kwargs["password"] = pwd_context.hash(update_kwargs["password"])
+        update_kwargs["password"] = await hash_password(update_kwargs["password"])
     user = await update_item(session, User, user_id, **update_kwargs)
     logger.debug(f"User {user_id} updated")
     return user
@@ -243,7 +337,7 @@ async def reset_password_endpoint(
     """
     user = await get_item(session, User, user_id, is_archived=False)
     new_password = secrets.token_hex(8)
-    user.password = pwd_context.hash(new_password)
+    user.password = await hash_password(new_password)
     await session.commit()
     logger.info(f"Password reset for user {user_id}")
     return {"message": "Password reset successfully", "new_password": new_password}
@@ -271,19 +365,15 @@ async def bulk_update_roles(
         List[UserReadSchema]: Список обновленных пользователей.
 
     Raises:
-        HTTPException: Если запрос некорректен или роль недействительна (400).
+        HTTPException: Если запрос некорректен или роль недействительна (400),
+            какой-либо пользователь не найден (404) — тогда ничего не меняется.
     """
     user_ids = request.get("userIds")
     role = request.get("role")
-    if not user_ids or role not in Role.__members__:
+    if not user_ids or role not in {r.value for r in Role}:
         raise HTTPException(status_code=400, detail="Invalid request format or role")
-    users = []
-    for user_id in user_ids:
-        user = await get_item(session, User, user_id, is_archived=False)
-        user.role = Role(role)
-        await session.commit()
-        users.append(user)
-    return [UserReadSchema.model_validate(u) for u in users]
+    await bulk_update_users(session, user_ids, strict=True, role=Role(role))
+    return await _users_by_ids(session, user_ids)
 
 
 # ---------------------------------------------------------------------------
@@ -308,78 +398,57 @@ async def bulk_update_status(
         List[UserReadSchema]: Список обновленных пользователей.
 
     Raises:
-        HTTPException: Если isActive не булево (400).
+        HTTPException: Если isActive не булево (400), какой-либо пользователь
+            не найден (404) — тогда ничего не меняется.
     """
     user_ids = request.get("userIds")
     is_active = request.get("isActive")
     if not isinstance(is_active, bool):
         raise HTTPException(status_code=400, detail="isActive must be a boolean")
-    users = []
-    for user_id in user_ids:
-        user = await get_item(session, User, user_id, is_archived=False)
-        user.is_active = is_active
-        await session.commit()
-        users.append(user)
-    return [UserReadSchema.model_validate(u) for u in users]
-
+    if not user_ids:
+        raise HTTPException(status_code=400, detail="userIds must be a non-empty list")
+    await bulk_update_users(session, user_ids, strict=True, is_active=is_active)
+    return await _users_by_ids(session, user_ids)
 
-# ---------------------------------------------------------------------------
-# Export users (CSV)
-# ---------------------------------------------------------------------------
 
-@router.get("/export", response_class=FileResponse)
-async def export_users(
-        search: Optional[str] = Query(None, description="Поиск по имени пользователя"),
-        role: Optional[str] = Query(None, description="Фильтр по роли (admin/student/teacher/all)"),
-        is_active: Optional[bool] = Query(None, description="Фильтр по статусу активности"),
+@router.patch("/bulk", response_model=UserBulkResultRead)
+async def bulk_update_users_endpoint(
+    payload: UserBulkUpdateSchema,
     session: AsyncSession = Depends(get_db),
     _claims: dict = Depends(admin_only),
 ):
-    """Экспортирует данные пользователей в CSV.
+    """Массово меняет роль и/или активность одним UPDATE, с итогом по каждому ID.
 
     Args:
-        search (str, optional): Поиск по имени пользователя.
-        role (str, optional): Фильтр по роли.
-        is_active (bool, optional): Фильтр по статусу активности.
+        payload (UserBulkUpdateSchema): ID пользователей и новые значения.
 
     Returns:
-        FileResponse: Файл CSV с данными пользователей.
+        UserBulkResultRead: updated / not_found по каждому ID.
 
     Raises:
-        HTTPException: Если произошла ошибка экспорта (500).
+        HTTPException: Если не задано ни одно поле для изменения (400).
     """
-    stmt = select(User).where(User.is_archived == False)
-    if search:
-        stmt = stmt.where(User.username.ilike(f"%{search}%"))
-    if role and role != "all":
-        stmt = stmt.where(User.role == Role(role))
-    if is_active is not None:
-        stmt = stmt.where(User.is_active == is_active)
-
-    users = (await session.execute(stmt)).scalars().all()
-
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["ID", "Username", "FullName", "Role", "IsActive", "CreatedAt", "LastLogin"])
-    for user in users:
-        writer.writerow([
-            user.id,
-            user.username,
-            user.full_name,
-            user.role.value,
-            user.is_active,
-            user.created_at.isoformat() if user.created_at else "",
-            user.last_login.isoformat() if user.last_login else "",
-        ])
-    output.seek(0)
-
-    return FileResponse(
-        path=output.getvalue().encode(),
-        media_type="text/csv",
-        filename="users.csv",
+    values = payload.model_dump(exclude={"user_ids"}, exclude_none=True)
+    if not values:
+        raise HTTPException(status_code=400, detail="Nothing to update: set role and/or is_active")
+    results = await bulk_update_users(session, payload.user_ids, **values)
+    updated = sum(1 for outcome in results.values() if outcome == "updated")
+    return UserBulkResultRead(
+        updated=updated,
+        not_found=len(results) - updated,
+        results=[{"user_id": user_id, "status": outcome} for user_id, outcome in results.items()],
     )
 
 
+async def _users_by_ids(session: AsyncSession, user_ids: List[int]) -> List[UserReadSchema]:
+    res = await session.execute(select(User).where(User.id.in_(user_ids)).order_by(User.id))
+    return [UserReadSchema.model_validate(u) for u in res.scalars().all()]
+
+
+# ---------------------------------------------------------------------------
+# Archive / Restore
+# ---------------------------------------------------------------------------
+
 @router.post("/{user_id}/archive", status_code=status.HTTP_204_NO_CONTENT)
 async def archive_user_endpoint(
         user_id: int,
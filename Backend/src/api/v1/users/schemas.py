@@ -1,6 +1,6 @@
 # TestWise/Backend/src/api/v1/users/schemas.py
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field
+from typing import List, Literal, Optional
 from datetime import datetime
 
 from src.domain.enums import Role
@@ -50,4 +50,48 @@ class UserReadSchema(BaseModel):
     is_archived: bool
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class UserBulkUpdateSchema(BaseModel):
+    """Схема массового изменения пользователей (роль и/или активность)."""
+    user_ids: List[int] = Field(..., min_length=1)
+    role: Optional[Role] = None
+    is_active: Optional[bool] = None
+
+    class Config:
+        json_schema_extra = {
+            "example": {"user_ids": [1, 2, 3], "is_active": False}
+        }
+
+class UserBulkResult(BaseModel):
+    user_id: int
+    status: Literal["updated", "not_found"]
+
+class UserBulkResultRead(BaseModel):
+    """Итог массового изменения: по каждому ID."""
+    updated: int
+    not_found: int
+    results: List[UserBulkResult]
+
+class UserImportRowRead(BaseModel):
+    """Итог импорта одной строки файла."""
+    row: int
+    username: Optional[str] = None
+    status: Literal["created", "exists", "duplicate", "invalid"]
+    user_id: Optional[int] = None
+    detail: Optional[str] = None
+    password: Optional[str] = None  # только если пароль сгенерирован
+    group: Optional[str] = None  # added / restored / unchanged / wrong_role
+
+    class Config:
+        from_attributes = True
+
+class UserImportReport(BaseModel):
+    """Отчёт массового импорта пользователей."""
+    total: int
+    created: int
+    exists: int
+    duplicate: int
+    invalid: int
+    enrolled: int
+    rows: List[UserImportRowRead]
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+TestWise/Backend/src/cache/__init__.py
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+Versioned response cache (see ``src.cache.store``).
+"""
+
+from src.cache.store import (
+    bump,
+    cache_stats,
+    invalidate,
+    progress_scope,
+    responses,
+    scope_name,
+    versions,
+)
+
+__all__ = [
+    "bump",
+    "cache_stats",
+    "invalidate",
+    "progress_scope",
+    "responses",
+    "scope_name",
+    "versions",
+]
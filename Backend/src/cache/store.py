@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+TestWise/Backend/src/cache/store.py
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+Versioned response cache.
+
+Cached content is keyed by *scopes* — a table name (``"topics"``) or a
+narrower string such as ``"progress:42"`` (progress of user 42).  Each scope
+has a version counter; a cached entry is valid while the versions of all the
+scopes it was built from are unchanged, so nothing is ever deleted
+explicitly — a write just bumps the version.
+
+Writers call ``invalidate(session, *scopes)``.  Inside a transaction the
+scopes are remembered on the session and bumped right after ``COMMIT``
+(a rolled-back write bumps nothing, and no reader can cache pre-commit data
+under the new version); outside a transaction they are bumped at once.
+
+Version backends (``CACHE_BACKEND``):
+
+* ``memory`` — counters in this process; correct with a single worker;
+* ``sqlite`` — counters in a local SQLite file (``CACHE_PATH``) shared by
+  all worker processes on the host.
+
+Response bodies themselves are immutable for a given version set and are
+kept in a per-process LRU of ``CACHE_SIZE`` entries.
+"""
+
+from __future__ import annotations
+
+import secrets
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterable, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from src.config.logger import configure_logger
+from src.config.settings import settings
+
+logger = configure_logger()
+
+_SESSION_KEY = "cache_scopes"
+
+
+def scope_name(scope: Any) -> str:
+    """Имя области: модель → имя её таблицы, строка — как есть."""
+    return scope if isinstance(scope, str) else scope.__tablename__
+
+
+def progress_scope(user_id: int) -> str:
+    """Область прогресса одного пользователя (строки *_progress и оценки попыток)."""
+    return f"progress:{user_id}"
+
+
+# ---------------------------------------------------------------------------
+# Version backends
+# ---------------------------------------------------------------------------
+
+class MemoryVersionStore:
+    """Счётчики версий в памяти процесса."""
+
+    name = "memory"
+
+    def __init__(self) -> None:
+        # Эпоха отличает версии разных запусков: после рестарта счётчики
+        # начинаются заново, и старый ETag не должен совпасть с новым
+        self.epoch = secrets.token_hex(8)
+        self._versions: Dict[str, int] = {}
+
+    def get(self, scopes: Sequence[str]) -> Tuple[int, ...]:
+        return tuple(self._versions.get(scope, 0) for scope in scopes)
+
+    def bump(self, scopes: Iterable[str]) -> None:
+        for scope in scopes:
+            self._versions[scope] = self._versions.get(scope, 0) + 1
+
+
+class SqliteVersionStore:
+    """Счётчики версий в локальном файле SQLite, общие для воркеров хоста."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS versions (scope TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+        self._conn.execute(
+            "INSERT OR IGNORE INTO versions (scope, version) VALUES ('#epoch', ?)",
+            (int.from_bytes(secrets.token_bytes(6), "big"),),
+        )
+        self.epoch = str(self._conn.execute("SELECT version FROM versions WHERE scope = '#epoch'").fetchone()[0])
+
+    def get(self, scopes: Sequence[str]) -> Tuple[int, ...]:
+        with self._lock:
+            rows = dict(
+                self._conn.execute(
+                    f"SELECT scope, version FROM versions WHERE scope IN ({','.join('?' * len(scopes))})",
+                    list(scopes),
+                ).fetchall()
+            )
+        return tuple(rows.get(scope, 0) for scope in scopes)
+
+    def bump(self, scopes: Iterable[str]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO versions (scope, version) VALUES (?, 1) "
+                "ON CONFLICT(scope) DO UPDATE SET version = version + 1",
+                [(scope,) for scope in scopes],
+            )
+
+
+def _make_store():
+    if settings.cache_backend == "sqlite":
+        return SqliteVersionStore(settings.cache_path)
+    if settings.cache_backend != "memory":
+        logger.warning("Unknown CACHE_BACKEND {!r}, falling back to memory", settings.cache_backend)
+    return MemoryVersionStore()
+
+
+versions = _make_store()
+
+
+# ---------------------------------------------------------------------------
+# Invalidation
+# ---------------------------------------------------------------------------
+
+_stats = {"hits": 0, "misses": 0, "not_modified": 0, "bumps": 0}
+
+
+def bump(*scopes: Any) -> None:
+    names = {scope_name(scope) for scope in scopes}
+    if names:
+        versions.bump(sorted(names))
+        _stats["bumps"] += len(names)
+
+
+def invalidate(session: AsyncSession | Session, *scopes: Any) -> None:
+    """
+    Помечает области изменёнными: версии поднимаются после COMMIT текущей
+    транзакции сессии (или сразу, если транзакции нет).
+    """
+    sync_session = session.sync_session if isinstance(session, AsyncSession) else session
+    if not sync_session.in_transaction():
+        bump(*scopes)
+        return
+    sync_session.info.setdefault(_SESSION_KEY, set()).update(scope_name(scope) for scope in scopes)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_committed(session: Session) -> None:
+    scopes = session.info.pop(_SESSION_KEY, None)
+    if scopes:
+        bump(*scopes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(session: Session) -> None:
+    session.info.pop(_SESSION_KEY, None)
+
+
+# ---------------------------------------------------------------------------
+# Response bodies
+# ---------------------------------------------------------------------------
+
+class ResponseLRU:
+    """Ограниченный LRU готовых тел ответов."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._entries: OrderedDict[Hashable, bytes] = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        body = self._entries.get(key)
+        if body is not None:
+            self._entries.move_to_end(key)
+        return body
+
+    def put(self, key: Hashable, body: bytes) -> None:
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = body
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+responses = ResponseLRU(settings.cache_size)
+
+
+def record(outcome: str) -> None:
+    _stats[outcome] += 1
+
+
+def cache_stats() -> Dict[str, Any]:
+    return {
+        **_stats,
+        "enabled": settings.cache_enabled,
+        "backend": versions.name,
+        "size": len(responses),
+        "maxsize": responses.maxsize,
+    }
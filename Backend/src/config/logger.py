@@ -6,16 +6,83 @@ Setting up logging configuration with Loguru.
 
 This module configures a logger with file and console output, including custom
 formatting, rotation, and color schemes for different log levels.
+
+Sinks are installed once per process, however many modules call
+``configure_logger``.  Both sinks are queue-backed (``enqueue=True``), so the
+request path only pays for putting a record on a queue; file and console I/O
+happen on loguru's worker thread.  Levels are filtered per module
+(``LOG_LEVELS``), the file sink can emit JSON lines (``LOG_JSON``) and DEBUG
+records can be sampled (``LOG_DEBUG_SAMPLE_RATE`` or ``logger.bind(sample_rate=...)``).
 """
 
+import random
+import sys
 from pathlib import Path
+
 from loguru import logger
+
 from .settings import settings
 
+_configured = False
+
+_LOG_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | "
+    "<level>{level:<8}</level> | "
+    "<cyan>{name}:{function}:{line}</cyan> | "
+    "{extra[prefix]} <b>{message}</b>"
+)
+
+
+def _parse_module_levels(spec: str) -> dict[str, int]:
+    """
+    Parses ``"src.api=DEBUG,src.security=WARNING"`` into ``{module: level_no}``.
+    """
+    levels: dict[str, int] = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        module, level = (part.strip() for part in item.split("=", 1))
+        if module and level:
+            levels[module] = logger.level(level.upper()).no
+    return levels
+
+
+def _make_filter(default_level: int, module_levels: dict[str, int], sample_rate: float):
+    """
+    Builds a sink filter: the most specific module prefix wins, DEBUG records
+    are kept with probability ``sample_rate`` (overridable per call via
+    ``logger.bind(sample_rate=...)``).
+    """
+    # Длинные префиксы проверяем первыми, чтобы более точное правило побеждало
+    prefixes = sorted(module_levels.items(), key=lambda kv: len(kv[0]), reverse=True)
+    debug_no = logger.level("DEBUG").no
+
+    def _filter(record) -> bool:
+        name = record["name"] or ""
+        threshold = default_level
+        for prefix, level_no in prefixes:
+            if name == prefix or name.startswith(prefix + "."):
+                threshold = level_no
+                break
+        level_no = record["level"].no
+        if level_no < threshold:
+            return False
+        if level_no <= debug_no:
+            rate = record["extra"].get("sample_rate", sample_rate)
+            if rate < 1.0 and random.random() >= rate:
+                return False
+        return True
+
+    return _filter
+
+
 def configure_logger(prefix: str = "TESTWISE") -> logger:
     """
     Configures the Loguru logger with a specific prefix and color.
 
+    The sinks are installed on the first call only; later calls return the
+    already configured logger.
+
     Args:
         prefix (str): The prefix to include in log messages (default: "TESTWISE").
 
@@ -25,8 +92,27 @@ def configure_logger(prefix: str = "TESTWISE") -> logger:
     Exceptions:
         - IOError: If the log file cannot be created or written to.
     """
+    global _configured
+    if _configured:
+        return logger
+    _configured = True
+
     # Remove default handlers
     logger.remove()
+    logger.configure(extra={"prefix": prefix})
+
+    # Setting colors for log levels
+    logger.level("DEBUG", color="<blue>")
+    logger.level("INFO", color="<green>")
+    logger.level("WARNING", color="<yellow>")
+    logger.level("ERROR", color="<red>")
+    logger.level("CRITICAL", color="<magenta>")
+
+    module_levels = _parse_module_levels(settings.log_levels)
+    default_level = logger.level(settings.log_level.upper()).no
+    # Минимальный уровень синка — самый «болтливый» из настроенных, остальное решает фильтр
+    sink_level = min([default_level, *module_levels.values()])
+    log_filter = _make_filter(default_level, module_levels, settings.log_debug_sample_rate)
 
     # Ensure log directory exists
     log_path = Path(settings.log_dir)
@@ -35,36 +121,24 @@ def configure_logger(prefix: str = "TESTWISE") -> logger:
     # Add file handler
     logger.add(
         log_path / settings.log_file,
-        level="DEBUG",
-        format=(
-            "<green>{{time:YYYY-MM-DD HH:mm:ss.SSS}}</green> | "
-            "<b>{level:<8}</b> | "
-            "<cyan>{name}:{function}:{line}</cyan> | "
-            f"{prefix} <b>{{message}}</b>"
-        ),
+        level=sink_level,
+        filter=log_filter,
+        format=_LOG_FORMAT,
+        serialize=settings.log_json,
+        enqueue=settings.log_enqueue,
         rotation="10 MB",
         retention="30 days",
-        compression="zip"
+        compression="zip",
     )
 
     # Add console handler with level-specific colors
     logger.add(
-        sink=lambda msg: print(msg, end=""),
-        level="DEBUG",
-        format=(
-            "<green>{{time:YYYY-MM-DD HH:mm:ss.SSS}}</green> | "
-            "<level>{level:<8}</level> | "
-            "<cyan>{name}:{function}:{line}</cyan> | "
-            f"{prefix} <b>{{message}}</b>"
-        ),
+        sys.stderr,
+        level=sink_level,
+        filter=log_filter,
+        format=_LOG_FORMAT,
+        enqueue=settings.log_enqueue,
         colorize=True,  # Enabling color support
     )
 
-    # Setting colors for log levels
-    logger.level("DEBUG", color="<blue>")
-    logger.level("INFO", color="<green>")
-    logger.level("WARNING", color="<yellow>")
-    logger.level("ERROR", color="<red>")
-    logger.level("CRITICAL", color="<magenta>")
-
-    return logger
\ No newline at end of file
+    return logger
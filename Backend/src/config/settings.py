@@ -9,6 +9,7 @@ for Docker environments, providing a centralized settings management system.
 """
 
 from pathlib import Path
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 # Base directory for the project (TestWise/Backend/)
@@ -26,9 +27,66 @@ class Settings(BaseSettings):
     backup_dir: str = str(BASE_DIR / "backups")
     log_dir: str = str(BASE_DIR / "logs")
     log_file: str = "app.log"
+    log_level: str = "INFO"
+    log_levels: str = ""  # per-module overrides, e.g. "src.api=DEBUG,src.security=WARNING"
+    log_json: bool = False  # JSON lines in the log file
+    log_enqueue: bool = True  # write through loguru's background queue
+    log_debug_sample_rate: float = 1.0  # share of DEBUG records that are kept
     app_host: str = "0.0.0.0"
     app_port: int = 8000
 
+    # Verified-JWT cache (entries never outlive the token's own ``exp``)
+    jwt_cache_size: int = 4096
+    jwt_cache_ttl_seconds: int = 300
+
+    # Backups (SQLite online backup API, throttled)
+    backup_pages_per_step: int = 1024
+    backup_step_sleep_ms: int = 10
+    backup_max_restarts: int = 3  # then copy in one step (writes restart a stepped backup)
+    backup_compression: str = "none"  # none | gzip | zstd (needs zstandard)
+    backup_keep_last: int = 14  # 0 = keep all
+    backup_max_age_days: int = 0  # 0 = no age limit
+
+    # Password hashing (bcrypt runs in a dedicated thread pool)
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 4
+    password_hash_max_queue: int = 256  # 0 = unbounded
+
+    # Bulk user import (POST /users/import): rows per INSERT / hashing batch
+    user_import_batch_size: int = 500
+
+    # Attempt autosave: buffered answer deltas are written to the journal this often
+    autosave_flush_seconds: float = 2.0
+    # Write every PATCH straight to the journal instead of the per-process
+    # buffer; unset = on when WEB_CONCURRENCY > 1 (no worker affinity)
+    autosave_write_through: Optional[bool] = None
+    web_concurrency: int = 1  # uvicorn/gunicorn worker count (WEB_CONCURRENCY)
+
+    # Expiry sweeper: closes and auto-grades attempts past Test.duration
+    attempt_sweep_interval_seconds: int = 60  # 0 = disabled
+    attempt_sweep_batch_size: int = 500
+    attempt_sweep_grace_seconds: int = 30  # slack for submits sent right at the deadline
+
+    # Response cache: ETag / 304 for read-mostly content endpoints
+    cache_enabled: bool = True
+    cache_size: int = 2048  # response bodies kept per process
+    cache_backend: str = "memory"  # memory | sqlite (versions shared by workers on this host)
+    cache_path: str = str(BASE_DIR / "cache" / "versions.sqlite")
+
+    # Connection pool
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30  # seconds to wait for a free connection
+    db_pool_recycle: int = 1800  # seconds
+
+    # SQLite profile, applied to every new connection
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_cache_size: int = -64000  # negative = KiB, i.e. 64 MB per connection
+    sqlite_mmap_size: int = 268435456  # 256 MB
+    sqlite_busy_timeout: int = 5000  # ms
+    sqlite_temp_store: str = "MEMORY"
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         # Normalize DATABASE_URL for local environment
@@ -36,6 +94,14 @@ class Settings(BaseSettings):
             db_path = BASE_DIR / self.database_url.replace("sqlite+aiosqlite:///./", "")
             self.database_url = f"sqlite+aiosqlite:///{db_path.as_posix()}"
 
+    @property
+    def is_sqlite(self) -> bool:
+        return self.database_url.startswith("sqlite")
+
+    @property
+    def is_postgres(self) -> bool:
+        return self.database_url.startswith("postgresql")
+
     model_config = SettingsConfigDict(
         env_file=BASE_DIR / ENV_FILE,
         env_file_encoding="utf-8",
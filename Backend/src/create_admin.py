@@ -1,7 +1,6 @@
 import asyncio
 from datetime import datetime
 
-from passlib.context import CryptContext
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy import select
 from sqlalchemy.ext.declarative import declarative_base
@@ -9,9 +8,7 @@ from sqlalchemy.ext.declarative import declarative_base
 from src.config.settings import settings
 from src.domain.enums import Role
 from src.domain.models import Base, User
-
-# Настройка хеширования пароля
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from src.security.passwords import pwd_context
 
 def hash_password(password: str) -> str:
     """Хеширует пароль с использованием bcrypt."""
@@ -1,56 +1,461 @@
-# TestWise/Backend/src/utils/backup.py
+# TestWise/Backend/src/database/backup.py
 # -*- coding: utf-8 -*-
 """
 Этот модуль содержит функции для создания и восстановления бэкапов базы данных.
+
+Способ зависит от движка из ``DATABASE_URL``:
+
+* SQLite — онлайн-бэкап через ``sqlite3.Connection.backup`` (``backup_*.sqlite``).
+  Копирование идёт порциями по ``BACKUP_PAGES_PER_STEP`` страниц с паузой
+  ``BACKUP_STEP_SLEEP_MS`` между ними в отдельном потоке, поэтому снимок
+  консистентен даже при активной записи, а event loop не блокируется; если
+  запись перезапускает копирование больше ``BACKUP_MAX_RESTARTS`` раз, база
+  копируется одним шагом;
+* PostgreSQL — ``pg_dump`` в custom-формате (``backup_*.dump``) и ``pg_restore``.
+
+Для каждого бэкапа рядом пишется ``<файл>.sha256``. Файл SQLite можно сжать
+(``BACKUP_COMPRESSION=gzip|zstd``; для zstd нужен пакет ``zstandard``).
+После создания применяется политика хранения: ``BACKUP_KEEP_LAST`` последних
+файлов и не старше ``BACKUP_MAX_AGE_DAYS`` дней.
 """
 
-import aiofiles
+import asyncio
+import gzip
+import hashlib
 import os
 import shutil
-from datetime import datetime
-from src.core.logger import configure_logger
-from pathlib import Path
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from sqlalchemy.engine import make_url
+
+from src.config.logger import configure_logger
+from src.config.settings import settings
 
 logger = configure_logger()
 
-async def create_backup(db_path: str = "database.sqlite", backup_dir: str = "backups") -> str:
+try:  # optional dependency, only needed for BACKUP_COMPRESSION=zstd
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+_COMPRESSION_SUFFIXES = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+_BACKUP_PREFIX = "backup_"
+_BACKUP_EXTENSIONS = (".sqlite", ".sqlite.gz", ".sqlite.zst", ".dump")
+_CHUNK_SIZE = 1024 * 1024
+
+# Одновременно выполняется только один бэкап/восстановление
+_backup_lock = asyncio.Lock()
+
+
+# Последний фоновый бэкап, запущенный через API
+_job_task: asyncio.Task | None = None
+_job_state: Dict[str, Any] = {
+    "started_at": None,
+    "finished_at": None,
+    "last_backup": None,
+    "last_error": None,
+}
+
+
+def backup_in_progress() -> bool:
+    """Идёт ли сейчас создание или восстановление бэкапа."""
+    return _backup_lock.locked()
+
+
+def _sqlite_db_path() -> str:
+    """Путь к файлу SQLite из ``DATABASE_URL``."""
+    return make_url(settings.database_url).database
+
+
+def _pg_connection() -> tuple[list[str], dict[str, str]]:
+    """
+    Аргументы подключения для pg_dump/pg_restore.
+
+    Пароль передаётся через ``PGPASSWORD``, чтобы не светить его в списке процессов.
+    """
+    url = make_url(settings.database_url)
+    args = ["--dbname", url.database or ""]
+    if url.host:
+        args += ["--host", url.host]
+    if url.port:
+        args += ["--port", str(url.port)]
+    if url.username:
+        args += ["--username", url.username]
+    env = dict(os.environ)
+    if url.password:
+        env["PGPASSWORD"] = url.password
+    return args, env
+
+
+async def _run_pg_tool(*args: str, env: dict[str, str]) -> None:
+    """Запускает pg_dump/pg_restore без блокировки event loop."""
+    proc = await asyncio.create_subprocess_exec(
+        *args,
+        env=env,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    _, stderr = await proc.communicate()
+    if proc.returncode != 0:
+        message = stderr.decode(errors="replace").strip()
+        logger.error(f"{args[0]} завершился с кодом {proc.returncode}: {message}")
+        raise OSError(f"{args[0]} завершился с ошибкой: {message}")
+
+
+# ---------------------------------------------------------------------------
+# Blocking helpers (выполняются в рабочем потоке)
+# ---------------------------------------------------------------------------
+
+class _BackupRestarted(Exception):
+    """Пошаговое копирование слишком часто начиналось заново."""
+
+
+def _online_backup(src_path: str, dest_path: str) -> int:
+    """
+    Копирует базу через SQLite online backup API порциями страниц.
+
+    Между шагами поток засыпает на ``BACKUP_STEP_SLEEP_MS``, отдавая диск и
+    блокировки обычным запросам. Запись в базу другим соединением заставляет
+    SQLite начать копирование с первой страницы; после
+    ``BACKUP_MAX_RESTARTS`` таких перезапусков база копируется одним шагом
+    (``pages=-1``) под блокировкой чтения — иначе при постоянной записи
+    бэкап большой базы мог бы не закончиться никогда. Возвращает число
+    скопированных страниц.
+    """
+    pages = max(1, settings.backup_pages_per_step)
+    pause = settings.backup_step_sleep_ms / 1000
+    copied = 0
+    restarts = 0
+    last_remaining = None
+
+    def progress(status: int, remaining: int, total: int) -> None:
+        nonlocal copied, restarts, last_remaining
+        copied = total - remaining
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > settings.backup_max_restarts:
+                raise _BackupRestarted
+        last_remaining = remaining
+        if remaining and pause:
+            time.sleep(pause)
+
+    src = sqlite3.connect(src_path)
+    dest = sqlite3.connect(dest_path)
+    try:
+        try:
+            src.backup(dest, pages=pages, progress=progress)
+        except _BackupRestarted:
+            logger.warning(
+                f"Бэкап {src_path} перезапускался {restarts} раз из-за записи — копируем одним шагом"
+            )
+            src.backup(dest, pages=-1)
+            copied = src.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        dest.close()
+        src.close()
+    return copied
+
+
+def _compress(src_path: str, dest_path: str, compression: str) -> None:
+    """Сжимает файл потоково (gzip или zstd)."""
+    with open(src_path, "rb") as src:
+        if compression == "gzip":
+            with gzip.open(dest_path, "wb", compresslevel=6) as dest:
+                shutil.copyfileobj(src, dest, _CHUNK_SIZE)
+        else:
+            with open(dest_path, "wb") as raw:
+                with zstandard.ZstdCompressor(level=3, threads=-1).stream_writer(raw) as dest:
+                    shutil.copyfileobj(src, dest, _CHUNK_SIZE)
+
+
+def _decompress(src_path: str, dest_path: str) -> None:
+    """Распаковывает ``.gz``/``.zst`` бэкап во временный файл."""
+    with open(dest_path, "wb") as dest:
+        if src_path.endswith(".gz"):
+            with gzip.open(src_path, "rb") as src:
+                shutil.copyfileobj(src, dest, _CHUNK_SIZE)
+        else:
+            if zstandard is None:
+                raise OSError("Для распаковки .zst нужен пакет zstandard")
+            with open(src_path, "rb") as raw:
+                with zstandard.ZstdDecompressor().stream_reader(raw) as src:
+                    shutil.copyfileobj(src, dest, _CHUNK_SIZE)
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_checksum(path: str) -> str:
+    """Пишет ``<файл>.sha256`` в формате ``sha256sum``."""
+    checksum = _sha256(path)
+    with open(f"{path}.sha256", "w", encoding="utf-8") as f:
+        f.write(f"{checksum}  {os.path.basename(path)}\n")
+    return checksum
+
+
+def _read_checksum(path: str) -> str | None:
+    try:
+        with open(f"{path}.sha256", encoding="utf-8") as f:
+            return f.read().split()[0]
+    except (OSError, IndexError):
+        return None
+
+
+def _verify_checksum(path: str) -> None:
+    expected = _read_checksum(path)
+    if expected is not None and expected != _sha256(path):
+        logger.error(f"Контрольная сумма бэкапа {path} не совпадает")
+        raise OSError(f"Контрольная сумма бэкапа {path} не совпадает")
+
+
+def _create_sqlite_backup(db_path: str, backup_path: str, compression: str) -> int:
+    """Онлайн-бэкап + сжатие во временные файлы, затем атомарное переименование."""
+    backup_dir = os.path.dirname(backup_path)
+    fd, raw_path = tempfile.mkstemp(prefix=".backup_", suffix=".partial", dir=backup_dir)
+    os.close(fd)
+    try:
+        pages = _online_backup(db_path, raw_path)
+        if compression == "none":
+            os.replace(raw_path, backup_path)
+        else:
+            partial = f"{backup_path}.partial"
+            try:
+                _compress(raw_path, partial, compression)
+                os.replace(partial, backup_path)
+            finally:
+                if os.path.exists(partial):
+                    os.remove(partial)
+        _write_checksum(backup_path)
+        return pages
+    finally:
+        if os.path.exists(raw_path):
+            os.remove(raw_path)
+
+
+def _restore_sqlite_backup(backup_path: str, db_path: str) -> None:
+    """Проверяет бэкап и переносит его в рабочую базу через online backup API."""
+    _verify_checksum(backup_path)
+    temp_path = None
+    source = backup_path
+    if backup_path.endswith((".gz", ".zst")):
+        fd, temp_path = tempfile.mkstemp(suffix=".sqlite")
+        os.close(fd)
+        _decompress(backup_path, temp_path)
+        source = temp_path
+    try:
+        # Проверяем, является ли файл SQLite-базой
+        with open(source, "rb") as f:
+            header = f.read(16)
+        if not header.startswith(b"SQLite format 3"):
+            logger.error(f"Файл {backup_path} не является SQLite-базой")
+            raise OSError(f"Файл {backup_path} не является SQLite-базой")
+        _online_backup(source, db_path)
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _unique_backup_path(backup_dir: str, timestamp: str, extension: str) -> str:
+    """``backup_<timestamp><ext>``; если такой файл уже есть (тот же момент), добавляет ``_N``."""
+    path = os.path.join(backup_dir, f"{_BACKUP_PREFIX}{timestamp}{extension}")
+    counter = 1
+    while os.path.exists(path):
+        path = os.path.join(backup_dir, f"{_BACKUP_PREFIX}{timestamp}_{counter}{extension}")
+        counter += 1
+    return path
+
+
+def _is_backup_file(name: str) -> bool:
+    return name.startswith(_BACKUP_PREFIX) and name.endswith(_BACKUP_EXTENSIONS)
+
+
+def _apply_retention(backup_dir: str) -> List[str]:
+    """Удаляет бэкапы сверх ``BACKUP_KEEP_LAST`` и старше ``BACKUP_MAX_AGE_DAYS``."""
+    entries = sorted(
+        (entry for entry in os.scandir(backup_dir) if entry.is_file() and _is_backup_file(entry.name)),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True,
+    )
+    cutoff = None
+    if settings.backup_max_age_days > 0:
+        cutoff = (datetime.now() - timedelta(days=settings.backup_max_age_days)).timestamp()
+
+    removed = []
+    for index, entry in enumerate(entries):
+        too_many = settings.backup_keep_last > 0 and index >= settings.backup_keep_last
+        too_old = cutoff is not None and entry.stat().st_mtime < cutoff
+        # Самый свежий бэкап не удаляем никогда
+        if index > 0 and (too_many or too_old):
+            for path in (entry.path, f"{entry.path}.sha256"):
+                if os.path.exists(path):
+                    os.remove(path)
+            removed.append(entry.name)
+    if removed:
+        logger.info(f"Удалены старые бэкапы: {', '.join(removed)}")
+    return removed
+
+
+def _describe(path: str) -> Dict[str, Any]:
+    stat = os.stat(path)
+    name = os.path.basename(path)
+    if name.endswith(".gz"):
+        compression = "gzip"
+    elif name.endswith(".zst"):
+        compression = "zstd"
+    else:
+        compression = "none"
+    return {
+        "name": name,
+        "path": path,
+        "size_bytes": stat.st_size,
+        "created_at": datetime.fromtimestamp(stat.st_mtime),
+        "compression": compression,
+        "sha256": _read_checksum(path),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+async def create_backup(
+    db_path: str | None = None,
+    backup_dir: str = settings.backup_dir,
+    compression: str | None = None,
+) -> str:
     """
-    Создает бэкап базы данных SQLite.
+    Создает бэкап базы данных.
 
     Аргументы:
-        db_path (str): Путь к текущей базе данных.
+        db_path (str, optional): Путь к базе SQLite (по умолчанию — из ``DATABASE_URL``).
+            Для PostgreSQL игнорируется.
         backup_dir (str): Директория для хранения бэкапов.
+        compression (str, optional): ``none``, ``gzip`` или ``zstd``
+            (по умолчанию — ``BACKUP_COMPRESSION``). Для PostgreSQL игнорируется.
 
     Возвращает:
         str: Путь к созданному бэкап-файлу.
 
     Исключения:
         - FileNotFoundError: Если база данных не найдена.
+        - ValueError: Если способ сжатия не поддерживается.
         - OSError: Если не удалось создать бэкап.
     """
+    async with _backup_lock:
+        return await _create_backup_locked(db_path, backup_dir, compression)
+
+
+async def _create_backup_locked(
+    db_path: str | None,
+    backup_dir: str,
+    compression: str | None,
+    apply_retention: bool = True,
+) -> str:
+    os.makedirs(backup_dir, exist_ok=True)
+    timestamp = datetime.utcnow().strftime("%Y-%m-%d_%H-%M-%S")
+
+    if settings.is_postgres:
+        backup_path = _unique_backup_path(backup_dir, timestamp, ".dump")
+        args, env = _pg_connection()
+        await _run_pg_tool("pg_dump", "--format=custom", "--file", backup_path, *args, env=env)
+        await asyncio.to_thread(_write_checksum, backup_path)
+        if apply_retention:
+            await asyncio.to_thread(_apply_retention, backup_dir)
+        logger.info(f"Бэкап создан: {backup_path}")
+        return backup_path
+
+    compression = (compression or settings.backup_compression).lower()
+    if compression not in _COMPRESSION_SUFFIXES:
+        raise ValueError(f"Неизвестный способ сжатия: {compression}")
+    if compression == "zstd" and zstandard is None:
+        raise ValueError("Для сжатия zstd установите пакет zstandard")
+
+    db_path = db_path or _sqlite_db_path()
     if not os.path.exists(db_path):
         logger.error(f"База данных {db_path} не найдена")
         raise FileNotFoundError(f"База данных {db_path} не найдена")
 
-    os.makedirs(backup_dir, exist_ok=True)
-    timestamp = datetime.utcnow().strftime("%Y-%m-%d_%H-%M-%S")
-    backup_path = os.path.join(backup_dir, f"backup_{timestamp}.sqlite")
+    backup_path = _unique_backup_path(backup_dir, timestamp, f".sqlite{_COMPRESSION_SUFFIXES[compression]}")
 
     try:
-        shutil.copy(db_path, backup_path)
-        logger.info(f"Бэкап создан: {backup_path}")
+        started = time.perf_counter()
+        pages = await asyncio.to_thread(_create_sqlite_backup, db_path, backup_path, compression)
+        if apply_retention:
+            await asyncio.to_thread(_apply_retention, backup_dir)
+        logger.info(
+            f"Бэкап создан: {backup_path} ({pages} страниц, {time.perf_counter() - started:.1f} с)"
+        )
         return backup_path
-    except OSError as e:
+    except (OSError, sqlite3.Error) as e:
         logger.error(f"Ошибка при создании бэкапа: {str(e)}")
         raise OSError(f"Не удалось создать бэкап: {str(e)}")
 
-async def restore_backup(backup_path: str, db_path: str = "database.sqlite") -> None:
+
+async def list_backups(backup_dir: str = settings.backup_dir) -> List[Dict[str, Any]]:
+    """
+    Возвращает список бэкапов (новые первыми) с размером, сжатием и контрольной суммой.
+    """
+    def _scan() -> List[Dict[str, Any]]:
+        if not os.path.isdir(backup_dir):
+            return []
+        paths = [
+            os.path.join(backup_dir, name)
+            for name in os.listdir(backup_dir)
+            if _is_backup_file(name)
+        ]
+        return sorted((_describe(path) for path in paths), key=lambda b: b["created_at"], reverse=True)
+
+    return await asyncio.to_thread(_scan)
+
+
+def backup_job_status() -> Dict[str, Any]:
+    """Состояние фонового бэкапа, запущенного через ``start_backup_job``."""
+    return {**_job_state, "in_progress": backup_in_progress()}
+
+
+def start_backup_job(compression: str | None = None) -> bool:
+    """
+    Запускает бэкап фоновой задачей (для больших баз HTTP-запрос не ждёт копирования).
+
+    Возвращает ``False``, если бэкап или восстановление уже выполняется.
+    """
+    global _job_task
+    if backup_in_progress() or (_job_task is not None and not _job_task.done()):
+        return False
+
+    async def _job() -> None:
+        _job_state.update(started_at=datetime.now(), finished_at=None, last_error=None)
+        try:
+            path = await create_backup(compression=compression)
+            _job_state["last_backup"] = os.path.basename(path)
+        except Exception as e:
+            _job_state["last_error"] = str(e)
+            logger.error(f"Фоновый бэкап завершился ошибкой: {str(e)}")
+        finally:
+            _job_state["finished_at"] = datetime.now()
+
+    _job_task = asyncio.create_task(_job())
+    return True
+
+
+async def restore_backup(backup_path: str, db_path: str | None = None) -> None:
     """
     Восстанавливает базу данных из бэкапа.
 
     Аргументы:
-        backup_path (str): Путь к файлу бэкапа.
-        db_path (str): Путь к текущей базе данных.
+        backup_path (str): Путь к файлу бэкапа (``.sqlite``, ``.sqlite.gz``,
+            ``.sqlite.zst`` или ``.dump``).
+        db_path (str, optional): Путь к базе SQLite (по умолчанию — из ``DATABASE_URL``).
+            Для PostgreSQL игнорируется.
 
     Исключения:
         - FileNotFoundError: Если файл бэкапа не найден.
@@ -60,29 +465,32 @@ async def restore_backup(backup_path: str, db_path: str = "database.sqlite") ->
         logger.error(f"Файл бэкапа {backup_path} не найден")
         raise FileNotFoundError(f"Файл бэкапа {backup_path} не найден")
 
-    # Проверяем, является ли файл SQLite-базой
-    try:
-        with open(backup_path, "rb") as f:
-            header = f.read(16).decode("utf-8")
-            if not header.startswith("SQLite format 3"):
-                logger.error(f"Файл {backup_path} не является SQLite-базой")
-                raise OSError(f"Файл {backup_path} не является SQLite-базой")
-    except Exception as e:
-        logger.error(f"Ошибка проверки файла бэкапа: {str(e)}")
-        raise OSError(f"Невалидный файл бэкапа: {str(e)}")
-
-    # Создаем бэкап текущей БД перед восстановлением
-    try:
-        if os.path.exists(db_path):
-            await create_backup(db_path, "backups")
-    except Exception as e:
-        logger.error(f"Ошибка при создании бэкапа текущей БД: {str(e)}")
-        raise OSError(f"Не удалось создать бэкап текущей БД: {str(e)}")
+    async with _backup_lock:
+        if settings.is_postgres:
+            await asyncio.to_thread(_verify_checksum, backup_path)
+            # Создаем бэкап текущей БД перед восстановлением (без чистки — восстанавливаемый файл может быть старым)
+            await _create_backup_locked(None, settings.backup_dir, None, apply_retention=False)
+            args, env = _pg_connection()
+            await _run_pg_tool(
+                "pg_restore", "--clean", "--if-exists", "--no-owner", *args, backup_path, env=env
+            )
+            logger.info(f"База данных восстановлена из {backup_path}")
+            return
 
-    # Восстанавливаем бэкап
-    try:
-        shutil.copy(backup_path, db_path)
-        logger.info(f"База данных восстановлена из {backup_path}")
-    except OSError as e:
-        logger.error(f"Ошибка при восстановлении бэкапа: {str(e)}")
-        raise OSError(f"Не удалось восстановить бэкап: {str(e)}")
\ No newline at end of file
+        db_path = db_path or _sqlite_db_path()
+
+        # Создаем бэкап текущей БД перед восстановлением
+        try:
+            if os.path.exists(db_path):
+                await _create_backup_locked(db_path, settings.backup_dir, None, apply_retention=False)
+        except Exception as e:
+            logger.error(f"Ошибка при создании бэкапа текущей БД: {str(e)}")
+            raise OSError(f"Не удалось создать бэкап текущей БД: {str(e)}")
+
+        # Восстанавливаем бэкап
+        try:
+            await asyncio.to_thread(_restore_sqlite_backup, backup_path, db_path)
+            logger.info(f"База данных восстановлена из {backup_path}")
+        except (OSError, sqlite3.Error) as e:
+            logger.error(f"Ошибка при восстановлении бэкапа: {str(e)}")
+            raise OSError(f"Не удалось восстановить бэкап: {str(e)}")
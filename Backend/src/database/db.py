@@ -2,19 +2,62 @@
 """
 TestWise/Backend/src/database/db.py
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-This module configures the database connection for the TestWise application using SQLAlchemy with an asynchronous SQLite driver.
+This module configures the database connection for the TestWise application using SQLAlchemy with an asynchronous driver
+(aiosqlite by default, asyncpg when ``DATABASE_URL`` starts with ``postgresql+asyncpg://``).
 It provides an async engine, session factory, and dependency for FastAPI to manage database sessions.
+
+Every new SQLite connection gets the production profile from ``Settings``
+(WAL journal, ``synchronous``, cache/mmap sizes, busy timeout, temp store)
+through a connect-event hook, and the connection pool is sized explicitly.
 """
 
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Dict
 
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 
 from src.config.settings import settings
 from src.domain.models import Base
 
-# Create async engine for SQLite
-engine = create_async_engine(settings.database_url, echo=False)
+
+def _sqlite_pragmas() -> Dict[str, Any]:
+    """PRAGMA values applied on connect, in the order they must be set."""
+    return {
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "busy_timeout": settings.sqlite_busy_timeout,
+        "cache_size": settings.sqlite_cache_size,
+        "mmap_size": settings.sqlite_mmap_size,
+        "temp_store": settings.sqlite_temp_store,
+    }
+
+
+def _engine_options() -> Dict[str, Any]:
+    """Pool sizing; in-memory SQLite keeps the dialect's default single-connection pool."""
+    if settings.is_sqlite and ":memory:" in settings.database_url:
+        return {}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": True,
+    }
+
+
+# Create async engine (SQLite or PostgreSQL, chosen by DATABASE_URL)
+engine = create_async_engine(settings.database_url, echo=False, **_engine_options())
+
+if settings.is_sqlite:
+    @event.listens_for(engine.sync_engine, "connect")
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+        """Apply the configured SQLite profile to a freshly opened connection."""
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in _sqlite_pragmas().items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
 
 # Create async session factory
 SessionLocal = async_sessionmaker(
@@ -44,4 +87,30 @@ async def init_db() -> None:
     """
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
-        Base.registry.configure()  # Explicitly configure mappers
\ No newline at end of file
+        Base.registry.configure()  # Explicitly configure mappers
+
+
+async def get_database_diagnostics() -> Dict[str, Any]:
+    """
+    Reports the active engine profile: dialect, pool state and, for SQLite,
+    the PRAGMA values as seen by a live pooled connection.
+    """
+    pool = engine.pool
+    diagnostics: Dict[str, Any] = {
+        "dialect": engine.dialect.name,
+        "driver": engine.dialect.driver,
+        "pool": {
+            "class": type(pool).__name__,
+            "status": pool.status(),
+            "size": getattr(pool, "size", lambda: None)(),
+            "checked_out": getattr(pool, "checkedout", lambda: None)(),
+            "overflow": getattr(pool, "overflow", lambda: None)(),
+        },
+        "pragmas": {},
+    }
+    if settings.is_sqlite:
+        async with engine.connect() as conn:
+            for name in _sqlite_pragmas():
+                res = await conn.exec_driver_sql(f"PRAGMA {name}")
+                diagnostics["pragmas"][name] = res.scalar()
+    return diagnostics
@@ -17,10 +17,13 @@ from sqlalchemy import (
     Enum,
     Float,
     ForeignKey,
+    Index,
     Integer,
     JSON,
     String,
+    text,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import declarative_base, relationship
 
 from src.domain.enums import (
@@ -34,6 +37,9 @@ from src.domain.enums import (
 
 Base = declarative_base()
 
+# Plain JSON on SQLite, binary JSONB on PostgreSQL
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
 
 # ---------------------------------------------------------------------------
 # Core domain models
@@ -240,8 +246,8 @@ class Question(Base):
     test_id = Column(Integer, ForeignKey("tests.id"), nullable=False, index=True)
     question = Column(String, nullable=False)
     question_type = Column(Enum(QuestionType), nullable=False)
-    options = Column(JSON, nullable=True)
-    correct_answer = Column(JSON, nullable=True)
+    options = Column(JSONType, nullable=True)
+    correct_answer = Column(JSONType, nullable=True)
     hint = Column(String, nullable=True)
     is_final = Column(Boolean, default=False)
     image = Column(String, nullable=True)
@@ -251,6 +257,11 @@ class Question(Base):
 
     test = relationship("Test", back_populates="questions")
 
+    __table_args__ = (
+        # Покрывающий индекс для банка вопросов: выборка id без чтения JSON
+        Index("ix_questions_bank", "test_id", "is_final", "id", "question_type"),
+    )
+
     def __repr__(self) -> str:
         return f"<Question(id={self.id}, test_id={self.test_id})>"
 
@@ -274,6 +285,10 @@ class TopicProgress(Base):
     user = relationship("User", back_populates="topic_progress")
     topic = relationship("Topic", back_populates="progress")
 
+    __table_args__ = (
+        Index("ix_topic_progress_user_topic", "user_id", "topic_id", unique=True),
+    )
+
 
 class SectionProgress(Base):
     __tablename__ = "section_progress"
@@ -283,6 +298,9 @@ class SectionProgress(Base):
     section_id = Column(Integer, ForeignKey("sections.id"), nullable=False, index=True)
     status = Column(Enum(ProgressStatus), default=ProgressStatus.STARTED, nullable=False)
     completion_percentage = Column(Float, default=0.0)
+    # Counters maintained incrementally by the progress engine
+    viewed_subsections = Column(Integer, default=0, nullable=False)
+    final_passed = Column(Boolean, default=False, nullable=False)
     last_accessed = Column(DateTime, default=datetime.now)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, onupdate=datetime.now)
@@ -290,6 +308,10 @@ class SectionProgress(Base):
     user = relationship("User", back_populates="section_progress")
     section = relationship("Section", back_populates="progress")
 
+    __table_args__ = (
+        Index("ix_section_progress_user_section", "user_id", "section_id", unique=True),
+    )
+
 
 class SubsectionProgress(Base):
     __tablename__ = "subsection_progress"
@@ -305,6 +327,10 @@ class SubsectionProgress(Base):
     user = relationship("User", back_populates="subsection_progress")
     subsection = relationship("Subsection", back_populates="progress")
 
+    __table_args__ = (
+        Index("ix_subsection_progress_user_subsection", "user_id", "subsection_id", unique=True),
+    )
+
 
 class TestAttempt(Base):
     __tablename__ = "test_attempts"
@@ -315,12 +341,62 @@ class TestAttempt(Base):
     attempt_number = Column(Integer, nullable=False, default=1)
     score = Column(Float, nullable=True)
     time_spent = Column(Integer, nullable=True)
-    answers = Column(JSON, nullable=True)
+    answers = Column(JSONType, nullable=True)
     started_at = Column(DateTime, default=datetime.now)
     completed_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, onupdate=datetime.now)
     is_archived = Column(Boolean, default=False)
+    # Ключи идемпотентности клиентских запросов /start и /submit
+    idempotency_key = Column(String(64), nullable=True)
+    submit_idempotency_key = Column(String(64), nullable=True)
 
     user = relationship("User", back_populates="test_attempts")
     test = relationship("Test", back_populates="attempts")
+    answer_journal = relationship(
+        "AttemptAnswer", back_populates="attempt", cascade="all, delete-orphan", passive_deletes=True
+    )
+
+    __table_args__ = (
+        Index("ix_test_attempts_user_test_started", "user_id", "test_id", "started_at"),
+        # Номер попытки выдаётся вставкой; уникальность отсекает гонки
+        Index("ix_test_attempts_user_test_number", "user_id", "test_id", "attempt_number", unique=True),
+        # Не более одной открытой попытки на пользователя и тест
+        Index(
+            "ix_test_attempts_open",
+            "user_id",
+            "test_id",
+            unique=True,
+            sqlite_where=text("completed_at IS NULL"),
+            postgresql_where=text("completed_at IS NULL"),
+        ),
+        Index("ix_test_attempts_user_idempotency", "user_id", "idempotency_key", unique=True),
+        # Сборщик просроченных попыток читает только открытые, по времени старта
+        Index(
+            "ix_test_attempts_open_started",
+            "started_at",
+            sqlite_where=text("completed_at IS NULL"),
+            postgresql_where=text("completed_at IS NULL"),
+        ),
+    )
+
+
+class AttemptAnswer(Base):
+    """
+    Журнал автосохранения ответов: каждая строка — дельта ответа на один
+    вопрос открытой попытки. Только добавление; действует последняя запись
+    по вопросу. При отправке попытки журнал сворачивается в TestAttempt.answers.
+    """
+    __tablename__ = "attempt_answers"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    attempt_id = Column(Integer, ForeignKey("test_attempts.id", ondelete="CASCADE"), nullable=False)
+    question_id = Column(Integer, nullable=False)
+    answer = Column(JSONType, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+
+    attempt = relationship("TestAttempt", back_populates="answer_journal")
+
+    __table_args__ = (
+        Index("ix_attempt_answers_attempt", "attempt_id", "id"),
+    )
@@ -18,6 +18,10 @@ from src.api.v1.tests import router as tests_router
 from src.api.v1.topics import router as topics_router
 from src.api.v1.users import router as users_router
 from src.api.v1.profile import router as profile_router
+from src.api.v1.system import router as system_router
+from src.security.passwords import shutdown_password_hasher
+from src.service.autosave import start_autosave_flusher, stop_autosave_flusher
+from src.service.expiry import start_expiry_sweeper, stop_expiry_sweeper
 from src.config.logger import configure_logger
 
 from src.database.db import init_db
@@ -42,7 +46,8 @@ app.add_middleware(
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["Authorization", "Content-Type"],
+    allow_headers=["Authorization", "Content-Type", "Idempotency-Key"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag"],
 )
 
 logger = configure_logger()
@@ -58,12 +63,24 @@ app.include_router(questions_router, prefix="/api/v1/questions", tags=["question
 app.include_router(progress_router, prefix="/api/v1/progress", tags=["progress"])
 app.include_router(profile_router, prefix="/api/v1/profile", tags=["profile"])
 app.include_router(tests_router, prefix="/api/v1/tests", tags=["tests"])
+app.include_router(system_router, prefix="/api/v1/system", tags=["system"])
 
 @app.on_event("startup")
 async def startup_event():
     logger.info("Запуск TestWise API")
     await init_db()
     logger.info("База данных инициализирована")
+    start_autosave_flusher()
+    start_expiry_sweeper()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await stop_expiry_sweeper()
+    await stop_autosave_flusher()
+    shutdown_password_hasher()
+    logger.info("Остановка TestWise API")
+    # Дописываем записи, оставшиеся в очереди логгера
+    await logger.complete()
 
 @app.get("/")
 async def root():
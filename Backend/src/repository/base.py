@@ -11,15 +11,23 @@ for unit testing simplicity.
 
 from __future__ import annotations
 
-from typing import Any, Type, TypeVar
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from typing import Any, Generic, Sequence, Type, TypeVar
 
-from sqlalchemy import select
+from sqlalchemy import Select, func, select, tuple_
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.base import ExecutableOption
 
+from src.cache import invalidate
 from src.config.logger import configure_logger
 from src.domain.models import Base
-from src.utils.exceptions import ConflictError, NotFoundError
+from src.utils.exceptions import ConflictError, NotFoundError, ValidationError
 
 T = TypeVar("T", bound=Base)
 
@@ -29,9 +37,26 @@ logger = configure_logger()
 # Generic helpers
 # ---------------------------------------------------------------------------
 
-async def get_item(session: AsyncSession, model: Type[T], item_id: Any, is_archived: bool = False) -> T:
-    """Retrieve a single item by ID, optionally filtered by archive status."""
-    stmt = select(model).where(model.id == item_id, model.is_archived == is_archived)
+def dialect_insert(session: AsyncSession, model: Type[T]):
+    """Return an INSERT for the session's dialect, supporting ``on_conflict_do_*``."""
+    if session.bind.dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+async def get_item(
+    session: AsyncSession,
+    model: Type[T],
+    item_id: Any,
+    is_archived: bool = False,
+    load_options: Sequence[ExecutableOption] = (),
+) -> T:
+    """Retrieve a single item by ID, optionally filtered by archive status.
+
+    ``load_options`` (``selectinload(...)``, ``load_only(...)`` …) are applied
+    to the query: relationships used after an ``AsyncSession`` read must be
+    loaded eagerly, a lazy load there raises ``MissingGreenlet``.
+    """
+    stmt = select(model).where(model.id == item_id, model.is_archived == is_archived).options(*load_options)
     result = await session.execute(stmt)
     item = result.scalar_one_or_none()
     if not item:
@@ -42,13 +67,14 @@ async def create_item(session: AsyncSession, model: Type[T], **kwargs) -> T:
     """Create a new item with the given attributes."""
     item = model(**kwargs)
     session.add(item)
+    invalidate(session, model)
     try:
         await session.commit()
         await session.refresh(item)
-        logger.info("Created %s with ID %s", model.__name__, item.id)
+        logger.info("Created {} with ID {}", model.__name__, sa_inspect(item).identity)
     except IntegrityError as exc:
         await session.rollback()
-        logger.error("Failed to create %s: %s", model.__name__, exc.orig)
+        logger.error("Failed to create {}: {}", model.__name__, exc.orig)
         raise ConflictError(detail=str(exc.orig))
     return item
 
@@ -58,13 +84,14 @@ async def update_item(session: AsyncSession, model: Type[T], item_id: Any, **kwa
     for key, value in kwargs.items():
         if hasattr(item, key):
             setattr(item, key, value)  # Corrected to use key and value
+    invalidate(session, model)
     try:
         await session.commit()
         await session.refresh(item)
-        logger.info("Updated %s with ID %s", model.__name__, item_id)
+        logger.info("Updated {} with ID {}", model.__name__, item_id)
     except IntegrityError as exc:
         await session.rollback()
-        logger.error("Failed to update %s: %s", model.__name__, exc.orig)
+        logger.error("Failed to update {}: {}", model.__name__, exc.orig)
         raise ConflictError(detail=str(exc.orig))
     return item
 
@@ -72,27 +99,133 @@ async def delete_item(session: AsyncSession, model: Type[T], item_id: Any) -> No
     """Delete an item by ID."""
     item = await get_item(session, model, item_id)
     await session.delete(item)
+    invalidate(session, model)
     await session.commit()
-    logger.info("Deleted %s with ID %s", model.__name__, item_id)
+    logger.info("Deleted {} with ID {}", model.__name__, item_id)
 
 async def archive_item(session: AsyncSession, model: Type[T], item_id: Any) -> None:
     """Archive an item by setting its is_archived flag to True."""
     item = await get_item(session, model, item_id)
     item.is_archived = True
+    invalidate(session, model)
     await session.commit()
-    logger.info("Archived %s with ID %s", model.__name__, item_id)
+    logger.info("Archived {} with ID {}", model.__name__, item_id)
 
 async def delete_item_permanently(session: AsyncSession, model: Type[T], item_id: Any) -> None:
     """Permanently delete an archived item."""
     item = await get_item(session, model, item_id, is_archived=True)
     await session.delete(item)
+    invalidate(session, model)
     await session.commit()
-    logger.info("Permanently deleted %s with ID %s", model.__name__, item_id)
+    logger.info("Permanently deleted {} with ID {}", model.__name__, item_id)
 
-async def list_items(session: AsyncSession, model: Type[T], **filters) -> list[T]:
-    """Retrieve a list of items filtered by the given criteria."""
-    stmt = select(model).filter_by(**filters)
+async def list_items(
+    session: AsyncSession,
+    model: Type[T],
+    load_options: Sequence[ExecutableOption] = (),
+    **filters,
+) -> list[T]:
+    """Retrieve a list of items filtered by the given criteria, ordered by ID.
+
+    ``load_options`` as in :func:`get_item`.
+    """
+    stmt = select(model).filter_by(**filters).options(*load_options).order_by(model.id)
     result = await session.execute(stmt)
     items = result.scalars().all()
-    logger.debug("Retrieved %d %s items", len(items), model.__name__)
-    return list(items)
\ No newline at end of file
+    logger.debug("Retrieved {} {} items", len(items), model.__name__)
+    return list(items)
+
+async def list_items_page(
+    session: AsyncSession,
+    model: Type[T],
+    limit: int | None = None,
+    after: str | None = None,
+    with_total: bool = False,
+    **filters,
+) -> Page[T]:
+    """Keyset-paginated variant of :func:`list_items` (ordered by ID)."""
+    stmt = select(model).filter_by(**filters)
+    return await paginate(session, stmt, [model.id], limit=limit, after=after, with_total=with_total)
+
+
+# ---------------------------------------------------------------------------
+# Keyset pagination
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Page(Generic[T]):
+    """One page of a keyset-paginated listing."""
+    items: list[T]
+    next_cursor: str | None = None
+    total: int | None = None
+    limit: int | None = None
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Opaque cursor: URL-safe base64 of the last row's ordering key."""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> list[Any]:
+    """Decode a cursor produced by :func:`encode_cursor` for a key of ``size`` columns."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise ValidationError(detail="Invalid pagination cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValidationError(detail="Invalid pagination cursor")
+    return values
+
+async def paginate(
+    session: AsyncSession,
+    stmt: Select,
+    order_by: Sequence[Any],
+    limit: int | None = None,
+    after: str | None = None,
+    with_total: bool = False,
+) -> Page:
+    """Run ``stmt`` as a keyset-paginated query.
+
+    ``order_by`` must be ascending, non-null columns whose combination is
+    unique (end it with the primary key); rows after the ``after`` cursor are
+    selected with a row-value comparison, so every page is an index range scan
+    regardless of its depth. ``limit=None`` returns everything after the
+    cursor. ``with_total`` adds a ``COUNT(*)`` of the filtered statement
+    (without the cursor). ORM entities come back as entities, column selects
+    as rows.
+    """
+    total = None
+    if with_total:
+        total = (
+            await session.execute(select(func.count()).select_from(stmt.order_by(None).subquery()))
+        ).scalar_one()
+
+    if after:
+        values = decode_cursor(after, len(order_by))
+        key = order_by[0] if len(order_by) == 1 else tuple_(*order_by)
+        stmt = stmt.where(key > (values[0] if len(order_by) == 1 else tuple_(*values)))
+    stmt = stmt.order_by(*order_by)
+    if limit is not None:
+        stmt = stmt.limit(limit + 1)
+
+    result = await session.execute(stmt)
+    rows = list(result.scalars().all() if _selects_single_entity(stmt) else result.all())
+
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([_key_value(last, column) for column in order_by])
+    return Page(items=rows, next_cursor=next_cursor, total=total, limit=limit)
+
+def _selects_single_entity(stmt: Select) -> bool:
+    descriptions = stmt.column_descriptions
+    return len(descriptions) == 1 and descriptions[0]["expr"] is descriptions[0]["entity"]
+
+def _key_value(row: Any, column: Any) -> Any:
+    """Value of an ordering column on an entity or a row."""
+    name = column.key
+    value = getattr(row, name)
+    if hasattr(value, "value"):  # Enum
+        value = value.value
+    return value
\ No newline at end of file
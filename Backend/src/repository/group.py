@@ -11,15 +11,16 @@ student/teacher associations.
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any
+from typing import Any, Iterable
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.config.logger import configure_logger
-from src.domain.models import Group, GroupStudentStatus, GroupStudents, User
-from src.repository.base import create_item, delete_item, get_item, update_item
-from src.utils.exceptions import NotFoundError
+from src.domain.enums import Role
+from src.domain.models import Group, GroupStudentStatus, GroupStudents, GroupTeachers, User
+from src.repository.base import create_item, dialect_insert, get_item
+from src.utils.exceptions import NotFoundError, ValidationError
 
 logger = configure_logger()
 
@@ -46,18 +47,10 @@ async def create_group(
 
 async def add_student_to_group(session: AsyncSession, user_id: int, group_id: int) -> GroupStudents:
     """Add a student to a group with ACTIVE status."""
-    await get_item(session, User, user_id)
-    await get_item(session, Group, group_id)
-    return await create_item(
-        session,
-        GroupStudents,
-        user_id=user_id,
-        group_id=group_id,
-        status=GroupStudentStatus.ACTIVE,
-    )
+    await add_members_bulk(session, group_id, [user_id], strict=True)
+    return await _get_student_link(session, user_id, group_id)
 
-async def remove_student_from_group(session: AsyncSession, user_id: int, group_id: int) -> None:
-    """Remove a student from a group."""
+async def _get_student_link(session: AsyncSession, user_id: int, group_id: int) -> GroupStudents:
     stmt = select(GroupStudents).where(
         GroupStudents.user_id == user_id, GroupStudents.group_id == group_id
     )
@@ -65,20 +58,128 @@ async def remove_student_from_group(session: AsyncSession, user_id: int, group_i
     link = result.scalar_one_or_none()
     if not link:
         raise NotFoundError(resource_type="GroupStudents", resource_id=f"{user_id}-{group_id}")
-    await delete_item(session, GroupStudents, link.id)
+    return link
+
+async def remove_student_from_group(session: AsyncSession, user_id: int, group_id: int) -> None:
+    """Remove a student from a group."""
+    link = await _get_student_link(session, user_id, group_id)
+    await session.delete(link)
+    await session.commit()
+    logger.info(f"Removed student {user_id} from group {group_id}")
 
 async def update_student_status(
     session: AsyncSession, user_id: int, group_id: int, status: GroupStudentStatus
 ) -> GroupStudents:
     """Update the status of a student's group membership."""
-    stmt = select(GroupStudents).where(
-        GroupStudents.user_id == user_id, GroupStudents.group_id == group_id
-    )
-    result = await session.execute(stmt)
-    link = result.scalar_one_or_none()
-    if not link:
-        raise NotFoundError(resource_type="GroupStudents", resource_id=f"{user_id}-{group_id}")
+    link = await _get_student_link(session, user_id, group_id)
     link.status = status
     link.updated_at = datetime.now()
-    await update_item(session, GroupStudents, link.id)
-    return link
\ No newline at end of file
+    await session.commit()
+    return link
+
+
+# ---------------------------------------------------------------------------
+# Bulk membership
+# ---------------------------------------------------------------------------
+
+# Per-id outcomes of a bulk membership call
+ADDED = "added"
+RESTORED = "restored"
+UNCHANGED = "unchanged"
+NOT_FOUND = "not_found"
+WRONG_ROLE = "wrong_role"
+
+_MEMBER_ROLES = {
+    False: {Role.STUDENT},
+    True: {Role.TEACHER, Role.ADMIN},
+}
+
+async def add_members_bulk(
+    session: AsyncSession,
+    group_id: int,
+    user_ids: Iterable[int],
+    teachers: bool = False,
+    strict: bool = False,
+) -> dict[int, str]:
+    """Enrol many students (or assign many teachers) to a group in one transaction.
+
+    All ids are validated with one ``IN`` query (existing, non-archived users
+    with a suitable role), new links are inserted with ``INSERT … ON CONFLICT
+    DO NOTHING`` and archived links are restored with one ``UPDATE``. Returns
+    ``{user_id: outcome}`` in request order. With ``strict`` any invalid id
+    aborts the call before anything is written.
+    """
+    await get_item(session, Group, group_id)
+    ids = list(dict.fromkeys(user_ids))
+    results: dict[int, str] = {user_id: NOT_FOUND for user_id in ids}
+    if not ids:
+        return results
+
+    roles = dict(
+        (
+            await session.execute(
+                select(User.id, User.role).where(User.id.in_(ids), User.is_archived == False)
+            )
+        ).all()
+    )
+    allowed = _MEMBER_ROLES[teachers]
+    valid = []
+    for user_id in ids:
+        if user_id not in roles:
+            continue
+        if Role(roles[user_id]) not in allowed:
+            results[user_id] = WRONG_ROLE
+            continue
+        valid.append(user_id)
+
+    if strict:
+        missing = [user_id for user_id in ids if user_id not in roles]
+        if missing:
+            raise NotFoundError(resource_type="User", resource_id=", ".join(map(str, missing)))
+        wrong = [user_id for user_id in ids if results[user_id] == WRONG_ROLE]
+        if wrong:
+            raise ValidationError(detail=f"Users with unsuitable role: {', '.join(map(str, wrong))}")
+    if not valid:
+        return results
+
+    model = GroupTeachers if teachers else GroupStudents
+    now = datetime.now()
+    rows = [{"group_id": group_id, "user_id": user_id, "created_at": now, "is_archived": False} for user_id in valid]
+    if not teachers:
+        for row in rows:
+            row.update(status=GroupStudentStatus.ACTIVE, joined_at=now)
+    added = set(
+        (
+            await session.execute(
+                dialect_insert(session, model).values(rows).on_conflict_do_nothing().returning(model.user_id)
+            )
+        ).scalars()
+    )
+
+    restore_values: dict[str, Any] = {"is_archived": False}
+    if not teachers:
+        restore_values.update(status=GroupStudentStatus.ACTIVE, left_at=None, updated_at=now)
+    restored = set(
+        (
+            await session.execute(
+                update(model)
+                .where(
+                    model.group_id == group_id,
+                    model.user_id.in_([user_id for user_id in valid if user_id not in added]),
+                    model.is_archived == True,
+                )
+                .values(**restore_values)
+                .returning(model.user_id)
+                .execution_options(synchronize_session=False)
+            )
+        ).scalars()
+    ) if len(added) < len(valid) else set()
+    await session.commit()
+
+    for user_id in valid:
+        results[user_id] = ADDED if user_id in added else RESTORED if user_id in restored else UNCHANGED
+    logger.info(
+        "Group {}: {} {} added, {} restored, {} rejected",
+        group_id, "teachers" if teachers else "students", len(added), len(restored), len(ids) - len(valid),
+    )
+    return results
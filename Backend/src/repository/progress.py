@@ -15,6 +15,7 @@ from typing import Any
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.cache import invalidate, progress_scope
 from src.config.logger import configure_logger
 from src.domain.models import (
     SectionProgress,
@@ -40,6 +41,7 @@ async def create_topic_progress(
     """Create a new topic progress entry."""
     await get_item(session, User, user_id)
     await get_item(session, Topic, topic_id)
+    invalidate(session, progress_scope(user_id))
     return await create_item(
         session,
         TopicProgress,
@@ -62,6 +64,8 @@ async def update_topic_progress(
 ) -> TopicProgress:
     """Update an existing topic progress, excluding immutable fields."""
     kwargs.pop("id", None)
+    progress = await get_item(session, TopicProgress, progress_id)
+    invalidate(session, progress_scope(progress.user_id))
     return await update_item(session, TopicProgress, progress_id, **kwargs)
 
 
@@ -75,6 +79,7 @@ async def create_section_progress(
     """Create a new section progress entry."""
     await get_item(session, User, user_id)
     await get_item(session, Section, section_id)
+    invalidate(session, progress_scope(user_id))
     return await create_item(
         session,
         SectionProgress,
@@ -97,6 +102,8 @@ async def update_section_progress(
 ) -> SectionProgress:
     """Update an existing section progress, excluding immutable fields."""
     kwargs.pop("id", None)
+    progress = await get_item(session, SectionProgress, progress_id)
+    invalidate(session, progress_scope(progress.user_id))
     return await update_item(session, SectionProgress, progress_id, **kwargs)
 
 
@@ -109,6 +116,7 @@ async def create_subsection_progress(
     """Create a new subsection progress entry."""
     await get_item(session, User, user_id)
     await get_item(session, Subsection, subsection_id)
+    invalidate(session, progress_scope(user_id))
     return await create_item(
         session,
         SubsectionProgress,
@@ -131,4 +139,6 @@ async def update_subsection_progress(
 ) -> SubsectionProgress:
     """Update an existing subsection progress, excluding immutable fields."""
     kwargs.pop("id", None)
+    progress = await get_item(session, SubsectionProgress, progress_id)
+    invalidate(session, progress_scope(progress.user_id))
     return await update_item(session, SubsectionProgress, progress_id, **kwargs)
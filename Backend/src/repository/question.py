@@ -9,10 +9,13 @@ This module provides data access operations specific to the Question model.
 
 from __future__ import annotations
 
-from typing import Any
+from datetime import datetime
+from typing import Any, Sequence
 
+from sqlalchemy import Row, case, insert, literal, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.cache import invalidate
 from src.config.logger import configure_logger
 from src.domain.models import Question, QuestionType, Test, Section
 from src.repository.base import create_item, get_item, update_item
@@ -57,4 +60,91 @@ async def update_question(
 ) -> Question:
     """Update an existing question, excluding immutable fields."""
     kwargs.pop("id", None)
-    return await update_item(session, Question, question_id, **kwargs)
\ No newline at end of file
+    return await update_item(session, Question, question_id, **kwargs)
+
+async def list_question_bank(
+    session: AsyncSession,
+    section_id: int | None = None,
+    topic_id: int | None = None,
+    is_final: bool | None = None,
+) -> list[Row]:
+    """
+    Question-bank index for a section or a topic: only ``(id, test_id, question_type)``.
+
+    Covers questions of non-archived tests (and, for a topic, non-archived
+    sections); ``options``/``correct_answer`` are never loaded, so sampling
+    works on ids and the chosen rows are copied with ``clone_questions``.
+    """
+    if (section_id is None) == (topic_id is None):
+        raise ValidationError(detail="Either section_id or topic_id must be provided (but not both)")
+    stmt = (
+        select(Question.id, Question.test_id, Question.question_type)
+        .join(Test, Test.id == Question.test_id)
+        .where(Test.is_archived.is_(False))
+    )
+    if section_id is not None:
+        stmt = stmt.where(Test.section_id == section_id)
+    else:
+        stmt = stmt.join(Section, Section.id == Test.section_id).where(
+            Section.topic_id == topic_id, Section.is_archived.is_(False)
+        )
+    if is_final is not None:
+        stmt = stmt.where(Question.is_final.is_(is_final))
+    result = await session.execute(stmt.order_by(Question.id))
+    return list(result.all())
+
+async def clone_questions(
+    session: AsyncSession,
+    question_ids: Sequence[int],
+    test_id: int,
+    is_final: bool,
+) -> int:
+    """
+    Copy questions into ``test_id`` with a single ``INSERT … SELECT``.
+
+    Text, options, answer, hint and image are copied inside the database
+    (JSON never round-trips through Python); rows keep the order of
+    ``question_ids``.  Flushes only — the caller owns the transaction.
+    Returns the number of inserted rows.
+    """
+    if not question_ids:
+        return 0
+    position = case(
+        {question_id: index for index, question_id in enumerate(question_ids)},
+        value=Question.id,
+    )
+    source = (
+        select(
+            literal(test_id),
+            Question.question,
+            Question.question_type,
+            Question.options,
+            Question.correct_answer,
+            Question.hint,
+            literal(is_final),
+            Question.image,
+            literal(datetime.now()),
+            literal(False),
+        )
+        .where(Question.id.in_(question_ids))
+        .order_by(position)
+    )
+    stmt = insert(Question).from_select(
+        [
+            "test_id",
+            "question",
+            "question_type",
+            "options",
+            "correct_answer",
+            "hint",
+            "is_final",
+            "image",
+            "created_at",
+            "is_archived",
+        ],
+        source,
+    )
+    result = await session.execute(stmt)
+    invalidate(session, Question)
+    logger.debug("Cloned {} questions into test {}", result.rowcount, test_id)
+    return result.rowcount
@@ -11,15 +11,18 @@ attempts, including creation, retrieval, and submission handling.
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any
+from typing import Any, Iterable, Mapping
 
-from sqlalchemy import func, select
+from sqlalchemy import case, delete, func, insert, or_, select, update
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.cache import invalidate
 from src.config.logger import configure_logger
-from src.domain.models import Test, TestAttempt, TestType, User, Topic, Section
-from src.repository.base import create_item, delete_item, get_item, update_item
-from src.utils.exceptions import NotFoundError, ValidationError
+from src.domain.models import AttemptAnswer, Test, TestAttempt, TestType, Topic, Section
+from src.repository.base import create_item, delete_item, dialect_insert, get_item, update_item
+from src.service.progress import apply_attempt_submitted
+from src.utils.exceptions import ConflictError, NotFoundError, ValidationError
 
 logger = configure_logger()
 
@@ -71,6 +74,7 @@ async def delete_test(session: AsyncSession, test_id: int) -> None:
     if test.is_archived:
         raise NotFoundError(resource_type="Test", resource_id=test_id, details="Already archived")
     test.is_archived = True
+    invalidate(session, Test)
     await session.commit()
     logger.info(f"Archived test {test_id}")
 
@@ -80,15 +84,17 @@ async def archive_test(session: AsyncSession, test_id: int) -> None:
     if test.is_archived:
         raise NotFoundError(resource_type="Test", resource_id=test_id, details="Already archived")
     test.is_archived = True
+    invalidate(session, Test)
     await session.commit()
     logger.info(f"Archived test {test_id}")
 
 async def restore_test(session: AsyncSession, test_id: int) -> None:
     """Restore an archived test by setting is_archived=False."""
-    test = await get_item(session, Test, test_id)
+    test = await get_item(session, Test, test_id, is_archived=True)
     if not test.is_archived:
         raise NotFoundError(resource_type="Test", resource_id=test_id, details="Not archived")
     test.is_archived = False
+    invalidate(session, Test)
     await session.commit()
     logger.info(f"Restored test {test_id}")
 
@@ -114,32 +120,67 @@ async def list_tests(session: AsyncSession, model: type[Test], **filters: Any) -
 
 # ----------------------------- Test attempts --------------------------------
 
-async def _next_attempt_number(session: AsyncSession, user_id: int, test_id: int) -> int:
-    """Calculate the next attempt number for a user and test."""
-    stmt = select(func.count(TestAttempt.id)).where(
-        TestAttempt.user_id == user_id, TestAttempt.test_id == test_id
-    )
-    result = await session.execute(stmt)
-    (count,) = result.first()
-    return count + 1
+_ALLOCATE_RETRIES = 5
+
 
 async def create_test_attempt(
     session: AsyncSession,
     user_id: int,
     test_id: int,
+    idempotency_key: str | None = None,
 ) -> TestAttempt:
-    """Create a new test attempt with the next attempt number."""
-    await get_item(session, User, user_id)
-    await get_item(session, Test, test_id)
-    attempt_number = await _next_attempt_number(session, user_id, test_id)
-    return await create_item(
-        session,
-        TestAttempt,
-        user_id=user_id,
-        test_id=test_id,
-        attempt_number=attempt_number,
-        started_at=datetime.now(),
+    """Insert a new attempt or return the one that already exists.
+
+    The attempt number is computed inside the INSERT and the statement uses
+    ``ON CONFLICT DO NOTHING`` against the unique indexes on
+    (user_id, test_id, attempt_number), the open attempt of a user/test and
+    (user_id, idempotency_key). A conflict means a concurrent or repeated
+    request already created the attempt, which is then returned instead.
+    The open attempt is returned even past its deadline: closing it means
+    grading it, see ``service.tests.open_attempt``.
+    """
+    next_number = (
+        select(func.coalesce(func.max(TestAttempt.attempt_number), 0) + 1)
+        .where(TestAttempt.user_id == user_id, TestAttempt.test_id == test_id)
+        .scalar_subquery()
     )
+    for _ in range(_ALLOCATE_RETRIES):
+        now = datetime.now()
+        stmt = (
+            dialect_insert(session, TestAttempt)
+            .values(
+                user_id=user_id,
+                test_id=test_id,
+                attempt_number=next_number,
+                started_at=now,
+                idempotency_key=idempotency_key,
+            )
+            .on_conflict_do_nothing()
+            .returning(TestAttempt)
+        )
+        attempt = (await session.execute(stmt)).scalar_one_or_none()
+        if attempt is not None:
+            await session.commit()
+            logger.info(f"Started attempt {attempt.id} (#{attempt.attempt_number}) of test {test_id} for user {user_id}")
+            return attempt
+
+        match = TestAttempt.completed_at.is_(None)
+        if idempotency_key is not None:
+            match = or_(match, TestAttempt.idempotency_key == idempotency_key)
+        existing = list((await session.execute(
+            select(TestAttempt)
+            .where(TestAttempt.user_id == user_id, TestAttempt.test_id == test_id, match)
+            .execution_options(populate_existing=True)
+        )).scalars())
+        replay = next((a for a in existing if idempotency_key and a.idempotency_key == idempotency_key), None)
+        if replay is not None:
+            return replay
+        open_attempt = next((a for a in existing if a.completed_at is None), None)
+        if open_attempt is not None:
+            return open_attempt
+        # Номер перехватила параллельная попытка, которая уже завершена — пробуем снова
+
+    raise ConflictError(detail="Could not allocate a test attempt, please retry")
 
 async def get_test_attempt(session: AsyncSession, attempt_id: int) -> TestAttempt:
     """Retrieve a test attempt by ID."""
@@ -153,32 +194,154 @@ async def get_test_attempts(session: AsyncSession, user_id: int, test_id: int |
     result = await session.execute(stmt)
     return list(result.scalars().all())
 
+async def get_last_scores(
+    session: AsyncSession,
+    user_id: int,
+    test_ids: list[int],
+) -> dict[int, float | None]:
+    """
+    Return the score of the user's most recent attempt for each of ``test_ids``.
+
+    One windowed query instead of loading every attempt per test; tests without
+    attempts map to ``None``.
+    """
+    scores: dict[int, float | None] = {test_id: None for test_id in test_ids}
+    if not test_ids:
+        return scores
+
+    ranked = (
+        select(
+            TestAttempt.test_id,
+            TestAttempt.score,
+            func.row_number()
+            .over(
+                partition_by=TestAttempt.test_id,
+                order_by=(TestAttempt.started_at.desc(), TestAttempt.id.desc()),
+            )
+            .label("rn"),
+        )
+        .where(TestAttempt.user_id == user_id, TestAttempt.test_id.in_(test_ids))
+        .subquery()
+    )
+    stmt = select(ranked.c.test_id, ranked.c.score).where(ranked.c.rn == 1)
+    result = await session.execute(stmt)
+    for test_id, score in result.all():
+        scores[test_id] = score
+    return scores
+
 
 # ----------------------------- Submit -------------------------------
 
 async def submit_test(
     session: AsyncSession,
-    attempt_id: int,
+    attempt: TestAttempt,
+    test: Test,
     score: float,
     time_spent: int,
     answers: dict[str, Any],  # noqa: ANN401
+    idempotency_key: str | None = None,
 ) -> TestAttempt:
-    """Submit a test attempt with score and answers, then update test's completion_percentage."""
-    attempt = await get_item(session, TestAttempt, attempt_id)
-    if attempt.completed_at is not None:
+    """Submit a graded attempt, raise the test's best score and apply the
+    learner's progress delta — all in one transaction.
+
+    The attempt is closed with a conditional ``UPDATE … WHERE completed_at IS
+    NULL``, so a concurrent second submit of the same attempt is rejected —
+    unless it repeats the ``idempotency_key`` of the submit that won, in which
+    case the stored attempt is returned.
+    """
+    now = datetime.now()
+    values = {
+        "score": score,
+        "time_spent": time_spent,
+        "answers": answers,
+        "completed_at": now,
+        "updated_at": now,
+        "submit_idempotency_key": idempotency_key,
+    }
+    result = await session.execute(
+        update(TestAttempt)
+        .where(TestAttempt.id == attempt.id, TestAttempt.completed_at.is_(None))
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        await session.rollback()
+        if idempotency_key is not None:
+            await session.refresh(attempt)
+            if attempt.submit_idempotency_key == idempotency_key:
+                return attempt
         raise ValidationError(detail="Attempt already submitted")
+    for name, value in values.items():
+        set_committed_value(attempt, name, value)
 
-    # Update the attempt itself
-    attempt.score = score
-    attempt.time_spent = time_spent
-    attempt.answers = answers
-    attempt.completed_at = datetime.now()
-    await update_item(session, TestAttempt, attempt_id)
-
-    # Recompute and store the best score into the Test.completion_percentage
-    test = await get_item(session, Test, attempt.test_id)
-    # take the max of existing and this new score
-    test.completion_percentage = max(test.completion_percentage or 0.0, score)
-    await session.commit()
+    # Store the best score into the Test.completion_percentage
+    best = func.coalesce(Test.completion_percentage, 0.0)
+    await session.execute(
+        update(Test)
+        .where(Test.id == test.id)
+        .values(completion_percentage=case((best < score, score), else_=best))
+        .execution_options(synchronize_session=False)
+    )
+    set_committed_value(test, "completion_percentage", max(test.completion_percentage or 0.0, score))
 
+    # Журнал автосохранения свёрнут в answers — он больше не нужен
+    await session.execute(delete(AttemptAnswer).where(AttemptAnswer.attempt_id == attempt.id))
+
+    await apply_attempt_submitted(session, attempt.user_id, test, score)
+    await session.commit()
     return attempt
+
+
+# ----------------------------- Answer journal -------------------------------
+
+async def append_answer_deltas(
+    session: AsyncSession,
+    deltas: Mapping[int, Mapping[int, Any]],
+) -> int:
+    """Append ``{attempt_id: {question_id: answer}}`` to the autosave journal.
+
+    Deltas of attempts that are no longer open are dropped with a warning.
+    Returns the number of journal rows written; the caller commits.
+    """
+    if not deltas:
+        return 0
+    open_ids = set(
+        (
+            await session.execute(
+                select(TestAttempt.id).where(
+                    TestAttempt.id.in_(list(deltas)), TestAttempt.completed_at.is_(None)
+                )
+            )
+        ).scalars()
+    )
+    closed = [attempt_id for attempt_id in deltas if attempt_id not in open_ids]
+    if closed:
+        logger.warning(
+            f"Dropped {sum(len(deltas[a]) for a in closed)} autosave deltas of closed attempts {closed}"
+        )
+    rows = [
+        {"attempt_id": attempt_id, "question_id": question_id, "answer": answer}
+        for attempt_id, answers in deltas.items()
+        if attempt_id in open_ids
+        for question_id, answer in answers.items()
+    ]
+    if rows:
+        await session.execute(insert(AttemptAnswer), rows)
+    return len(rows)
+
+async def get_journal_answers(
+    session: AsyncSession,
+    attempt_ids: Iterable[int],
+) -> dict[int, dict[int, Any]]:
+    """Compact the journal of ``attempt_ids``: the latest answer per question wins."""
+    compacted: dict[int, dict[int, Any]] = {attempt_id: {} for attempt_id in attempt_ids}
+    if not compacted:
+        return compacted
+    rows = await session.execute(
+        select(AttemptAnswer.attempt_id, AttemptAnswer.question_id, AttemptAnswer.answer)
+        .where(AttemptAnswer.attempt_id.in_(list(compacted)))
+        .order_by(AttemptAnswer.attempt_id, AttemptAnswer.id)
+    )
+    for attempt_id, question_id, answer in rows:
+        compacted[attempt_id][question_id] = answer
+    return compacted
@@ -13,12 +13,15 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Any
 
-from sqlalchemy import select
+from sqlalchemy import Row, and_, func, null, select
+from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.cache import invalidate
 from src.config.logger import configure_logger
-from src.domain.models import Section, Subsection, Topic, SubsectionType, User, SubsectionProgress
-from src.repository.base import create_item, delete_item, get_item, update_item
+from src.domain.models import Section, Subsection, Test, Topic, TopicProgress, SubsectionType, User, SubsectionProgress
+from src.repository.base import create_item, delete_item, dialect_insert, get_item, update_item
+from src.service.progress import apply_subsection_viewed
 from src.utils.exceptions import NotFoundError
 
 logger = configure_logger()
@@ -52,6 +55,100 @@ async def get_topic(session: AsyncSession, topic_id: int) -> Topic:
     """Retrieve a topic by ID."""
     return await get_item(session, Topic, topic_id)
 
+async def list_topic_rows(
+    session: AsyncSession,
+    progress_user_id: int | None = None,
+    creator_id: int | None = None,
+    topic_id: int | None = None,
+    is_archived: bool | None = None,
+) -> list[Row]:
+    """
+    List topics as lightweight rows in a single statement.
+
+    Each row carries the topic columns, ``creator_full_name`` (joined from
+    ``users``) and, when ``progress_user_id`` is given, that user's
+    ``topic_progress`` columns (``progress_id`` is NULL when there is none).
+    """
+    if progress_user_id is not None:
+        progress_cols = (
+            TopicProgress.id.label("progress_id"),
+            TopicProgress.completion_percentage.label("progress_completion_percentage"),
+            TopicProgress.status.label("progress_status"),
+            TopicProgress.last_accessed.label("progress_last_accessed"),
+        )
+    else:
+        progress_cols = (
+            null().label("progress_id"),
+            null().label("progress_completion_percentage"),
+            null().label("progress_status"),
+            null().label("progress_last_accessed"),
+        )
+
+    stmt = (
+        select(
+            Topic.id,
+            Topic.title,
+            Topic.description,
+            Topic.category,
+            Topic.image,
+            Topic.created_at,
+            Topic.is_archived,
+            func.coalesce(User.full_name, "Неизвестно").label("creator_full_name"),
+            *progress_cols,
+        )
+        .outerjoin(User, User.id == Topic.creator_id)
+        .order_by(Topic.id)
+    )
+    if progress_user_id is not None:
+        stmt = stmt.outerjoin(
+            TopicProgress,
+            and_(TopicProgress.topic_id == Topic.id, TopicProgress.user_id == progress_user_id),
+        )
+    if creator_id is not None:
+        stmt = stmt.where(Topic.creator_id == creator_id)
+    if topic_id is not None:
+        stmt = stmt.where(Topic.id == topic_id)
+    if is_archived is not None:
+        stmt = stmt.where(Topic.is_archived == is_archived)
+
+    result = await session.execute(stmt)
+    rows = list(result.all())
+    logger.debug("Retrieved {} topic rows", len(rows))
+    return rows
+
+async def get_topic_tree(session: AsyncSession, topic_id: int) -> tuple[Topic, str]:
+    """
+    Load a non-archived topic with its sections, their subsections and tests,
+    and the topic's global tests — archived children excluded.
+
+    One statement for the topic (with the creator's name) plus one
+    ``selectinload`` query per collection, regardless of the tree's size.
+    Returns ``(topic, creator_full_name)``; collections are sorted by
+    ``(order, id)`` (tests by id).
+    """
+    active_sections = Topic.sections.and_(Section.is_archived == False)
+    stmt = (
+        select(Topic, func.coalesce(User.full_name, "Неизвестно"))
+        .outerjoin(User, User.id == Topic.creator_id)
+        .where(Topic.id == topic_id, Topic.is_archived == False)
+        .options(
+            selectinload(active_sections).selectinload(Section.subsections.and_(Subsection.is_archived == False)),
+            selectinload(active_sections).selectinload(Section.tests.and_(Test.is_archived == False)),
+            selectinload(Topic.global_tests.and_(Test.is_archived == False)),
+        )
+        .execution_options(populate_existing=True)
+    )
+    row = (await session.execute(stmt)).one_or_none()
+    if row is None:
+        raise NotFoundError(resource_type="Topic", resource_id=topic_id)
+    topic, creator_full_name = row
+    topic.sections.sort(key=lambda s: (s.order, s.id))
+    for section in topic.sections:
+        section.subsections.sort(key=lambda s: (s.order, s.id))
+        section.tests.sort(key=lambda t: t.id)
+    topic.global_tests.sort(key=lambda t: t.id)
+    return topic, creator_full_name
+
 async def update_topic(
     session: AsyncSession,
     topic_id: int,
@@ -70,6 +167,7 @@ async def delete_topic(session: AsyncSession, topic_id: int) -> None:
     if topic.is_archived:
         raise NotFoundError(resource_type="Topic", resource_id=topic_id, details="Already archived")
     topic.is_archived = True
+    invalidate(session, Topic)
     await session.commit()
     logger.info(f"Archived topic {topic_id}")
 
@@ -79,15 +177,17 @@ async def archive_topic(session: AsyncSession, topic_id: int) -> None:
     if topic.is_archived:
         raise NotFoundError(resource_type="Topic", resource_id=topic_id, details="Already archived")
     topic.is_archived = True
+    invalidate(session, Topic)
     await session.commit()
     logger.info(f"Archived topic {topic_id}")
 
 async def restore_topic(session: AsyncSession, topic_id: int) -> None:
     """Restore an archived topic by setting is_archived=False."""
-    topic = await get_item(session, Topic, topic_id)
+    topic = await get_item(session, Topic, topic_id, is_archived=True)
     if not topic.is_archived:
         raise NotFoundError(resource_type="Topic", resource_id=topic_id, details="Not archived")
     topic.is_archived = False
+    invalidate(session, Topic)
     await session.commit()
     logger.info(f"Restored topic {topic_id}")
 
@@ -171,6 +271,7 @@ async def delete_subsection(session: AsyncSession, subsection_id: int) -> None:
     """Archive a subsection by setting is_archived=True."""
     subsection = await get_item(session, Subsection, subsection_id)
     subsection.is_archived = True
+    invalidate(session, Subsection)
     await session.commit()
     logger.info(f"Archived subsection {subsection_id}")
 
@@ -180,15 +281,17 @@ async def archive_subsection(session: AsyncSession, subsection_id: int) -> None:
     if subsection.is_archived:
         raise NotFoundError(resource_type="Subsection", resource_id=subsection_id, details="Already archived")
     subsection.is_archived = True
+    invalidate(session, Subsection)
     await session.commit()
     logger.info(f"Archived subsection {subsection_id}")
 
 async def restore_subsection(session: AsyncSession, subsection_id: int) -> None:
     """Restore an archived subsection by setting is_archived=False."""
-    subsection = await get_item(session, Subsection, subsection_id)
+    subsection = await get_item(session, Subsection, subsection_id, is_archived=True)
     if not subsection.is_archived:
         raise NotFoundError(resource_type="Subsection", resource_id=subsection_id, details="Not archived")
     subsection.is_archived = False
+    invalidate(session, Subsection)
     await session.commit()
     logger.info(f"Restored subsection {subsection_id}")
 
@@ -208,35 +311,38 @@ async def mark_subsection_viewed(
     """
     Idempotently mark a subsection as viewed and persist the timestamp.
 
-    If a SubsectionProgress row doesn't exist, it will be created; otherwise,
-    it is updated only when transitioning from not viewed to viewed.
+    One ``INSERT … ON CONFLICT DO UPDATE … WHERE NOT is_viewed RETURNING``
+    creates the row or flips an existing not-viewed row, so of concurrent
+    first views exactly one observes the transition. Only that one is
+    applied to the stored section/topic progress, in the same transaction.
     """
     await get_item(session, User, user_id)
     subsection = await get_item(session, Subsection, subsection_id)
 
-    stmt = select(SubsectionProgress).where(
-        SubsectionProgress.user_id == user_id,
-        SubsectionProgress.subsection_id == subsection_id,
+    now = datetime.now()
+    stmt = dialect_insert(session, SubsectionProgress).values(
+        user_id=user_id,
+        subsection_id=subsection_id,
+        is_viewed=True,
+        viewed_at=now,
+        created_at=now,
     )
-    result = await session.execute(stmt)
-    progress = result.scalar_one_or_none()
-
-    if progress is None:
-        progress = SubsectionProgress(
-            user_id=user_id,
-            subsection_id=subsection_id,
-            is_viewed=True,
-            viewed_at=datetime.now(),
-        )
-        session.add(progress)
-        await session.commit()
-        await session.refresh(progress)
-        logger.info("Created progress row for viewed subsection %s by user %s", subsection_id, user_id)
-    elif not progress.is_viewed:
-        progress.is_viewed = True
-        progress.viewed_at = datetime.now()
-        await session.commit()
-        await session.refresh(progress)
-        logger.info("Marked subsection %s viewed for user %s", subsection_id, user_id)
-
-    return progress
\ No newline at end of file
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "subsection_id"],
+        set_={"is_viewed": True, "viewed_at": now, "updated_at": now},
+        where=SubsectionProgress.is_viewed.is_not(True),
+    ).returning(SubsectionProgress.id)
+    transitioned = (await session.execute(stmt)).scalar_one_or_none() is not None
+
+    if transitioned:
+        await apply_subsection_viewed(session, user_id, subsection.section_id)
+    await session.commit()
+    if transitioned:
+        logger.info("Marked subsection {} viewed for user {}", subsection_id, user_id)
+
+    progress = await session.execute(
+        select(SubsectionProgress)
+        .where(SubsectionProgress.user_id == user_id, SubsectionProgress.subsection_id == subsection_id)
+        .execution_options(populate_existing=True)
+    )
+    return progress.scalar_one()
\ No newline at end of file
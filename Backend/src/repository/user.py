@@ -10,19 +10,18 @@ including creation and retrieval by username.
 
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, Iterable
 
-from passlib.context import CryptContext
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.config.logger import configure_logger
 from src.domain.models import Role, User
 from src.repository.base import create_item, get_item
+from src.security.passwords import hash_password
 from src.utils.exceptions import NotFoundError
 
 logger = configure_logger()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # ---------------------------------------------------------------------------
 # User management
@@ -37,7 +36,7 @@ async def create_user(
     is_active: bool = True,
 ) -> User:
     """Create a new user with a hashed password."""
-    hashed_password = pwd_context.hash(password)
+    hashed_password = await hash_password(password)
     return await create_item(
         session,
         User,
@@ -55,4 +54,47 @@ async def get_user_by_username(session: AsyncSession, username: str) -> User:
     user = result.scalar_one_or_none()
     if not user:
         raise NotFoundError(resource_type="User", resource_id=username)
-    return user
\ No newline at end of file
+    return user
+
+
+# ---------------------------------------------------------------------------
+# Bulk mutations
+# ---------------------------------------------------------------------------
+
+async def bulk_update_users(
+    session: AsyncSession,
+    user_ids: Iterable[int],
+    strict: bool = False,
+    **values: Any,  # noqa: ANN401
+) -> dict[int, str]:
+    """Apply ``values`` to many non-archived users with one ``UPDATE … WHERE id IN (…)``.
+
+    Returns ``{user_id: "updated" | "not_found"}`` in request order. With
+    ``strict`` nothing is written when any id is unknown.
+    """
+    ids = list(dict.fromkeys(user_ids))
+    if not ids:
+        return {}
+    if strict:
+        existing = set(
+            (
+                await session.execute(select(User.id).where(User.id.in_(ids), User.is_archived == False))
+            ).scalars()
+        )
+        missing = [user_id for user_id in ids if user_id not in existing]
+        if missing:
+            raise NotFoundError(resource_type="User", resource_id=", ".join(map(str, missing)))
+    updated = set(
+        (
+            await session.execute(
+                update(User)
+                .where(User.id.in_(ids), User.is_archived == False)
+                .values(**values)
+                .returning(User.id)
+                .execution_options(synchronize_session="fetch")
+            )
+        ).scalars()
+    )
+    await session.commit()
+    logger.info("Bulk-updated {} of {} users: {}", len(updated), len(ids), sorted(values))
+    return {user_id: "updated" if user_id in updated else "not_found" for user_id in ids}
@@ -0,0 +1,165 @@
+# TestWise/Backend/src/security/passwords.py
+# -*- coding: utf-8 -*-
+"""security.passwords
+~~~~~~~~~~~~~~~~~~~~~
+bcrypt hashing off the event loop.
+
+Key points
+==========
+* A single ``CryptContext`` for the whole app; the cost factor comes from
+  ``BCRYPT_ROUNDS``.  Hashes made with another cost are reported as needing
+  an update, so ``verify_password`` returns a fresh hash that the caller
+  stores on successful login (transparent rehash).
+* Every hash/verify runs in a dedicated ``ThreadPoolExecutor`` with
+  ``PASSWORD_HASH_WORKERS`` threads — a burst of logins no longer stalls
+  unrelated requests.
+* At most ``PASSWORD_HASH_MAX_QUEUE`` operations may wait for a worker;
+  beyond that callers get ``503`` with ``Retry-After`` instead of piling up.
+* ``hash_passwords`` hashes a batch (bulk import) in small chunks on at
+  most ``PASSWORD_HASH_WORKERS - 1`` threads, so logins keep a free worker.
+* ``password_hasher_stats()`` exposes in-flight / queued counters.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Sequence, TypeVar
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from src.config.logger import configure_logger
+from src.config.settings import settings
+
+logger = configure_logger()
+
+T = TypeVar("T")
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.bcrypt_rounds,
+)
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.password_hash_workers,
+    thread_name_prefix="pwd-hash",
+)
+
+_stats: dict[str, Any] = {
+    "pending": 0,  # отправлено в пул и ещё не завершено (running + queued)
+    "max_queued": 0,
+    "completed": 0,
+    "rejected": 0,
+    "rehashed": 0,
+    "total_wait_ms": 0.0,
+    "total_run_ms": 0.0,
+}
+
+
+def _queued(pending: int) -> int:
+    return max(0, pending - settings.password_hash_workers)
+
+
+async def _run(fn: Callable[..., T], *args: Any) -> T:
+    """Run ``fn`` on the hashing pool, tracking queue depth and timings."""
+    max_queue = settings.password_hash_max_queue
+    if max_queue > 0 and _queued(_stats["pending"]) >= max_queue:
+        _stats["rejected"] += 1
+        logger.warning(f"Password hashing queue is full ({_stats['pending']} pending), rejecting request")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Сервер перегружен, повторите попытку позже",
+            headers={"Retry-After": "1"},
+        )
+
+    submitted = time.perf_counter()
+    started: list[float] = []
+
+    def job() -> T:
+        started.append(time.perf_counter())
+        return fn(*args)
+
+    _stats["pending"] += 1
+    _stats["max_queued"] = max(_stats["max_queued"], _queued(_stats["pending"]))
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, job)
+    finally:
+        _stats["pending"] -= 1
+        _stats["completed"] += 1
+        finished = time.perf_counter()
+        begin = started[0] if started else finished
+        _stats["total_wait_ms"] += (begin - submitted) * 1000
+        _stats["total_run_ms"] += (finished - begin) * 1000
+
+
+async def hash_password(password: str) -> str:
+    """Хеширует пароль bcrypt-ом в пуле потоков."""
+    return await _run(pwd_context.hash, password)
+
+
+# Паролей на одну задачу пула при пакетном хешировании: задачи короткие,
+# чтобы запросы входа не ждали в очереди за всем пакетом
+_BATCH_CHUNK = 8
+
+
+def _hash_many(passwords: list[str]) -> list[str]:
+    return [pwd_context.hash(password) for password in passwords]
+
+
+async def hash_passwords(passwords: Sequence[str]) -> list[str]:
+    """
+    Хеширует пакет паролей (массовый импорт), сохраняя порядок.
+
+    Пакет режется на куски по ``_BATCH_CHUNK``; одновременно в пуле не больше
+    ``PASSWORD_HASH_WORKERS - 1`` кусков, так что очередь пула не
+    переполняется, а один поток остаётся свободным для входа пользователей.
+    """
+    chunks = [list(passwords[i:i + _BATCH_CHUNK]) for i in range(0, len(passwords), _BATCH_CHUNK)]
+    limit = asyncio.Semaphore(max(1, settings.password_hash_workers - 1))
+
+    async def run_chunk(chunk: list[str]) -> list[str]:
+        async with limit:
+            return await _run(_hash_many, chunk)
+
+    hashed = await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+    return [value for chunk in hashed for value in chunk]
+
+
+async def verify_password(password: str, hashed: str) -> tuple[bool, str | None]:
+    """
+    Проверяет пароль в пуле потоков.
+
+    Returns:
+        ``(ok, new_hash)`` — ``new_hash`` не ``None``, если пароль верен, а
+        хеш сделан с устаревшей стоимостью и его нужно сохранить заново.
+    """
+    ok, new_hash = await _run(pwd_context.verify_and_update, password, hashed)
+    if ok and new_hash is not None:
+        _stats["rehashed"] += 1
+    return ok, new_hash
+
+
+def password_hasher_stats() -> dict[str, Any]:
+    """Снимок счётчиков пула хеширования."""
+    completed = _stats["completed"] or 1
+    return {
+        "workers": settings.password_hash_workers,
+        "max_queue": settings.password_hash_max_queue,
+        "bcrypt_rounds": settings.bcrypt_rounds,
+        "in_flight": min(_stats["pending"], settings.password_hash_workers),
+        "queued": _queued(_stats["pending"]),
+        "max_queued": _stats["max_queued"],
+        "completed": _stats["completed"],
+        "rejected": _stats["rejected"],
+        "rehashed": _stats["rehashed"],
+        "avg_wait_ms": round(_stats["total_wait_ms"] / completed, 2),
+        "avg_run_ms": round(_stats["total_run_ms"] / completed, 2),
+    }
+
+
+def shutdown_password_hasher() -> None:
+    """Останавливает пул потоков (вызывается при остановке приложения)."""
+    _executor.shutdown(wait=False, cancel_futures=True)
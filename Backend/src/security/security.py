@@ -9,6 +9,10 @@ Key points
 * Uses *python‑jose* for compact JWS handling.
 * Export **create_access_token**, **verify_token**, and **require_roles**
   (a FastAPI dependency factory).
+* Verified tokens are kept in a small LRU/TTL cache keyed by the token's
+  SHA-256 digest; an entry never outlives the token's ``exp``.
+* The bearer token is decoded once per request: the claims are stored on
+  ``request.state`` and every guard resolved for that request reuses them.
 * Teachers can now manage group membership (`GroupStudents`) so they have the
   same rights as admins for that sub‑API.  The dependency is granular — you
   pass the *minimal* set of roles accepted for a given route.
@@ -16,6 +20,9 @@ Key points
 
 from __future__ import annotations
 
+import hashlib
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
 from typing import Callable, List, Sequence
@@ -64,7 +71,67 @@ def create_refresh_token(data: dict, expires_delta: timedelta | None = None) ->
     encoded_jwt = jwt.encode(to_encode, REFRESH_TOKEN_SECRET, algorithm=settings.jwt_algorithm)
     return encoded_jwt
 
+class _VerifiedTokenCache:
+    """
+    Bounded LRU of already verified token payloads.
+
+    Keys are ``(token_type, sha256(token))`` so raw tokens are never held in
+    memory; each entry expires at ``min(now + ttl, exp)``.  Only successful
+    verifications are cached — failures always go through ``jwt.decode``.
+    """
+
+    def __init__(self, maxsize: int, ttl: int) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple[str, str], tuple[float, dict]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str, token_type: str) -> tuple[str, str]:
+        return token_type, hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str, token_type: str) -> dict | None:
+        key = self._key(token, token_type)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, payload = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(payload)
+
+    def put(self, token: str, token_type: str, payload: dict) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, float(exp))
+        key = self._key(token, token_type)
+        self._entries[key] = (expires_at, dict(payload))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def info(self) -> dict:
+        return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+token_cache = _VerifiedTokenCache(settings.jwt_cache_size, settings.jwt_cache_ttl_seconds)
+
 def verify_token(token: str, expected_type: str = "access") -> dict:
+    cached = token_cache.get(token, expected_type)
+    if cached is not None:
+        return cached
     secret = ACCESS_TOKEN_SECRET if expected_type == "access" else REFRESH_TOKEN_SECRET
     try:
         payload = jwt.decode(token, secret, algorithms=[settings.jwt_algorithm])
@@ -75,6 +142,7 @@ def verify_token(token: str, expected_type: str = "access") -> dict:
                 detail=f"Invalid token type. Expected {expected_type}, got {token_type}",
                 headers={"WWW-Authenticate": "Bearer"},
             )
+        token_cache.put(token, expected_type, payload)
         return payload
     except JWTError as exc:
         logger.error(f"JWT verification failed: {str(exc)}")
@@ -99,26 +167,40 @@ def _extract_token(request: Request) -> str:
         )
     return auth.split(" ", 1)[1]
 
+def _request_claims(request: Request) -> dict:
+    """
+    Decode and validate the bearer token once per request.
+
+    The normalised claims (``sub`` as ``int``) are stored on ``request.state``;
+    every guard resolved later for the same request reuses them.
+    """
+    claims = getattr(request.state, "claims", None)
+    if claims is not None:
+        return claims
+
+    token = _extract_token(request)
+    payload = verify_token(token, "access")
+    try:
+        Role(payload["role"])
+        # ``sub`` is a string in the JWT; strict drivers (asyncpg) need the int id
+        payload["sub"] = int(payload["sub"])
+    except (KeyError, ValueError) as exc:
+        logger.error(f"Invalid role in payload: {payload}", exc_info=True)
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload") from exc
+
+    request.state.claims = payload
+    logger.debug(f"User {payload['sub']} ({payload['role']}) authenticated for path: {request.url.path}")
+    return payload
+
 def require_roles(*allowed_roles: Role) -> Callable[[Request], dict]:
     allowed: set[Role] = set(allowed_roles)
 
     async def checker(request: Request) -> dict:
-        # logger.debug(f"Checking roles for path: {request.url.path}")
-        token = _extract_token(request)
-        # logger.debug(f"Extracted token: {token[:20]}...")  # Логируем начало токена
-        payload = verify_token(token, "access")
-        # logger.debug(f"Decoded payload: {payload}")
-        try:
-            role = Role(payload["role"])
-            logger.debug(f"User role: {role}")
-        except (KeyError, ValueError) as exc:
-            logger.error(f"Invalid role in payload: {payload}", exc_info=True)
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload") from exc
-
+        payload = _request_claims(request)
+        role = Role(payload["role"])
         if role not in allowed:
             logger.debug(f"Role {role} not in allowed roles: {allowed}")
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
-        logger.debug(f"Role {role} authorized for path: {request.url.path}")
         return payload
 
     return checker
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+TestWise/Backend/src/service/autosave.py
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+Server-side autosave of open attempts.
+
+``PATCH /tests/attempts/{id}/answers`` only merges the per-question deltas
+into an in-memory buffer, so a client that saves on every keystroke costs a
+dict update, not a database write.  A background task flushes the buffer
+every ``autosave_flush_seconds`` as one multi-row INSERT into the
+append-only ``attempt_answers`` journal; only the last value of a question
+since the previous flush is written.
+
+On submit, ``take_pending`` hands the not-yet-flushed deltas of the attempt
+to the caller (waiting for an in-flight flush first), and the final answers
+are compacted from journal + buffer + submitted payload. If the submit then
+fails, the caller puts the deltas back with ``restore_pending``.
+
+The buffer is per process: a server crash loses at most one flush interval,
+and a submit served by another worker would not see the deltas still
+buffered here. Without worker affinity (``WEB_CONCURRENCY`` > 1, or
+``AUTOSAVE_WRITE_THROUGH=true``) every PATCH is therefore written straight
+to the journal before it is acknowledged. Deltas that reach the journal
+after their attempt was closed are dropped, logged and counted
+(``dropped``).
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, Mapping, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.logger import configure_logger
+from src.config.settings import settings
+from src.database.db import SessionLocal
+from src.domain.models import TestAttempt
+from src.repository.test import append_answer_deltas, get_journal_answers
+from src.service.grading import fingerprint_columns, get_answer_key
+from src.utils.exceptions import NotFoundError, PermissionDeniedError, ValidationError
+
+logger = configure_logger()
+
+_pending: Dict[int, Dict[int, Any]] = {}
+_flush_lock = asyncio.Lock()
+_flusher: Optional[asyncio.Task] = None
+_stats = {"buffered": 0, "flushed_rows": 0, "flushes": 0, "failed_flushes": 0, "written_through": 0, "dropped": 0}
+
+
+def write_through() -> bool:
+    """Писать дельты сразу в журнал: буфер процесса не виден другим воркерам."""
+    if settings.autosave_write_through is not None:
+        return settings.autosave_write_through
+    return settings.web_concurrency > 1
+
+
+def _count_dropped(count: int) -> None:
+    if count > 0:
+        _stats["dropped"] += count
+
+
+async def save_answers(
+    session: AsyncSession,
+    user_id: int,
+    attempt_id: int,
+    answers: Mapping[int, Any],
+) -> int:
+    """
+    Принимает дельты ответов открытой попытки и кладёт их в буфер (или,
+    см. ``write_through``, сразу пишет в журнал).
+
+    Попытка и «отпечаток» вопросов читаются одним запросом, принадлежность
+    вопросов проверяется по кэшированному ключу ответов. Возвращает число
+    вопросов, ожидающих записи в журнал (0 при записи напрямую).
+    """
+    row = (
+        await session.execute(
+            select(TestAttempt, *fingerprint_columns(TestAttempt.test_id)).where(TestAttempt.id == attempt_id)
+        )
+    ).one_or_none()
+    if row is None:
+        raise NotFoundError("TestAttempt", attempt_id)
+    attempt, *fingerprint = row
+    if attempt.user_id != user_id:
+        raise PermissionDeniedError(detail="Чужая попытка")
+    if attempt.completed_at is not None:
+        raise ValidationError(detail="Attempt already submitted")
+
+    key = await get_answer_key(session, attempt.test_id, tuple(fingerprint))
+    if set(answers) - key.question_ids:
+        raise ValidationError(detail="Не тот тест для вопроса")
+
+    if write_through():
+        written = await append_answer_deltas(session, {attempt_id: answers})
+        await session.commit()
+        _stats["written_through"] += written
+        _count_dropped(len(answers) - written)
+        return 0
+
+    buffered = _pending.setdefault(attempt_id, {})
+    buffered.update(answers)
+    _stats["buffered"] += len(answers)
+    return len(buffered)
+
+
+async def take_pending(attempt_id: int) -> Dict[int, Any]:
+    """Забирает из буфера ещё не записанные дельты попытки."""
+    async with _flush_lock:
+        return _pending.pop(attempt_id, {})
+
+
+def _merge_back(batch: Mapping[int, Mapping[int, Any]]) -> None:
+    # Более свежие дельты, пришедшие после изъятия, важнее
+    for attempt_id, answers in batch.items():
+        if answers:
+            _pending[attempt_id] = {**answers, **_pending.get(attempt_id, {})}
+
+
+async def restore_pending(batch: Mapping[int, Mapping[int, Any]]) -> None:
+    """Возвращает в буфер дельты ``{attempt_id: ответы}``, взятые ``take_pending``, если их запись не удалась."""
+    async with _flush_lock:
+        _merge_back(batch)
+
+
+async def get_saved_answers(session: AsyncSession, attempt_id: int) -> Dict[int, Any]:
+    """Текущее состояние ответов: свёрнутый журнал поверх — буфер."""
+    async with _flush_lock:
+        journal = (await get_journal_answers(session, [attempt_id]))[attempt_id]
+        journal.update(_pending.get(attempt_id, {}))
+    return journal
+
+
+async def flush_pending(session: AsyncSession | None = None) -> int:
+    """Записывает буфер в журнал одним INSERT; при ошибке возвращает дельты в буфер."""
+    global _pending
+    async with _flush_lock:
+        if not _pending:
+            return 0
+        batch, _pending = _pending, {}
+        try:
+            if session is None:
+                async with SessionLocal() as own_session:
+                    written = await append_answer_deltas(own_session, batch)
+                    await own_session.commit()
+            else:
+                written = await append_answer_deltas(session, batch)
+                await session.commit()
+        except Exception:
+            _merge_back(batch)
+            _stats["failed_flushes"] += 1
+            raise
+    _stats["flushes"] += 1
+    _stats["flushed_rows"] += written
+    _count_dropped(sum(len(answers) for answers in batch.values()) - written)
+    logger.debug("Autosave flush: {} journal rows for {} attempts", written, len(batch))
+    return written
+
+
+def autosave_stats() -> Dict[str, int]:
+    return {**_stats, "pending_attempts": len(_pending)}
+
+
+async def _flush_loop(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await flush_pending()
+        except Exception as exc:
+            logger.error("Autosave flush failed: {}", exc)
+
+
+def start_autosave_flusher(interval: float | None = None) -> None:
+    """Запускает периодическую запись буфера (вызывается при старте приложения)."""
+    global _flusher
+    if _flusher is not None and not _flusher.done():
+        return
+    _flusher = asyncio.create_task(_flush_loop(interval or settings.autosave_flush_seconds))
+
+
+async def stop_autosave_flusher() -> None:
+    """Останавливает фоновую запись и сбрасывает остаток буфера."""
+    global _flusher
+    if _flusher is not None:
+        _flusher.cancel()
+        try:
+            await _flusher
+        except asyncio.CancelledError:
+            pass
+        _flusher = None
+    try:
+        await flush_pending()
+    except Exception as exc:
+        logger.error("Final autosave flush failed: {}", exc)
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+TestWise/Backend/src/service/expiry.py
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+Background sweeper that closes timed attempts past ``Test.duration``.
+
+Every ``attempt_sweep_interval_seconds`` the sweeper:
+
+1. selects at most ``attempt_sweep_batch_size`` overdue attempts — the
+   deadline (start + duration + grace) is checked in SQL, with a
+   ``started_at`` range on the partial index of open attempts;
+2. closes the overdue ones with one guarded ``UPDATE … WHERE completed_at IS
+   NULL RETURNING id``, so an attempt submitted concurrently is left alone;
+3. auto-grades each closed attempt with its autosaved answers (compacted
+   journal plus this process' unflushed buffer), writes the scores in one
+   bulk UPDATE, raises the tests' best scores and applies progress — all in
+   the same transaction, then drops the compacted journal rows.
+
+``close_attempts`` is the same close-and-grade routine; starting a test over
+an overdue open attempt uses it too (``service.tests.open_attempt``).
+
+Counters are exposed through ``expiry_stats`` (``GET /api/v1/system/attempt-expiry``).
+"""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.logger import configure_logger
+from src.config.settings import settings
+from src.database.db import SessionLocal
+from src.domain.models import AttemptAnswer, Test, TestAttempt
+from src.repository.test import get_journal_answers
+from src.service.autosave import restore_pending, take_pending
+from src.service.grading import get_answer_key, grade
+from src.service.progress import apply_attempt_submitted
+
+logger = configure_logger()
+
+_sweeper: Optional[asyncio.Task] = None
+_stats: Dict[str, Any] = {
+    "runs": 0,
+    "swept_total": 0,
+    "last_swept": 0,
+    "last_run_at": None,
+    "last_duration_ms": None,
+    "errors": 0,
+    "last_error": None,
+}
+
+
+def _grace(grace_seconds: int | None = None) -> timedelta:
+    return timedelta(seconds=settings.attempt_sweep_grace_seconds if grace_seconds is None else grace_seconds)
+
+
+def is_overdue(started_at: datetime, duration: int | None, now: datetime, grace_seconds: int | None = None) -> bool:
+    """Истёк ли срок попытки (длительность в минутах плюс отсрочка сборщика)."""
+    if not duration or duration <= 0:
+        return False
+    return started_at + timedelta(minutes=duration) + _grace(grace_seconds) < now
+
+
+def _deadline_before(session: AsyncSession, cutoff: datetime):
+    """SQL-условие «``started_at`` + ``Test.duration`` минут < ``cutoff``» для диалекта сессии."""
+    if session.bind.dialect.name == "postgresql":
+        return TestAttempt.started_at + func.make_interval(0, 0, 0, 0, 0, Test.duration) < cutoff
+    return func.julianday(TestAttempt.started_at) + Test.duration / 1440.0 < func.julianday(cutoff)
+
+
+async def sweep_expired_attempts(
+    session: AsyncSession,
+    now: datetime | None = None,
+    batch_size: int | None = None,
+    grace_seconds: int | None = None,
+) -> int:
+    """
+    Закрывает и оценивает просроченные попытки (не более ``batch_size`` за вызов).
+    Возвращает число закрытых попыток.
+    """
+    now = now or datetime.now()
+    batch_size = batch_size or settings.attempt_sweep_batch_size
+    grace = _grace(grace_seconds)
+
+    # Длительность теста — в минутах (как при старте попытки); срок проверяется
+    # в SQL, так что читается не больше batch_size попыток
+    cutoff = now - grace
+    overdue = dict(
+        (
+            await session.execute(
+                select(TestAttempt.id, Test.duration)
+                .join(Test, Test.id == TestAttempt.test_id)
+                .where(
+                    TestAttempt.completed_at.is_(None),
+                    Test.duration > 0,
+                    # Диапазон по частичному индексу: длительность не короче минуты
+                    TestAttempt.started_at < cutoff - timedelta(minutes=1),
+                    _deadline_before(session, cutoff),
+                )
+                .order_by(TestAttempt.started_at)
+                .limit(batch_size)
+            )
+        ).all()
+    )
+    if not overdue:
+        return 0
+    closed = await close_attempts(session, overdue, now)
+    logger.info("Expiry sweep closed {} attempts", closed)
+    return closed
+
+
+async def close_attempts(session: AsyncSession, durations: Dict[int, int], now: datetime) -> int:
+    """
+    Закрывает попытки ``{attempt_id: длительность теста в минутах}`` и
+    оценивает их по автосохранённым ответам (журнал + буфер процесса) —
+    как при сдаче: прогресс, лучший балл теста, очистка журнала. Попытки,
+    закрытые кем-то раньше, не трогаются. Фиксирует транзакцию; возвращает
+    число закрытых попыток.
+    """
+    closed_ids = list(
+        (
+            await session.execute(
+                update(TestAttempt)
+                .where(TestAttempt.id.in_(list(durations)), TestAttempt.completed_at.is_(None))
+                .values(completed_at=now, updated_at=now)
+                .returning(TestAttempt.id)
+                .execution_options(synchronize_session=False)
+            )
+        ).scalars()
+    )
+    if not closed_ids:
+        await session.commit()
+        return 0
+
+    attempts = (
+        await session.execute(
+            select(TestAttempt.id, TestAttempt.user_id, TestAttempt.test_id).where(TestAttempt.id.in_(closed_ids))
+        )
+    ).all()
+    journal = await get_journal_answers(session, closed_ids)
+    tests = {
+        test.id: test
+        for test in (
+            await session.execute(select(Test).where(Test.id.in_({a.test_id for a in attempts})))
+        ).scalars()
+    }
+
+    pending: Dict[int, Dict[int, Any]] = {}
+    try:
+        updates = []
+        graded = []
+        best: Dict[int, float] = {}
+        for attempt_id, user_id, test_id in attempts:
+            pending[attempt_id] = await take_pending(attempt_id)
+            answers = {**journal[attempt_id], **pending[attempt_id]}
+            score = grade(await get_answer_key(session, test_id), answers).score
+            updates.append({
+                "id": attempt_id,
+                "score": score,
+                "answers": answers,
+                "time_spent": durations[attempt_id] * 60,
+            })
+            best[test_id] = max(best.get(test_id, 0.0), score)
+            graded.append((user_id, tests[test_id], score))
+
+        await session.execute(update(TestAttempt), updates)
+        for user_id, test, score in graded:
+            await apply_attempt_submitted(session, user_id, test, score)
+        for test_id, score in best.items():
+            current = func.coalesce(Test.completion_percentage, 0.0)
+            await session.execute(
+                update(Test)
+                .where(Test.id == test_id)
+                .values(completion_percentage=case((current < score, score), else_=current))
+                .execution_options(synchronize_session=False)
+            )
+        await session.execute(delete(AttemptAnswer).where(AttemptAnswer.attempt_id.in_(closed_ids)))
+        await session.commit()
+    except Exception:
+        # Закрытие откатилось — попытки снова открыты, их буфер нужен следующему проходу
+        await restore_pending(pending)
+        raise
+    return len(closed_ids)
+
+
+async def run_sweep() -> int:
+    """Один проход сборщика на собственной сессии (пачками до исчерпания) с учётом метрик."""
+    started = datetime.now()
+    swept = 0
+    try:
+        async with SessionLocal() as session:
+            while True:
+                count = await sweep_expired_attempts(session, now=started)
+                swept += count
+                if count < settings.attempt_sweep_batch_size:
+                    break
+    except Exception as exc:
+        _stats["errors"] += 1
+        _stats["last_error"] = str(exc)
+        logger.error("Expiry sweep failed: {}", exc)
+    _stats["runs"] += 1
+    _stats["swept_total"] += swept
+    _stats["last_swept"] = swept
+    _stats["last_run_at"] = started
+    _stats["last_duration_ms"] = round((datetime.now() - started).total_seconds() * 1000, 1)
+    return swept
+
+
+def expiry_stats() -> Dict[str, Any]:
+    return {
+        **_stats,
+        "running": _sweeper is not None and not _sweeper.done(),
+        "interval_seconds": settings.attempt_sweep_interval_seconds,
+    }
+
+
+async def _sweep_loop(interval: float) -> None:
+    while True:
+        await run_sweep()
+        await asyncio.sleep(interval)
+
+
+def start_expiry_sweeper(interval: float | None = None) -> None:
+    """Запускает периодический сборщик (вызывается при старте приложения; 0 — выключен)."""
+    global _sweeper
+    interval = settings.attempt_sweep_interval_seconds if interval is None else interval
+    if interval <= 0 or (_sweeper is not None and not _sweeper.done()):
+        return
+    _sweeper = asyncio.create_task(_sweep_loop(interval))
+
+
+async def stop_expiry_sweeper() -> None:
+    global _sweeper
+    if _sweeper is None:
+        return
+    _sweeper.cancel()
+    try:
+        await _sweeper
+    except asyncio.CancelledError:
+        pass
+    _sweeper = None
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+TestWise/Backend/src/service/export.py
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+Streaming CSV / NDJSON exports.
+
+Every export is a SELECT with its filters in SQL, read through a server-side
+cursor (``session.stream`` + ``yield_per``) and encoded in chunks of
+``CHUNK_ROWS`` rows, so memory stays constant regardless of the row count.
+The header line is sent before the query runs, so the client gets bytes
+immediately.
+
+The stream opens its own session: FastAPI closes request-scoped
+dependencies before a ``StreamingResponse`` body is sent.
+
+Available exports:
+
+* ``users_export``           — users with role / activity / search filters;
+* ``attempts_export``        — test attempts by test, user, group and period;
+* ``group_progress_export``  — progress matrix of a group's students over
+  the sections of a topic (one line per student).
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Iterable, List, Literal, Optional, Sequence
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.logger import configure_logger
+from src.database.db import SessionLocal
+from src.domain.enums import GroupStudentStatus, Role
+from src.domain.models import (
+    GroupStudents,
+    Section,
+    SectionProgress,
+    Test,
+    TestAttempt,
+    TopicProgress,
+    User,
+)
+
+logger = configure_logger()
+
+ExportFormat = Literal["csv", "ndjson"]
+
+CHUNK_ROWS = 500
+
+_MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+# ---------------------------------------------------------------------------
+# Encoding
+# ---------------------------------------------------------------------------
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _csv_cell(value: Any) -> Any:
+    value = _plain(value)
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+async def encode_rows(
+    header: Sequence[str],
+    rows: AsyncIterator[Sequence[Any]],
+    fmt: ExportFormat = "csv",
+    chunk_rows: int = CHUNK_ROWS,
+) -> AsyncIterator[bytes]:
+    """Кодирует строки в CSV/NDJSON и отдаёт их пачками по ``chunk_rows``."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+
+    def drain() -> bytes:
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    if writer is not None:
+        writer.writerow(header)
+        yield drain()
+
+    pending = 0
+    count = 0
+    async for row in rows:
+        if writer is not None:
+            writer.writerow([_csv_cell(v) for v in row])
+        else:
+            buffer.write(json.dumps({k: _plain(v) for k, v in zip(header, row)}, ensure_ascii=False))
+            buffer.write("\n")
+        pending += 1
+        count += 1
+        if pending >= chunk_rows:
+            yield drain()
+            pending = 0
+    if pending:
+        yield drain()
+    logger.debug("Export streamed {} rows", count)
+
+
+async def stream_rows(stmt: Select, chunk_rows: int = CHUNK_ROWS) -> AsyncIterator[Sequence[Any]]:
+    """Читает результат серверным курсором, не материализуя его целиком."""
+    async with SessionLocal() as session:
+        result = await session.stream(stmt.execution_options(yield_per=chunk_rows))
+        async for partition in result.partitions():
+            for row in partition:
+                yield tuple(row)
+
+
+def export_response(
+    header: Sequence[str],
+    rows: AsyncIterator[Sequence[Any]],
+    fmt: ExportFormat,
+    filename: str,
+) -> StreamingResponse:
+    return StreamingResponse(
+        encode_rows(header, rows, fmt),
+        media_type=_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
+
+
+# ---------------------------------------------------------------------------
+# Exports
+# ---------------------------------------------------------------------------
+
+USER_COLUMNS = ["ID", "Username", "FullName", "Role", "IsActive", "CreatedAt", "LastLogin"]
+
+
+def users_export(
+    fmt: ExportFormat = "csv",
+    search: Optional[str] = None,
+    role: Optional[Role] = None,
+    is_active: Optional[bool] = None,
+) -> StreamingResponse:
+    stmt = (
+        select(User.id, User.username, User.full_name, User.role, User.is_active, User.created_at, User.last_login)
+        .where(User.is_archived == False)
+        .order_by(User.id)
+    )
+    if search:
+        pattern = f"%{search}%"
+        stmt = stmt.where(or_(User.username.ilike(pattern), User.full_name.ilike(pattern)))
+    if role is not None:
+        stmt = stmt.where(User.role == role)
+    if is_active is not None:
+        stmt = stmt.where(User.is_active == is_active)
+    return export_response(USER_COLUMNS, stream_rows(stmt), fmt, "users")
+
+
+ATTEMPT_COLUMNS = [
+    "attempt_id", "user_id", "username", "full_name", "test_id", "test_title",
+    "attempt_number", "score", "time_spent", "started_at", "completed_at",
+]
+
+
+def attempts_export(
+    fmt: ExportFormat = "csv",
+    test_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    group_id: Optional[int] = None,
+    started_from: Optional[datetime] = None,
+    started_to: Optional[datetime] = None,
+    completed_only: bool = False,
+) -> StreamingResponse:
+    stmt = (
+        select(
+            TestAttempt.id, TestAttempt.user_id, User.username, User.full_name,
+            TestAttempt.test_id, Test.title, TestAttempt.attempt_number, TestAttempt.score,
+            TestAttempt.time_spent, TestAttempt.started_at, TestAttempt.completed_at,
+        )
+        .join(User, User.id == TestAttempt.user_id)
+        .join(Test, Test.id == TestAttempt.test_id)
+        .order_by(TestAttempt.id)
+    )
+    if test_id is not None:
+        stmt = stmt.where(TestAttempt.test_id == test_id)
+    if user_id is not None:
+        stmt = stmt.where(TestAttempt.user_id == user_id)
+    if group_id is not None:
+        stmt = stmt.where(TestAttempt.user_id.in_(_group_student_ids(group_id)))
+    if started_from is not None:
+        stmt = stmt.where(TestAttempt.started_at >= started_from)
+    if started_to is not None:
+        stmt = stmt.where(TestAttempt.started_at < started_to)
+    if completed_only:
+        stmt = stmt.where(TestAttempt.completed_at.is_not(None))
+    return export_response(ATTEMPT_COLUMNS, stream_rows(stmt), fmt, "attempts")
+
+
+def _group_student_ids(group_id: int) -> Select:
+    return select(GroupStudents.user_id).where(
+        GroupStudents.group_id == group_id,
+        GroupStudents.status == GroupStudentStatus.ACTIVE,
+        GroupStudents.is_archived == False,
+    )
+
+
+async def _pivot_progress(
+    rows: AsyncIterator[Sequence[Any]],
+    section_ids: List[int],
+) -> AsyncIterator[Sequence[Any]]:
+    """Сворачивает строки (студент × раздел), упорядоченные по студенту, в одну строку на студента."""
+    position = {section_id: i for i, section_id in enumerate(section_ids)}
+    current: Optional[list] = None
+    current_id = None
+    async for user_id, username, full_name, topic_pct, section_id, section_pct in rows:
+        if user_id != current_id:
+            if current is not None:
+                yield current
+            current_id = user_id
+            current = [user_id, username, full_name, topic_pct] + [None] * len(section_ids)
+        if section_id in position:
+            current[4 + position[section_id]] = section_pct
+    if current is not None:
+        yield current
+
+
+async def load_topic_sections(session: AsyncSession, topic_id: int) -> List[tuple]:
+    """Разделы темы (id, title) в порядке вывода — столбцы матрицы прогресса."""
+    res = await session.execute(
+        select(Section.id, Section.title)
+        .where(Section.topic_id == topic_id, Section.is_archived == False)
+        .order_by(Section.order, Section.id)
+    )
+    return [tuple(row) for row in res.all()]
+
+
+def group_progress_export(
+    group_id: int,
+    topic_id: int,
+    sections: Iterable[tuple],
+    fmt: ExportFormat = "csv",
+) -> StreamingResponse:
+    """
+    Матрица прогресса: строка — активный студент группы, столбцы — процент
+    по теме и по каждому разделу темы (``sections`` — пары (id, title) в порядке
+    вывода, см. ``load_topic_sections``).
+    """
+    sections = list(sections)
+    section_ids = [section_id for section_id, _ in sections]
+    header = ["user_id", "username", "full_name", "topic_completion"] + [
+        f"section_{section_id}: {title}" for section_id, title in sections
+    ]
+    stmt = (
+        select(
+            User.id, User.username, User.full_name, TopicProgress.completion_percentage,
+            SectionProgress.section_id, SectionProgress.completion_percentage,
+        )
+        .where(User.id.in_(_group_student_ids(group_id)))
+        .outerjoin(TopicProgress, and_(TopicProgress.user_id == User.id, TopicProgress.topic_id == topic_id))
+        .outerjoin(
+            SectionProgress,
+            and_(SectionProgress.user_id == User.id, SectionProgress.section_id.in_(section_ids or [-1])),
+        )
+        .order_by(User.id)
+    )
+    return export_response(header, _pivot_progress(stream_rows(stmt), section_ids), fmt, f"group_{group_id}_progress")
+
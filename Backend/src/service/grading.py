@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+TestWise/Backend/src/service/grading.py
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+Compiled answer keys and pure grading functions.
+
+A test's questions are compiled once into an ``AnswerKey``:
+
+* single choice — the set of option indices whose value equals the correct
+  answer, plus the correct value itself (answers may be sent as an index or
+  as the option value);
+* multiple choice — a ``frozenset`` of correct values and the option list to
+  map submitted indices;
+* open text — the accepted answer(s) normalised (trimmed, whitespace
+  collapsed, case-folded).
+
+Compiled keys are cached per test in a bounded LRU.  Each lookup runs a cheap
+fingerprint query (question count, max id, last modification) and recompiles
+when it changed, so edits, archiving and deletions are picked up in every
+worker process without explicit invalidation hooks.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Sequence, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.logger import configure_logger
+from src.domain.enums import QuestionType
+from src.domain.models import Question, TestAttempt
+
+logger = configure_logger()
+
+_CACHE_SIZE = 1024
+
+
+# ---------------------------------------------------------------------------
+# Compiled key
+# ---------------------------------------------------------------------------
+
+def normalize_text(value: Any) -> str:
+    """Нормализация открытого ответа: обрезка, схлопывание пробелов, casefold."""
+    return " ".join(str(value).split()).casefold()
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledQuestion:
+    id: int
+    question_type: QuestionType
+    options: Tuple[Any, ...]
+    correct_value: Any = None
+    correct_indices: frozenset = frozenset()
+    correct_set: frozenset = frozenset()
+
+
+@dataclass(frozen=True, slots=True)
+class AnswerKey:
+    test_id: int
+    fingerprint: Tuple[Any, ...]
+    questions: Tuple[CompiledQuestion, ...]
+    question_ids: frozenset = frozenset()
+
+    @property
+    def total(self) -> int:
+        return len(self.questions)
+
+
+@dataclass(frozen=True, slots=True)
+class GradeResult:
+    correct: int
+    total: int
+
+    @property
+    def score(self) -> float:
+        return round(self.correct / self.total * 100, 2) if self.total else 0.0
+
+
+def _hashable(value: Any) -> Any:
+    if isinstance(value, list):
+        return tuple(_hashable(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _hashable(v)) for k, v in value.items()))
+    return value
+
+
+def compile_question(question: Question) -> CompiledQuestion:
+    """Компилирует один вопрос в неизменяемый ключ."""
+    options = tuple(question.options or ())
+    qtype = QuestionType(question.question_type)
+    correct = question.correct_answer
+
+    if qtype == QuestionType.MULTIPLE_CHOICE:
+        correct_list = correct if isinstance(correct, list) else ([] if correct is None else [correct])
+        return CompiledQuestion(
+            id=question.id,
+            question_type=qtype,
+            options=options,
+            correct_set=frozenset(_hashable(v) for v in correct_list),
+        )
+    if qtype == QuestionType.OPEN_TEXT and not options:
+        accepted = correct if isinstance(correct, list) else ([] if correct is None else [correct])
+        return CompiledQuestion(
+            id=question.id,
+            question_type=qtype,
+            options=options,
+            correct_set=frozenset(normalize_text(v) for v in accepted),
+        )
+    return CompiledQuestion(
+        id=question.id,
+        question_type=qtype,
+        options=options,
+        correct_value=correct,
+        correct_indices=frozenset(i for i, option in enumerate(options) if option == correct),
+    )
+
+
+def compile_answer_key(test_id: int, questions: Iterable[Question], fingerprint: Tuple[Any, ...] = ()) -> AnswerKey:
+    compiled = tuple(compile_question(q) for q in sorted(questions, key=lambda q: q.id))
+    return AnswerKey(
+        test_id=test_id,
+        fingerprint=fingerprint,
+        questions=compiled,
+        question_ids=frozenset(q.id for q in compiled),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Pure grading
+# ---------------------------------------------------------------------------
+
+def _is_index(value: Any, options: Sequence[Any]) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and bool(options)
+
+
+def is_correct(question: CompiledQuestion, answer: Any) -> bool:
+    """Проверяет один ответ по скомпилированному ключу."""
+    if answer is None:
+        return False
+    options = question.options
+
+    if question.question_type == QuestionType.MULTIPLE_CHOICE:
+        if isinstance(answer, list):
+            if all(_is_index(x, options) for x in answer):
+                values = [options[i] for i in answer if 0 <= i < len(options)]
+            else:
+                values = [str(x) for x in answer]
+        elif _is_index(answer, options):
+            if not 0 <= answer < len(options):
+                return False
+            values = [options[answer]]
+        else:
+            values = [answer]
+        chosen = [_hashable(v) for v in values]
+        # Повторы одного варианта считаем ошибкой, как при сравнении отсортированных списков
+        return len(set(chosen)) == len(chosen) and frozenset(chosen) == question.correct_set
+
+    if question.question_type == QuestionType.OPEN_TEXT and not options:
+        return normalize_text(answer) in question.correct_set
+
+    if _is_index(answer, options):
+        return answer in question.correct_indices
+    return answer == question.correct_value
+
+
+def _normalize_answers(answers: Mapping[Any, Any] | None) -> Dict[int, Any]:
+    """Ключи из JSON приходят строками — приводим к int."""
+    if not answers:
+        return {}
+    normalized: Dict[int, Any] = {}
+    for key, value in answers.items():
+        try:
+            normalized[int(key)] = value
+        except (TypeError, ValueError):
+            continue
+    return normalized
+
+
+def grade(key: AnswerKey, answers: Mapping[Any, Any] | None) -> GradeResult:
+    """Чистая функция: ключ + ответы → результат."""
+    submitted = _normalize_answers(answers)
+    correct = sum(1 for q in key.questions if is_correct(q, submitted.get(q.id)))
+    return GradeResult(correct=correct, total=key.total)
+
+
+def grade_many(key: AnswerKey, batch: Iterable[Mapping[Any, Any] | None]) -> List[GradeResult]:
+    """Проверка множества попыток одного теста одним ключом."""
+    return [grade(key, answers) for answers in batch]
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+
+_cache: "OrderedDict[int, AnswerKey]" = OrderedDict()
+
+
+def fingerprint_columns(test_id: Any) -> list:
+    """
+    Scalar subqueries with a test's question fingerprint; ``test_id`` may be a
+    value or a column, so callers can fetch the fingerprint inside their own query.
+    """
+    where = Question.test_id == test_id
+    return [
+        select(func.count(Question.id)).where(where).scalar_subquery(),
+        select(func.max(Question.id)).where(where).scalar_subquery(),
+        select(func.max(func.coalesce(Question.updated_at, Question.created_at))).where(where).scalar_subquery(),
+    ]
+
+
+async def get_answer_key(
+    session: AsyncSession,
+    test_id: int,
+    fingerprint: Tuple[Any, ...] | None = None,
+) -> AnswerKey:
+    """
+    Возвращает скомпилированный ключ теста, перекомпилируя его при изменении вопросов.
+
+    ``fingerprint`` можно передать готовым (см. ``fingerprint_columns``) —
+    тогда при попадании в кэш запросов к БД нет вовсе.
+    """
+    if fingerprint is None:
+        fingerprint = tuple((await session.execute(select(*fingerprint_columns(test_id)))).one())
+    key = _cache.get(test_id)
+    if key is not None and key.fingerprint == fingerprint:
+        _cache.move_to_end(test_id)
+        return key
+
+    res = await session.execute(select(Question).where(Question.test_id == test_id))
+    key = compile_answer_key(test_id, res.scalars().all(), fingerprint)
+    _cache[test_id] = key
+    _cache.move_to_end(test_id)
+    while len(_cache) > _CACHE_SIZE:
+        _cache.popitem(last=False)
+    logger.debug("Compiled answer key for test {} ({} questions)", test_id, key.total)
+    return key
+
+
+def invalidate_answer_key(test_id: int | None = None) -> None:
+    """Сбрасывает кэш ключей (одного теста или весь)."""
+    if test_id is None:
+        _cache.clear()
+    else:
+        _cache.pop(test_id, None)
+
+
+async def grade_attempts(session: AsyncSession, attempts: Sequence[TestAttempt]) -> Dict[int, GradeResult]:
+    """
+    Пакетная проверка попыток (для перепроверки): ключ каждого теста
+    компилируется один раз. Возвращает ``{attempt_id: GradeResult}``.
+    """
+    results: Dict[int, GradeResult] = {}
+    keys: Dict[int, AnswerKey] = {}
+    for attempt in attempts:
+        key = keys.get(attempt.test_id)
+        if key is None:
+            key = keys[attempt.test_id] = await get_answer_key(session, attempt.test_id)
+        results[attempt.id] = grade(key, attempt.answers)
+    return results
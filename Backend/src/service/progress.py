@@ -20,85 +20,165 @@ rules:
   completion is ≥ 90 %.
 * Hinted tests are always available; they never gate progress.
 
+Stored progress rows are kept current incrementally: viewing a subsection
+or submitting an attempt applies a delta to the per-section counters
+(``viewed_subsections``, ``final_passed``), so reads are a single row lookup.
+Counter deltas are atomic ``UPDATE … SET col = col + 1`` statements. When
+content changes shape (subsections, section-final tests or sections added,
+removed, archived or moved), the rows of the affected topics are recomputed
+in the background right after the commit (``refresh_content_progress``).
+``calculate_section_progress`` / ``calculate_topic_progress`` remain the
+authoritative full recompute used to seed missing rows; like the rest of the
+module they work on id columns in aggregate queries and never touch ORM
+relationships, which would lazy-load (``MissingGreenlet``) under asyncio.
+
 All functions are ``async`` and expect an ``AsyncSession`` following the
 SQLAlchemy 2.0 style.
 """
 
 from __future__ import annotations
 
+import asyncio
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List
 
-from sqlalchemy import Select, func, select
+from sqlalchemy import ScalarSelect, Select, and_, case, event, func, select, update
+from sqlalchemy import inspect as sa_inspect
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
+from src.cache import invalidate, progress_scope
 from src.config.logger import configure_logger
+from src.database.db import SessionLocal
 from src.domain.models import (
     ProgressStatus,
     Section,
     SectionProgress,
+    Subsection,
     Test,
     TestAttempt,
     TestType,
     Topic,
     TopicProgress, SubsectionProgress,
 )
-from src.repository.base import get_item
+from src.repository.base import dialect_insert, get_item
 from src.utils.exceptions import NotFoundError, ValidationError
 
 logger = configure_logger()
 
+FINAL_PASS_SCORE = 60.0  # minimal score for a section-final test to count as passed
+FINAL_LOCKED_CAP = 90.0  # section percentage cap until its final test is passed
+
 
 # ---------------------------------------------------------------------------
 # Internal helpers
 # ---------------------------------------------------------------------------
 
 
+def _section_percentage(viewed: int, total: int, has_final: bool, final_passed: bool) -> float:
+    """Apply the section completion rules to the stored counters."""
+    ratio = 1.0 if total == 0 else viewed / total  # edge-case: no subsections
+    percentage = ratio * 100.0
+    if has_final:
+        percentage = 100.0 if final_passed else min(percentage, FINAL_LOCKED_CAP)
+    return percentage
+
+
+def _status_for(percentage: float) -> ProgressStatus:
+    return ProgressStatus.COMPLETED if percentage >= 99.9 else ProgressStatus.IN_PROGRESS
+
+
+def _section_shape(section_id: Any) -> tuple[ScalarSelect, ScalarSelect]:
+    """Scalar subqueries: active subsection total and section-final test count of a section.
+
+    ``section_id`` is a value or the correlated ``Section.id`` column.
+    """
+    total_sq = (
+        select(func.count(Subsection.id))
+        .where(Subsection.section_id == section_id, Subsection.is_archived == False)
+        .correlate(Section)
+        .scalar_subquery()
+    )
+    finals_sq = (
+        select(func.count(Test.id))
+        .where(Test.section_id == section_id, Test.type == TestType.SECTION_FINAL, Test.is_archived == False)
+        .correlate(Section)
+        .scalar_subquery()
+    )
+    return total_sq, finals_sq
+
+
+def _topic_percentage(user_id: int, topic_id: int) -> ScalarSelect:
+    """Scalar subquery: a user's topic percentage — the one definition used everywhere.
+
+    Mean over the topic's non-archived sections of the stored section
+    percentage; a section without a stored row counts with its zero-progress
+    value (``_section_percentage(0, …)``: 0, or 90 / 100 for a section
+    without subsections). ``NULL`` when the topic has no sections.
+    """
+    total_sq, finals_sq = _section_shape(Section.id)
+    untouched = case((total_sq > 0, 0.0), (finals_sq > 0, FINAL_LOCKED_CAP), else_=100.0)
+    return (
+        select(func.avg(func.coalesce(SectionProgress.completion_percentage, untouched)))
+        .select_from(Section)
+        .outerjoin(
+            SectionProgress,
+            and_(SectionProgress.section_id == Section.id, SectionProgress.user_id == user_id),
+        )
+        .where(Section.topic_id == topic_id, Section.is_archived == False)
+        .scalar_subquery()
+    )
+
+
 async def _ensure_topic_progress(session: AsyncSession, user_id: int, topic_id: int) -> TopicProgress:
-    """Ensure a topic progress entry exists, creating it if necessary."""
+    """Ensure a topic progress entry exists, creating it if necessary.
+
+    Uses a dialect-aware ``INSERT … ON CONFLICT DO NOTHING`` so concurrent
+    requests cannot create duplicates; the caller owns the transaction.
+    Every topic-progress write goes through here, so it also invalidates the
+    user's cached topic responses.
+    """
+    invalidate(session, progress_scope(user_id))
+    await session.execute(
+        dialect_insert(session, TopicProgress)
+        .values(user_id=user_id, topic_id=topic_id, status=ProgressStatus.STARTED)
+        .on_conflict_do_nothing(index_elements=["user_id", "topic_id"])
+    )
     stmt: Select = select(TopicProgress).where(
         TopicProgress.user_id == user_id, TopicProgress.topic_id == topic_id
     )
     res = await session.execute(stmt)
-    progress = res.scalar_one_or_none()
-    if progress is None:
-        progress = TopicProgress(user_id=user_id, topic_id=topic_id, status=ProgressStatus.STARTED)
-        session.add(progress)
-        await session.commit()
-        await session.refresh(progress)
-    return progress
+    return res.scalar_one()
 
 
 async def _ensure_section_progress(session: AsyncSession, user_id: int, section_id: int) -> SectionProgress:
-    """Ensure a section progress entry exists, creating it if necessary."""
+    """Ensure a section progress entry exists, creating it if necessary (upsert)."""
+    await session.execute(
+        dialect_insert(session, SectionProgress)
+        .values(user_id=user_id, section_id=section_id, status=ProgressStatus.STARTED)
+        .on_conflict_do_nothing(index_elements=["user_id", "section_id"])
+    )
     stmt: Select = select(SectionProgress).where(
         SectionProgress.user_id == user_id, SectionProgress.section_id == section_id
     )
     res = await session.execute(stmt)
-    progress = res.scalar_one_or_none()
-    if progress is None:
-        progress = SectionProgress(user_id=user_id, section_id=section_id, status=ProgressStatus.STARTED)
-        session.add(progress)
-        await session.commit()
-        await session.refresh(progress)
-    return progress
+    return res.scalar_one()
 
 
 async def _ensure_subsection_progress(
         session: AsyncSession, user_id: int, subsection_id: int
 ) -> SubsectionProgress:
-    """Ensure a subsection progress entry exists, creating it if necessary."""
+    """Ensure a subsection progress entry exists, creating it if necessary (upsert)."""
+    await session.execute(
+        dialect_insert(session, SubsectionProgress)
+        .values(user_id=user_id, subsection_id=subsection_id, is_viewed=False)
+        .on_conflict_do_nothing(index_elements=["user_id", "subsection_id"])
+    )
     stmt: Select = select(SubsectionProgress).where(
         SubsectionProgress.user_id == user_id, SubsectionProgress.subsection_id == subsection_id
     )
     res = await session.execute(stmt)
-    progress = res.scalar_one_or_none()
-    if progress is None:
-        progress = SubsectionProgress(user_id=user_id, subsection_id=subsection_id, is_viewed=False)
-        session.add(progress)
-        await session.commit()
-        await session.refresh(progress)
-    return progress
+    return res.scalar_one()
 
 
 # ---------------------------------------------------------------------------
@@ -114,50 +194,56 @@ async def calculate_section_progress(
 ) -> float:
     """Recalculate section completion percentage.
 
-    Returns the new percentage (0–100).
+    Returns the new percentage (0–100). The section shape and the user's
+    counters are read with one aggregate query over ids — no relationship of
+    ``Section`` is loaded.
     """
-    section: Section | None = await get_item(session, Section, section_id)
-    if section is None:
-        raise NotFoundError(resource_type="Section", resource_id=section_id)
-
-    # 1. Subsection completion ratio
-    total_subsections: int = len(section.subsections)
-    if total_subsections == 0:
-        subsection_ratio = 1.0  # edge-case: treat as fully complete
-    else:
-        stmt = select(func.count(SubsectionProgress.id)).where(
+    total_sq, finals_sq = _section_shape(Section.id)
+    viewed_sq = (
+        select(func.count(SubsectionProgress.id))
+        .join(Subsection, Subsection.id == SubsectionProgress.subsection_id)
+        .where(
             SubsectionProgress.user_id == user_id,
-            SubsectionProgress.subsection_id.in_(s.id for s in section.subsections),
+            Subsection.section_id == Section.id,
+            Subsection.is_archived == False,
             SubsectionProgress.is_viewed.is_(True),
         )
-        viewed_count_res = await session.execute(stmt)
-        (viewed_count,) = viewed_count_res.first()
-        subsection_ratio = viewed_count / total_subsections
-
-    percentage = subsection_ratio * 100.0
-
-    # 2. If there is a section-final test, cap until it is passed
-    final_tests: List[Test] = [t for t in section.tests if t.type == TestType.SECTION_FINAL]
-    passed_final_test = False
-    if final_tests:
-        stmt = select(func.max(TestAttempt.score)).where(
+        .correlate(Section)
+        .scalar_subquery()
+    )
+    best_sq = (
+        select(func.max(TestAttempt.score))
+        .join(Test, Test.id == TestAttempt.test_id)
+        .where(
             TestAttempt.user_id == user_id,
-            TestAttempt.test_id.in_(t.id for t in final_tests),
+            Test.section_id == Section.id,
+            Test.is_archived == False,
+            Test.type == TestType.SECTION_FINAL,
             TestAttempt.completed_at.is_not(None),
         )
-        res = await session.execute(stmt)
-        (best_score,) = res.first()
-        passed_final_test = best_score is not None and best_score >= 60.0
-        if not passed_final_test:
-            percentage = min(percentage, 90.0)  # cannot exceed 90 % until final passed
-        else:
-            percentage = 100.0
+        .correlate(Section)
+        .scalar_subquery()
+    )
+    res = await session.execute(
+        select(Section.topic_id, total_sq, finals_sq, viewed_sq, best_sq).where(
+            Section.id == section_id, Section.is_archived == False
+        )
+    )
+    row = res.first()
+    if row is None:
+        raise NotFoundError(resource_type="Section", resource_id=section_id)
+    topic_id, total_subsections, finals, viewed_count, best_score = row
+
+    # A section-final test caps the percentage until it is passed
+    passed_final_test = finals > 0 and best_score is not None and best_score >= FINAL_PASS_SCORE
+    viewed_count = min(viewed_count, total_subsections)
+    percentage = _section_percentage(viewed_count, total_subsections, finals > 0, passed_final_test)
 
     section_progress = await _ensure_section_progress(session, user_id, section_id)
+    section_progress.viewed_subsections = viewed_count
+    section_progress.final_passed = passed_final_test
     section_progress.completion_percentage = round(percentage, 2)
-    section_progress.status = (
-        ProgressStatus.COMPLETED if percentage >= 99.9 else ProgressStatus.IN_PROGRESS
-    )
+    section_progress.status = _status_for(percentage)
     section_progress.last_accessed = datetime.now()
 
     if commit:
@@ -166,7 +252,7 @@ async def calculate_section_progress(
         await session.flush()
 
     # Update topic progress asynchronously
-    await calculate_topic_progress(session, user_id, section.topic_id, commit=commit)
+    await calculate_topic_progress(session, user_id, topic_id, commit=commit)
 
     return percentage
 
@@ -177,28 +263,23 @@ async def calculate_topic_progress(
         topic_id: int,
         commit: bool = False,
 ) -> float:
-    """Recalculate topic completion percentage and persist it."""
-    topic: Topic | None = await get_item(session, Topic, topic_id)
-    if topic is None:
-        raise NotFoundError(resource_type="Topic", resource_id=topic_id)
+    """Recalculate topic completion percentage and persist it.
 
-    total_sections: int = len(topic.sections)
-    if total_sections == 0:
-        percentage = 0.0
-    else:
-        stmt = select(func.avg(SectionProgress.completion_percentage)).where(
-            SectionProgress.user_id == user_id,
-            SectionProgress.section_id.in_(s.id for s in topic.sections),
+    The topic check and the percentage (``_topic_percentage``) are one query.
+    """
+    res = await session.execute(
+        select(Topic.id, _topic_percentage(user_id, topic_id)).where(
+            Topic.id == topic_id, Topic.is_archived == False
         )
-        res = await session.execute(stmt)
-        (avg_percentage,) = res.first()
-        percentage = float(avg_percentage or 0.0)
+    )
+    row = res.first()
+    if row is None:
+        raise NotFoundError(resource_type="Topic", resource_id=topic_id)
+    percentage = float(row[1] or 0.0)
 
     topic_progress = await _ensure_topic_progress(session, user_id, topic_id)
     topic_progress.completion_percentage = round(percentage, 2)
-    topic_progress.status = (
-        ProgressStatus.COMPLETED if percentage >= 99.9 else ProgressStatus.IN_PROGRESS
-    )
+    topic_progress.status = _status_for(percentage)
     topic_progress.last_accessed = datetime.now()
 
     if commit:
@@ -209,6 +290,398 @@ async def calculate_topic_progress(
     return percentage
 
 
+# ---------------------------------------------------------------------------
+# Incremental engine
+# ---------------------------------------------------------------------------
+
+
+async def _find_section_progress(
+        session: AsyncSession, user_id: int, section_id: int
+) -> SectionProgress | None:
+    stmt: Select = select(SectionProgress).where(
+        SectionProgress.user_id == user_id, SectionProgress.section_id == section_id
+    )
+    return (await session.execute(stmt)).scalar_one_or_none()
+
+
+async def _find_topic_progress(session: AsyncSession, user_id: int, topic_id: int) -> TopicProgress | None:
+    stmt: Select = select(TopicProgress).where(
+        TopicProgress.user_id == user_id, TopicProgress.topic_id == topic_id
+    )
+    return (await session.execute(stmt)).scalar_one_or_none()
+
+
+async def _bump_section_counters(
+        session: AsyncSession, user_id: int, section_id: int, *criteria: Any, **values: Any
+) -> tuple[int, bool] | None:
+    """Change a section row's counters with one atomic ``UPDATE … RETURNING``.
+
+    The expressions are evaluated by the database on the current row, so
+    concurrent deltas never overwrite each other; the row stays locked until
+    the caller commits. Returns the new ``(viewed_subsections, final_passed)``,
+    ``None`` when no row matched.
+    """
+    res = await session.execute(
+        update(SectionProgress)
+        .where(SectionProgress.user_id == user_id, SectionProgress.section_id == section_id, *criteria)
+        .values(**values)
+        .returning(SectionProgress.viewed_subsections, SectionProgress.final_passed)
+    )
+    row = res.first()
+    return None if row is None else (row[0] or 0, bool(row[1]))
+
+
+async def _apply_section_counters(
+        session: AsyncSession, user_id: int, section_id: int, viewed: int, final_passed: bool
+) -> None:
+    """Re-derive a section row from its counters and roll the change up to the topic.
+
+    Uses one query for the section shape (topic, subsection total, final-test
+    presence) and one aggregate for the topic average.
+    """
+    total_sq, finals_sq = _section_shape(section_id)
+    res = await session.execute(
+        select(Section.topic_id, total_sq, finals_sq).where(Section.id == section_id)
+    )
+    row = res.first()
+    if row is None:
+        raise NotFoundError(resource_type="Section", resource_id=section_id)
+    topic_id, total, finals = row
+
+    viewed = min(viewed, total)
+    percentage = _section_percentage(viewed, total, finals > 0, final_passed)
+    await session.execute(
+        update(SectionProgress)
+        .where(SectionProgress.user_id == user_id, SectionProgress.section_id == section_id)
+        .values(
+            viewed_subsections=viewed,
+            completion_percentage=round(percentage, 2),
+            status=_status_for(percentage),
+            last_accessed=datetime.now(),
+        )
+    )
+
+    avg_res = await session.execute(select(_topic_percentage(user_id, topic_id)))
+    topic_percentage = float(avg_res.scalar() or 0.0)
+    topic_progress = await _ensure_topic_progress(session, user_id, topic_id)
+    topic_progress.completion_percentage = round(topic_percentage, 2)
+    topic_progress.status = _status_for(topic_percentage)
+    topic_progress.last_accessed = datetime.now()
+    await session.flush()
+
+
+async def apply_subsection_viewed(session: AsyncSession, user_id: int, section_id: int) -> None:
+    """Account for a subsection that has just transitioned to *viewed*.
+
+    The caller commits. A missing section row is seeded by a full recompute,
+    so the counter never starts from a wrong baseline.
+    """
+    await session.flush()
+    counters = await _bump_section_counters(
+        session, user_id, section_id, viewed_subsections=SectionProgress.viewed_subsections + 1
+    )
+    if counters is None:
+        await calculate_section_progress(session, user_id, section_id, commit=False)
+        return
+    await _apply_section_counters(session, user_id, section_id, *counters)
+    logger.debug("Applied view delta to section {} for user {}", section_id, user_id)
+
+
+async def apply_attempt_submitted(session: AsyncSession, user_id: int, test: Test, score: float) -> None:
+    """Account for a completed attempt; only passed section-final tests move progress."""
+    # Оценка попытки видна в кэшированном дереве темы даже без сдвига прогресса
+    invalidate(session, progress_scope(user_id))
+    if test.type != TestType.SECTION_FINAL or test.section_id is None or score < FINAL_PASS_SCORE:
+        return
+    await session.flush()
+    counters = await _bump_section_counters(
+        session, user_id, test.section_id, SectionProgress.final_passed == False, final_passed=True
+    )
+    if counters is None:
+        if await _find_section_progress(session, user_id, test.section_id) is None:
+            await calculate_section_progress(session, user_id, test.section_id, commit=False)
+        return  # иначе итоговый тест уже был сдан
+    await _apply_section_counters(session, user_id, test.section_id, *counters)
+    logger.debug("Applied final-pass delta to section {} for user {}", test.section_id, user_id)
+
+
+async def get_section_progress_row(session: AsyncSession, user_id: int, section_id: int) -> SectionProgress:
+    """Return the stored section progress, seeding it with a full recompute once."""
+    progress = await _find_section_progress(session, user_id, section_id)
+    if progress is None:
+        await calculate_section_progress(session, user_id, section_id, commit=True)
+        progress = await _find_section_progress(session, user_id, section_id)
+    return progress
+
+
+async def get_topic_progress_row(session: AsyncSession, user_id: int, topic_id: int) -> TopicProgress:
+    """Return the stored topic progress, seeding it with a full recompute once."""
+    progress = await _find_topic_progress(session, user_id, topic_id)
+    if progress is None:
+        await calculate_topic_progress(session, user_id, topic_id, commit=True)
+        progress = await _find_topic_progress(session, user_id, topic_id)
+    return progress
+
+
+async def get_tree_progress(
+        session: AsyncSession,
+        user_id: int,
+        topic_id: int,
+        section_ids: Iterable[int],
+        subsection_ids: Iterable[int],
+) -> tuple[TopicProgress | None, Dict[int, SectionProgress], Dict[int, SubsectionProgress]]:
+    """Stored progress of a user over a whole topic tree, read-only, in three queries.
+
+    Missing rows are not seeded (unlike ``get_*_progress_row``).
+    """
+    topic_progress = await _find_topic_progress(session, user_id, topic_id)
+    section_ids, subsection_ids = list(section_ids), list(subsection_ids)
+    sections: Dict[int, SectionProgress] = {}
+    subsections: Dict[int, SubsectionProgress] = {}
+    if section_ids:
+        res = await session.execute(
+            select(SectionProgress).where(
+                SectionProgress.user_id == user_id, SectionProgress.section_id.in_(section_ids)
+            )
+        )
+        sections = {p.section_id: p for p in res.scalars().all()}
+    if subsection_ids:
+        res = await session.execute(
+            select(SubsectionProgress).where(
+                SubsectionProgress.user_id == user_id, SubsectionProgress.subsection_id.in_(subsection_ids)
+            )
+        )
+        subsections = {p.subsection_id: p for p in res.scalars().all()}
+    return topic_progress, sections, subsections
+
+
+# ---------------------------------------------------------------------------
+# Bulk recompute
+# ---------------------------------------------------------------------------
+
+
+_UPSERT_CHUNK = 500  # rows per INSERT, well below SQLite's bind-parameter limit
+
+
+async def _upsert(session: AsyncSession, model: Any, rows: List[Dict[str, Any]], keys: List[str]) -> None:
+    """``INSERT … ON CONFLICT (keys) DO UPDATE`` of ``rows`` in chunks; the caller commits."""
+    if not rows:
+        return
+    columns = [name for name in rows[0] if name not in keys]
+    for start in range(0, len(rows), _UPSERT_CHUNK):
+        stmt = dialect_insert(session, model).values(rows[start:start + _UPSERT_CHUNK])
+        set_ = {name: stmt.excluded[name] for name in columns}
+        # onupdate не срабатывает в ON CONFLICT — время обновления берём из строки
+        set_["updated_at"] = stmt.excluded.last_accessed
+        await session.execute(stmt.on_conflict_do_update(index_elements=keys, set_=set_))
+
+
+async def recompute_progress_bulk(
+        session: AsyncSession,
+        user_ids: Iterable[int],
+        topic_ids: Iterable[int],
+) -> Dict[str, Any]:
+    """Recompute section/topic progress for many users × many topics at once.
+
+    Uses a fixed number of aggregate queries regardless of the number of
+    users and sections, then upserts all ``section_progress`` and
+    ``topic_progress`` rows in a single transaction (Core statements: ORM
+    instances of those rows already in the session are not refreshed).
+    """
+    user_ids = sorted({int(u) for u in user_ids})
+    topic_ids = sorted({int(t) for t in topic_ids})
+    summary: Dict[str, Any] = {"users": len(user_ids), "topics": len(topic_ids), "sections": 0}
+    if not user_ids or not topic_ids:
+        return summary
+
+    # 1. Sections of the topics with their subsection totals and final-test flags
+    total_sq, finals_sq = _section_shape(Section.id)
+    res = await session.execute(
+        select(Section.id, Section.topic_id, total_sq, finals_sq).where(
+            Section.topic_id.in_(topic_ids), Section.is_archived == False
+        )
+    )
+    sections = {sid: (tid, total, finals > 0) for sid, tid, total, finals in res.all()}
+    summary["sections"] = len(sections)
+    section_ids = list(sections)
+
+    viewed: Dict[tuple[int, int], int] = {}
+    best: Dict[tuple[int, int], float] = {}
+    if section_ids:
+        # 2. Viewed subsections per (user, section)
+        res = await session.execute(
+            select(SubsectionProgress.user_id, Subsection.section_id, func.count(SubsectionProgress.id))
+            .join(Subsection, Subsection.id == SubsectionProgress.subsection_id)
+            .where(
+                SubsectionProgress.user_id.in_(user_ids),
+                Subsection.section_id.in_(section_ids),
+                Subsection.is_archived == False,
+                SubsectionProgress.is_viewed.is_(True),
+            )
+            .group_by(SubsectionProgress.user_id, Subsection.section_id)
+        )
+        viewed = {(uid, sid): cnt for uid, sid, cnt in res.all()}
+
+        # 3. Best section-final score per (user, section)
+        res = await session.execute(
+            select(TestAttempt.user_id, Test.section_id, func.max(TestAttempt.score))
+            .join(Test, Test.id == TestAttempt.test_id)
+            .where(
+                TestAttempt.user_id.in_(user_ids),
+                Test.section_id.in_(section_ids),
+                Test.is_archived == False,
+                Test.type == TestType.SECTION_FINAL,
+                TestAttempt.completed_at.is_not(None),
+            )
+            .group_by(TestAttempt.user_id, Test.section_id)
+        )
+        best = {(uid, sid): score for uid, sid, score in res.all()}
+
+    # 4. Upsert every (user, section) and (user, topic) row: a row inserted
+    # concurrently by _ensure_* is updated instead of aborting the transaction
+    now = datetime.now()
+    invalidate(session, *(progress_scope(user_id) for user_id in user_ids))
+    section_rows: List[Dict[str, Any]] = []
+    topic_totals: Dict[tuple[int, int], List[float]] = {}
+    for user_id in user_ids:
+        for section_id, (topic_id, total, has_final) in sections.items():
+            key = (user_id, section_id)
+            viewed_count = min(viewed.get(key, 0), total)
+            best_score = best.get(key)
+            passed = best_score is not None and best_score >= FINAL_PASS_SCORE
+            percentage = _section_percentage(viewed_count, total, has_final, passed)
+            section_rows.append({
+                "user_id": user_id,
+                "section_id": section_id,
+                "viewed_subsections": viewed_count,
+                "final_passed": passed,
+                "completion_percentage": round(percentage, 2),
+                "status": _status_for(percentage),
+                "last_accessed": now,
+            })
+            topic_totals.setdefault((user_id, topic_id), []).append(percentage)
+
+    # Same definition as _topic_percentage: every active section has a row now
+    topic_rows: List[Dict[str, Any]] = []
+    for user_id in user_ids:
+        for topic_id in topic_ids:
+            values = topic_totals.get((user_id, topic_id))
+            percentage = sum(values) / len(values) if values else 0.0
+            topic_rows.append({
+                "user_id": user_id,
+                "topic_id": topic_id,
+                "completion_percentage": round(percentage, 2),
+                "status": _status_for(percentage),
+                "last_accessed": now,
+            })
+
+    await _upsert(session, SectionProgress, section_rows, ["user_id", "section_id"])
+    await _upsert(session, TopicProgress, topic_rows, ["user_id", "topic_id"])
+    await session.commit()
+    logger.info(
+        "Bulk recomputed progress for {} users over {} topics ({} sections)",
+        len(user_ids), len(topic_ids), len(sections),
+    )
+    return summary
+
+
+# ---------------------------------------------------------------------------
+# Content changes
+# ---------------------------------------------------------------------------
+
+_STALE_KEY = "progress_stale"
+# Ссылки на задачи пересчёта, чтобы их не собрал GC до завершения
+_refresh_tasks: set[asyncio.Task] = set()
+
+
+def _attr_values(obj: Any, name: str) -> set:
+    """Current and pre-flush values of an attribute (both ends of a move)."""
+    history = sa_inspect(obj).attrs[name].history
+    return {v for v in (*history.added, *history.deleted, *history.unchanged) if v is not None}
+
+
+def _changed(obj: Any, *names: str) -> bool:
+    return any(sa_inspect(obj).attrs[name].history.has_changes() for name in names)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_stale_progress(session: Session, flush_context: Any) -> None:
+    """Remember sections / topics whose shape a flush changed.
+
+    Stored counters and percentages depend on the active subsections,
+    section-final tests and sections; adding, removing, archiving or moving
+    any of them makes the affected rows stale.
+    """
+    section_ids: set[int] = set()
+    topic_ids: set[int] = set()
+    for obj in (*session.new, *session.deleted, *session.dirty):
+        added_or_removed = obj in session.new or obj in session.deleted
+        if isinstance(obj, Subsection):
+            if added_or_removed or _changed(obj, "is_archived", "section_id"):
+                section_ids |= _attr_values(obj, "section_id")
+        elif isinstance(obj, Test):
+            if TestType.SECTION_FINAL in _attr_values(obj, "type") and (
+                added_or_removed or _changed(obj, "is_archived", "section_id", "type")
+            ):
+                section_ids |= _attr_values(obj, "section_id")
+        elif isinstance(obj, Section):
+            if added_or_removed or _changed(obj, "is_archived", "topic_id"):
+                topic_ids |= _attr_values(obj, "topic_id")
+    if section_ids or topic_ids:
+        stale = session.info.setdefault(_STALE_KEY, (set(), set()))
+        stale[0].update(section_ids)
+        stale[1].update(topic_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _schedule_refresh(session: Session) -> None:
+    stale = session.info.pop(_STALE_KEY, None)
+    if not stale:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:  # синхронная сессия вне event loop
+        return
+    task = loop.create_task(refresh_content_progress(*stale))
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_stale(session: Session) -> None:
+    session.info.pop(_STALE_KEY, None)
+
+
+async def refresh_content_progress(section_ids: Iterable[int] = (), topic_ids: Iterable[int] = ()) -> None:
+    """Recompute stored progress of every learner of the affected topics.
+
+    Runs after the content change has committed, on its own session, through
+    the set-based ``recompute_progress_bulk``.
+    """
+    section_ids, topic_ids = set(section_ids), set(topic_ids)
+    try:
+        async with SessionLocal() as session:
+            if section_ids:
+                res = await session.execute(select(Section.topic_id).where(Section.id.in_(section_ids)))
+                topic_ids.update(res.scalars())
+            if not topic_ids:
+                return
+            learners = (
+                select(TopicProgress.user_id)
+                .where(TopicProgress.topic_id.in_(topic_ids))
+                .union(
+                    select(SectionProgress.user_id)
+                    .join(Section, Section.id == SectionProgress.section_id)
+                    .where(Section.topic_id.in_(topic_ids))
+                )
+            )
+            user_ids = list((await session.execute(learners)).scalars())
+            if user_ids:
+                await recompute_progress_bulk(session, user_ids, topic_ids)
+    except Exception as exc:
+        logger.error("Progress refresh for topics {} failed: {}", sorted(topic_ids), exc)
+
+
 # ---------------------------------------------------------------------------
 # Test availability
 # ---------------------------------------------------------------------------
@@ -224,23 +697,15 @@ async def check_test_availability(session: AsyncSession, user_id: int, test_id:
         return True  # always available
 
     if test.type == TestType.SECTION_FINAL:
-        await calculate_section_progress(session, user_id, test.section_id, commit=False)
-        stmt = select(SectionProgress.completion_percentage).where(
-            SectionProgress.user_id == user_id, SectionProgress.section_id == test.section_id
-        )
-        res = await session.execute(stmt)
-        (perc,) = res.first()
+        progress = await get_section_progress_row(session, user_id, test.section_id)
+        perc = progress.completion_percentage if progress else None
         return perc is not None and perc >= 90.0
 
     if test.type == TestType.GLOBAL_FINAL:
         if test.topic_id is None:
             raise ValidationError(detail="Global-final test must be linked to a topic")
-        await calculate_topic_progress(session, user_id, test.topic_id, commit=False)
-        stmt = select(TopicProgress.completion_percentage).where(
-            TopicProgress.user_id == user_id, TopicProgress.topic_id == test.topic_id
-        )
-        res = await session.execute(stmt)
-        (perc,) = res.first()
+        progress = await get_topic_progress_row(session, user_id, test.topic_id)
+        perc = progress.completion_percentage if progress else None
         return perc is not None and perc >= 90.0
 
     return False  # fallback
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+TestWise/Backend/src/service/regrade.py
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+Background regrade of all completed attempts of a test.
+
+After a teacher fixes an answer key, ``start_regrade`` launches a job that:
+
+1. walks the test's completed attempts in id order, ``chunk_size`` rows at a
+   time (only ``id``, ``user_id``, ``answers`` and ``score`` are loaded);
+2. re-scores every chunk against the freshly compiled answer key and writes
+   the changed scores with one bulk UPDATE per chunk; if the key changes
+   while a pass is running (another edit, which ``start_regrade`` folds into
+   the running job), the pass is repeated with the new key;
+3. recomputes ``Test.completion_percentage`` with a single ``MAX(score)``;
+4. for section finals, recomputes section/topic progress of the affected
+   users through the set-based ``recompute_progress_bulk``.
+
+The job runs on its own session as an asyncio task; its state is kept in
+memory and exposed through ``get_regrade_job``. Only finished jobs are
+evicted once more than ``_MAX_JOBS`` are remembered.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.cache import invalidate, progress_scope
+from src.config.logger import configure_logger
+from src.database.db import SessionLocal
+from src.domain.models import Section, Test, TestAttempt, TestType
+from src.service.grading import AnswerKey, fingerprint_columns, get_answer_key, grade
+from src.service.progress import recompute_progress_bulk
+
+logger = configure_logger()
+
+DEFAULT_CHUNK_SIZE = 500
+_MAX_JOBS = 100
+
+
+@dataclass
+class RegradeJob:
+    id: str
+    test_id: int
+    status: str = "pending"  # pending | running | completed | failed
+    total: int = 0
+    processed: int = 0
+    changed: int = 0
+    passes: int = 0
+    completion_percentage: Optional[float] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    # Ключ изменили во время прохода — нужен ещё один
+    rerun_requested: bool = field(default=False, repr=False)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+_jobs: "OrderedDict[str, RegradeJob]" = OrderedDict()
+# Ссылки на задачи, чтобы их не собрал GC до завершения
+_tasks: set[asyncio.Task] = set()
+
+
+def get_regrade_job(job_id: str) -> Optional[RegradeJob]:
+    return _jobs.get(job_id)
+
+
+def _evict_finished() -> None:
+    """Забывает самые старые завершённые задачи сверх ``_MAX_JOBS``; идущие остаются видны."""
+    excess = len(_jobs) - _MAX_JOBS
+    if excess <= 0:
+        return
+    finished = [job_id for job_id, job in _jobs.items() if job.status in ("completed", "failed")]
+    for job_id in finished[:excess]:
+        del _jobs[job_id]
+
+
+def _active_job_for(test_id: int) -> Optional[RegradeJob]:
+    for job in _jobs.values():
+        if job.test_id == test_id and job.status in ("pending", "running"):
+            return job
+    return None
+
+
+async def _regrade_pass(
+    session: AsyncSession,
+    test_id: int,
+    key: AnswerKey,
+    chunk_size: int,
+    job: RegradeJob,
+    user_ids: set[int],
+) -> None:
+    """Один проход по завершённым попыткам теста с ключом ``key``."""
+    completed = TestAttempt.completed_at.is_not(None)
+    job.passes += 1
+    job.processed = 0
+    job.total = (
+        await session.execute(
+            select(func.count(TestAttempt.id)).where(TestAttempt.test_id == test_id, completed)
+        )
+    ).scalar_one()
+
+    last_id = 0
+    while True:
+        rows = (
+            await session.execute(
+                select(TestAttempt.id, TestAttempt.user_id, TestAttempt.answers, TestAttempt.score)
+                .where(TestAttempt.test_id == test_id, completed, TestAttempt.id > last_id)
+                .order_by(TestAttempt.id)
+                .limit(chunk_size)
+            )
+        ).all()
+        if not rows:
+            break
+
+        changes = []
+        changed_users = set()
+        for attempt_id, user_id, answers, old_score in rows:
+            user_ids.add(user_id)
+            new_score = grade(key, answers).score
+            if old_score != new_score:
+                changes.append({"id": attempt_id, "score": new_score})
+                changed_users.add(user_id)
+        if changes:
+            await session.execute(update(TestAttempt), changes)
+            # Оценки попыток видны в кэшированном дереве темы студента
+            invalidate(session, *(progress_scope(user_id) for user_id in changed_users))
+        await session.commit()
+
+        last_id = rows[-1].id
+        job.processed += len(rows)
+        job.changed += len(changes)
+        logger.debug("Regrade {}: {}/{} attempts (pass {})", job.id, job.processed, job.total, job.passes)
+
+
+async def regrade_test_attempts(
+    session: AsyncSession,
+    test_id: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    job: Optional[RegradeJob] = None,
+) -> RegradeJob:
+    """Перепроверяет все завершённые попытки теста (см. описание модуля)."""
+    job = job or RegradeJob(id=uuid.uuid4().hex, test_id=test_id)
+    job.status = "running"
+    job.started_at = job.started_at or datetime.now()
+
+    test = await session.get(Test, test_id)
+    if test is None:
+        raise ValueError(f"Test {test_id} not found")
+
+    completed = TestAttempt.completed_at.is_not(None)
+    user_ids: set[int] = set()
+    while True:
+        job.rerun_requested = False
+        key = await get_answer_key(session, test_id)
+        await _regrade_pass(session, test_id, key, chunk_size, job, user_ids)
+        # Правка вопроса во время прохода не видна скомпилированному ключу:
+        # проход повторяется, пока ключ не перестанет меняться
+        fingerprint = tuple((await session.execute(select(*fingerprint_columns(test_id)))).one())
+        if not job.rerun_requested and fingerprint == key.fingerprint:
+            break
+        logger.info("Regrade {}: answer key of test {} changed during pass {}, rerunning", job.id, test_id, job.passes)
+
+    best = (
+        await session.execute(
+            select(func.max(TestAttempt.score)).where(TestAttempt.test_id == test_id, completed)
+        )
+    ).scalar_one()
+    test.completion_percentage = best or 0.0
+    await session.commit()
+    job.completion_percentage = test.completion_percentage
+
+    # Итоговый тест раздела влияет на прогресс раздела и темы
+    if test.type == TestType.SECTION_FINAL and test.section_id is not None and user_ids:
+        topic_id = (
+            await session.execute(select(Section.topic_id).where(Section.id == test.section_id))
+        ).scalar_one_or_none()
+        if topic_id is not None:
+            await recompute_progress_bulk(session, user_ids, [topic_id])
+
+    job.status = "completed"
+    job.finished_at = datetime.now()
+    logger.info(
+        "Regrade {} of test {} finished: {} attempts, {} changed", job.id, test_id, job.processed, job.changed
+    )
+    return job
+
+
+def start_regrade(test_id: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> RegradeJob:
+    """
+    Запускает перепроверку в фоне. Если для теста она уже идёт, возвращает
+    текущую задачу и просит её сделать ещё один проход с новым ключом.
+    """
+    active = _active_job_for(test_id)
+    if active is not None:
+        active.rerun_requested = True
+        return active
+
+    job = RegradeJob(id=uuid.uuid4().hex, test_id=test_id)
+
+    async def _run() -> None:
+        try:
+            async with SessionLocal() as session:
+                await regrade_test_attempts(session, test_id, chunk_size, job)
+        except Exception as exc:
+            job.status = "failed"
+            job.error = str(exc)
+            job.finished_at = datetime.now()
+            logger.error("Regrade {} of test {} failed: {}", job.id, test_id, exc)
+        # Правка пришла уже после последней проверки ключа — её подхватит новая задача
+        if job.rerun_requested:
+            start_regrade(test_id, chunk_size)
+
+    _jobs[job.id] = job
+    _evict_finished()
+    task = asyncio.create_task(_run())
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    logger.info("Started regrade {} for test {}", job.id, test_id)
+    return job
@@ -8,41 +8,94 @@ Dynamic test generation & attempt lifecycle helpers.
 """
 from __future__ import annotations
 import random
+from collections import defaultdict
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Literal, Sequence
 
-from sqlalchemy import select
+from sqlalchemy import Row, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.cache import invalidate
 from src.config.logger import configure_logger
-from src.domain.enums import QuestionType
-from src.domain.models import Question, Section, Test, TestAttempt, TestType, Topic
-from src.repository.test import create_test, create_test_attempt, submit_test as submit_test_crud
-from src.repository.question import create_question
+from src.domain.models import Section, Test, TestAttempt, TestType, Topic
+from src.repository.base import get_item
+from src.repository.test import create_test_attempt, get_journal_answers, submit_test as submit_test_crud
+from src.repository.question import clone_questions, list_question_bank
+from src.service.autosave import restore_pending, take_pending
+from src.service.expiry import close_attempts, is_overdue
+from src.service.grading import fingerprint_columns, get_answer_key, grade
 from src.service.progress import check_test_availability
-from src.utils.exceptions import NotFoundError, ValidationError
+from src.utils.exceptions import ConflictError, NotFoundError, ValidationError
 
 logger = configure_logger()
 
+_OPEN_RETRIES = 3
 
-async def _fetch_questions_by_test_ids(
-    session: AsyncSession, test_ids: List[int], only_final: bool = False
-) -> List[Question]:
-    """Выбираем все вопросы по списку test_id."""
-    stmt = select(Question).where(Question.test_id.in_(test_ids))
-    if only_final:
-        stmt = stmt.where(Question.is_final.is_(True))
-    res = await session.execute(stmt)
-    return list(res.scalars().all())
 
+StratifyBy = Literal["test", "question_type"]
 
-async def _random_sample_questions(
-    questions: List[Question], num: int | None = None
-) -> List[Question]:
-    """Случайная выборка объектов Question."""
-    if num is None or num >= len(questions):
-        return questions
-    return random.sample(questions, num)
+
+def _sample_question_ids(
+    bank: Sequence[Row],
+    num: int | None = None,
+    stratify_by: StratifyBy | None = None,
+) -> List[int]:
+    """
+    Случайная выборка id из банка вопросов.
+
+    При ``stratify_by`` («test» — по исходному тесту, «question_type» — по типу
+    вопроса) квоты распределяются пропорционально размерам групп методом
+    наибольших остатков, внутри группы выбор случайный.
+    """
+    ids = [row.id for row in bank]
+    if num is None or num >= len(ids):
+        return ids
+    if stratify_by is None:
+        return random.sample(ids, num)
+
+    groups: Dict[Any, List[int]] = defaultdict(list)
+    key_attr = "test_id" if stratify_by == "test" else "question_type"
+    for row in bank:
+        groups[getattr(row, key_attr)].append(row.id)
+
+    total = len(ids)
+    quotas = {key: num * len(members) / total for key, members in groups.items()}
+    counts = {key: int(quota) for key, quota in quotas.items()}
+    leftover = num - sum(counts.values())
+    for key in sorted(quotas, key=lambda k: quotas[k] - counts[k], reverse=True)[:leftover]:
+        counts[key] += 1
+
+    chosen: List[int] = []
+    for key, members in groups.items():
+        chosen.extend(random.sample(members, counts[key]))
+    random.shuffle(chosen)
+    return chosen
+
+
+async def _create_test_with_questions(
+    session: AsyncSession,
+    question_ids: List[int],
+    is_final: bool,
+    **test_fields: Any,
+) -> Test:
+    """
+    Создаёт тест и копирует в него выбранные вопросы одной транзакцией:
+    INSERT теста, один INSERT … SELECT для вопросов и один commit.
+    """
+    new_test = Test(**test_fields)
+    session.add(new_test)
+    invalidate(session, Test)
+    try:
+        await session.flush()
+        await clone_questions(session, question_ids, new_test.id, is_final)
+        await session.commit()
+    except IntegrityError as exc:
+        await session.rollback()
+        logger.error("Failed to generate test: {}", exc.orig)
+        raise ConflictError(detail=str(exc.orig))
+    await session.refresh(new_test)
+    return new_test
 
 
 async def generate_hinted_test(
@@ -51,54 +104,33 @@ async def generate_hinted_test(
     num_questions: int = 10,
     duration: int | None = 15,
     title: str | None = None,
+    stratify_by: StratifyBy | None = None,
 ) -> Test:
     """
-    Создаёт новый hinted‑тест, клонируя в него ненулевые вопросы из всех статичных тестов раздела.
+    Создаёт новый hinted‑тест, клонируя в него вопросы из всех статичных тестов раздела.
 
-    - Ищем все тесты раздела (неархивированные).
-    - Собираем их вопросы с is_final=False.
-    - Случайно выбираем up to num_questions вопросов.
-    - Клонируем их под новый тест, сохраняя текст, варианты, ответ, подсказку.
+    - Берём из банка вопросов id вопросов неархивированных тестов раздела.
+    - Случайно (или стратифицированно) выбираем up to num_questions id.
+    - Копируем выбранные вопросы под новый тест, сохраняя текст, варианты, ответ, подсказку.
     """
-    section: Section | None = await session.get(Section, section_id)
-    if section is None:
-        raise NotFoundError("Section", section_id)
-
-    res = await session.execute(
-        select(Test.id).where(Test.section_id == section_id, Test.is_archived.is_(False))
-    )
-    test_ids = [row[0] for row in res.all()]
-    if not test_ids:
-        raise ValidationError(detail="В разделе нет тестов для взятия вопросов")
+    section: Section = await get_item(session, Section, section_id)
 
-    all_questions = await _fetch_questions_by_test_ids(session, test_ids, only_final=False)
-    if not all_questions:
+    bank = await list_question_bank(session, section_id=section_id)
+    if not bank:
         raise ValidationError(detail="В разделе нет подходящих вопросов")
-    chosen = await _random_sample_questions(all_questions, num_questions)
+    chosen = _sample_question_ids(bank, num_questions, stratify_by)
 
-    new_test = await create_test(
-        session=session,
+    new_test = await _create_test_with_questions(
+        session,
+        chosen,
+        is_final=False,
         title=title or f"Hinted Quiz: {section.title}",
         type=TestType.HINTED,
         duration=duration,
         section_id=section_id,
         topic_id=None,
     )
-    logger.info("Generated hinted test %s", new_test.id)
-
-    for q in chosen:
-        await create_question(
-            session=session,
-            test_id=new_test.id,
-            question=q.question,
-            question_type=q.question_type,
-            options=q.options,
-            correct_answer=q.correct_answer,
-            hint=q.hint,
-            is_final=False,
-            image=q.image,
-        )
-    await session.refresh(new_test)
+    logger.info("Generated hinted test {}", new_test.id)
     return new_test
 
 
@@ -108,46 +140,28 @@ async def generate_section_final_test(
     num_questions: int | None = None,
     duration: int | None = 20,
     title: str | None = None,
+    stratify_by: StratifyBy | None = None,
 ) -> Test:
     """
     Аналогично hinted, но используем только is_final=True вопросы.
     """
-    section = await session.get(Section, section_id)
-    if section is None:
-        raise NotFoundError("Section", section_id)
+    section = await get_item(session, Section, section_id)
 
-    res = await session.execute(
-        select(Test.id).where(Test.section_id == section_id, Test.is_archived.is_(False))
-    )
-    test_ids = [row[0] for row in res.all()]
-    all_questions = await _fetch_questions_by_test_ids(session, test_ids, only_final=True)
-    if not all_questions:
+    bank = await list_question_bank(session, section_id=section_id, is_final=True)
+    if not bank:
         raise ValidationError(detail="Нет итоговых вопросов в разделе")
+    chosen = _sample_question_ids(bank, num_questions, stratify_by)
 
-    chosen = await _random_sample_questions(all_questions, num_questions)
-
-    new_test = await create_test(
-        session=session,
+    return await _create_test_with_questions(
+        session,
+        chosen,
+        is_final=True,
         title=title or f"Final Test: {section.title}",
         type=TestType.SECTION_FINAL,
         duration=duration,
         section_id=section_id,
         topic_id=None,
     )
-    for q in chosen:
-        await create_question(
-            session=session,
-            test_id=new_test.id,
-            question=q.question,
-            question_type=q.question_type,
-            options=q.options,
-            correct_answer=q.correct_answer,
-            hint=q.hint,
-            is_final=True,
-            image=q.image,
-        )
-    await session.refresh(new_test)
-    return new_test
 
 
 async def generate_global_final_test(
@@ -156,121 +170,131 @@ async def generate_global_final_test(
     num_questions: int = 30,
     duration: int | None = 40,
     title: str | None = None,
+    stratify_by: StratifyBy | None = None,
 ) -> Test:
     """
     Итоговый тест по теме: берём вопросы is_final=True из всех разделов темы.
     """
-    topic = await session.get(Topic, topic_id)
-    if topic is None:
-        raise NotFoundError("Topic", topic_id)
+    topic = await get_item(session, Topic, topic_id)
 
-    res = await session.execute(
-        select(Section.id).where(Section.topic_id == topic_id, Section.is_archived.is_(False))
-    )
-    section_ids = [row[0] for row in res.all()]
-    res2 = await session.execute(
-        select(Test.id).where(Test.section_id.in_(section_ids), Test.is_archived.is_(False))
-    )
-    test_ids = [row[0] for row in res2.all()]
-    all_questions = await _fetch_questions_by_test_ids(session, test_ids, only_final=True)
-    if not all_questions:
+    bank = await list_question_bank(session, topic_id=topic_id, is_final=True)
+    if not bank:
         raise ValidationError(detail="Нет итоговых вопросов в теме")
+    chosen = _sample_question_ids(bank, num_questions, stratify_by)
 
-    chosen = await _random_sample_questions(all_questions, num_questions)
-
-    new_test = await create_test(
-        session=session,
+    return await _create_test_with_questions(
+        session,
+        chosen,
+        is_final=True,
         title=title or f"Global Final: {topic.title}",
         type=TestType.GLOBAL_FINAL,
         duration=duration,
         section_id=None,
         topic_id=topic_id,
     )
-    for q in chosen:
-        await create_question(
-            session=session,
-            test_id=new_test.id,
-            question=q.question,
-            question_type=q.question_type,
-            options=q.options,
-            correct_answer=q.correct_answer,
-            hint=q.hint,
-            is_final=True,
-            image=q.image,
-        )
-    await session.refresh(new_test)
-    return new_test
 
 
 # ---------------------------------------------------------------------------#
 # Attempt lifecycle                                                         #
 # ---------------------------------------------------------------------------#
 
-async def start_test(session: AsyncSession, user_id: int, test_id: int) -> TestAttempt:
+async def start_test(
+    session: AsyncSession,
+    user_id: int,
+    test_id: int,
+    idempotency_key: str | None = None,
+) -> TestAttempt:
+    """
+    Открывает попытку или возвращает уже открытую (см. ``create_test_attempt``);
+    повтор запроса с тем же ``idempotency_key`` возвращает ту же попытку.
+    """
     if not await check_test_availability(session, user_id, test_id):
         raise ValidationError(detail="Test not yet available")
-    return await create_test_attempt(session, user_id, test_id)
+    test = await get_item(session, Test, test_id)
+    return await open_attempt(session, user_id, test, idempotency_key)
+
+
+async def open_attempt(
+    session: AsyncSession,
+    user_id: int,
+    test: Test,
+    idempotency_key: str | None = None,
+) -> TestAttempt:
+    """
+    ``create_test_attempt`` с учётом срока: открытая попытка, чей срок истёк
+    (с отсрочкой сборщика), закрывается и оценивается по автосохранённым
+    ответам тем же ``close_attempts``, что и у сборщика, и выдаётся новая.
+    До конца отсрочки возвращается прежняя попытка — её ещё можно сдать.
+    """
+    for _ in range(_OPEN_RETRIES):
+        attempt = await create_test_attempt(session, user_id, test.id, idempotency_key)
+        now = datetime.now()
+        if attempt.completed_at is not None or not is_overdue(attempt.started_at, test.duration, now):
+            return attempt
+        await close_attempts(session, {attempt.id: test.duration}, now)
+    raise ConflictError(detail="Could not allocate a test attempt, please retry")
 
 
 async def submit_test(
     session: AsyncSession,
     attempt_id: int,
     answers: Dict[int, Any],
+    test_id: int | None = None,
+    idempotency_key: str | None = None,
 ) -> TestAttempt:
-    attempt = await session.get(TestAttempt, attempt_id)
-    if attempt is None:
+    """
+    Проверяет и сохраняет попытку.
+
+    Попытка, тест и «отпечаток» вопросов читаются одним запросом; ключ ответов
+    берётся из кэша (второй запрос — только при его перекомпиляции).
+    Принадлежность вопросов тесту проверяется по множеству id ключа; присланные
+    ответы накладываются на автосохранённые (см. ``service.autosave``). Запись
+    попытки, лучшего результата и прогресса — одна транзакция. Повтор
+    отправки с тем же ``idempotency_key`` возвращает сохранённую попытку.
+    """
+    row = (
+        await session.execute(
+            select(TestAttempt, Test, *fingerprint_columns(TestAttempt.test_id))
+            .join(Test, Test.id == TestAttempt.test_id)
+            .where(TestAttempt.id == attempt_id)
+        )
+    ).one_or_none()
+    if row is None:
         raise NotFoundError("TestAttempt", attempt_id)
+    attempt, test, *fingerprint = row
+    if test_id is not None and attempt.test_id != test_id:
+        raise ValidationError(detail="Попытка относится к другому тесту")
     if attempt.completed_at is not None:
+        if idempotency_key is not None and attempt.submit_idempotency_key == idempotency_key:
+            return attempt
         raise ValidationError(detail="Attempt already submitted")
 
-    test = await session.get(Test, attempt.test_id)
-    if test is None:
-        raise NotFoundError("Test", attempt.test_id)
+    key = await get_answer_key(session, test.id, tuple(fingerprint))
+    foreign = set(answers) - key.question_ids
+    if foreign:
+        raise ValidationError(detail="Не тот тест для вопроса")
 
-    res = await session.execute(
-        select(Question).where(Question.test_id == test.id)
-    )
-    questions = {q.id: q for q in res.scalars().all()}
-
-    correct = 0
-    for q_id, q in questions.items():
-        ua = answers.get(q_id)
-        if ua is None:
-            continue
-
-        if q.question_type in {QuestionType.SINGLE_CHOICE, QuestionType.OPEN_TEXT}:
-            if isinstance(ua, int) and q.options:
-                user_value = q.options[ua]
-            else:
-                user_value = ua
-            if user_value == q.correct_answer:
-                correct += 1
-        else:
-            if isinstance(ua, list):
-                if all(isinstance(x, int) for x in ua) and q.options:
-                    user_list = [q.options[i] for i in ua if 0 <= i < len(q.options)]
-                else:
-                    user_list = [str(x) for x in ua]
-            elif isinstance(ua, int) and q.options:
-                user_list = [q.options[ua]]
-            else:
-                user_list = [ua]
-
-            ca = q.correct_answer or []
-            correct_list = ca if isinstance(ca, list) else [ca]
-
-            if sorted(user_list) == sorted(correct_list):
-                correct += 1
-
-    score = (correct / len(questions) * 100) if questions else 0.0
-    spent = int((datetime.now() - attempt.started_at).total_seconds())
-
-    result = await submit_test_crud(
-        session=session,
-        attempt_id=attempt_id,
-        score=round(score, 2),
-        time_spent=spent,
-        answers=answers,
-    )
+    # Итоговые ответы: свёрнутый журнал автосохранения, затем буфер, затем присланные
+    pending = await take_pending(attempt.id)
+    try:
+        journal = (await get_journal_answers(session, [attempt.id]))[attempt.id]
+        answers = {**journal, **pending, **answers}
+
+        score = grade(key, answers).score
+        spent = int((datetime.now() - attempt.started_at).total_seconds())
+
+        result = await submit_test_crud(
+            session=session,
+            attempt=attempt,
+            test=test,
+            score=score,
+            time_spent=spent,
+            answers=answers,
+            idempotency_key=idempotency_key,
+        )
+    except Exception:
+        # Попытка не записана — буфер нужен следующей отправке или сборщику
+        await restore_pending({attempt.id: pending})
+        raise
     logger.info(f"Attempt {attempt_id} scored {score:.2f}%")
     return result
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+TestWise/Backend/src/service/user_import.py
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+Bulk user import from CSV / XLSX.
+
+The uploaded file is read row by row (Starlette has already spooled it to a
+temporary file) and processed in batches of ``USER_IMPORT_BATCH_SIZE`` rows:
+
+1. every row is validated on its own — a bad row is reported, not fatal;
+2. usernames already taken are found with one ``IN`` query per batch, before
+   any bcrypt work is spent on them;
+3. passwords of the remaining rows are hashed with
+   ``security.passwords.hash_passwords`` on the shared hashing pool;
+4. the batch is written with one ``INSERT … ON CONFLICT (username) DO
+   NOTHING RETURNING``;
+5. with ``group_id`` the batch's users are enrolled by
+   ``repository.group.add_members_bulk`` in the same transaction, which is
+   committed once per batch.
+
+Columns (header row, case-insensitive, ``,`` / ``;`` / tab separated for
+CSV): ``username``, ``full_name`` (required), ``password``, ``role``
+(default ``student``), ``is_active`` (default true). An empty password is
+replaced by a generated one, returned in the row report.
+
+XLSX needs the optional ``openpyxl`` package.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import secrets
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.logger import configure_logger
+from src.config.settings import settings
+from src.domain.enums import Role
+from src.domain.models import Group, User
+from src.repository.base import dialect_insert, get_item
+from src.repository.group import add_members_bulk
+from src.security.passwords import hash_passwords
+from src.utils.exceptions import ValidationError
+
+try:  # optional dependency, only needed for .xlsx uploads
+    import openpyxl
+except ImportError:  # pragma: no cover - depends on the environment
+    openpyxl = None
+
+logger = configure_logger()
+
+# Per-row outcomes
+CREATED = "created"
+EXISTS = "exists"
+DUPLICATE = "duplicate"
+INVALID = "invalid"
+
+REQUIRED_COLUMNS = ("username", "full_name")
+KNOWN_COLUMNS = REQUIRED_COLUMNS + ("password", "role", "is_active")
+
+_TRUE = {"1", "true", "yes", "y", "да", "+"}
+_FALSE = {"0", "false", "no", "n", "нет", "-"}
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+@dataclass
+class ImportRow:
+    row: int
+    username: Optional[str] = None
+    status: str = CREATED
+    user_id: Optional[int] = None
+    detail: Optional[str] = None
+    password: Optional[str] = None  # только сгенерированный пароль
+    group: Optional[str] = None  # итог зачисления, см. repository.group
+    values: Dict[str, Any] = field(default_factory=dict, repr=False)
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+def _normalize_header(header: List[Any]) -> List[str]:
+    columns = [str(name or "").strip().lower() for name in header]
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise ValidationError(detail=f"Missing columns: {', '.join(missing)}")
+    return columns
+
+
+def _csv_records(raw: BinaryIO) -> Iterator[Dict[str, Any]]:
+    text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+    first = text.readline()
+    if not first.strip():
+        return
+    # Excel в русской локали сохраняет CSV через «;»
+    delimiter = max(",;\t", key=first.count)
+    header = _normalize_header(next(csv.reader([first], delimiter=delimiter)))
+    for values in csv.reader(text, delimiter=delimiter):
+        if not any(v.strip() for v in values):
+            yield {}
+            continue
+        yield dict(zip(header, values))
+
+
+def _xlsx_records(raw: BinaryIO) -> Iterator[Dict[str, Any]]:
+    if openpyxl is None:
+        raise ValidationError(detail="Для импорта XLSX установите пакет openpyxl")
+    workbook = openpyxl.load_workbook(raw, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        first = next(rows, None)
+        if first is None:
+            return
+        header = _normalize_header(list(first))
+        for values in rows:
+            if all(v is None or str(v).strip() == "" for v in values):
+                yield {}
+                continue
+            yield dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def read_records(raw: BinaryIO, filename: str | None, content_type: str | None) -> Iterator[Dict[str, Any]]:
+    """Строки файла в виде словарей «колонка → значение» (пустые строки — ``{}``)."""
+    if (filename or "").lower().endswith(".xlsx") or content_type == XLSX_CONTENT_TYPE:
+        return _xlsx_records(raw)
+    return _csv_records(raw)
+
+
+# ---------------------------------------------------------------------------
+# Validation
+# ---------------------------------------------------------------------------
+
+def _text(value: Any) -> str:
+    return "" if value is None else str(value).strip()
+
+
+def _parse_row(number: int, record: Dict[str, Any]) -> ImportRow:
+    row = ImportRow(row=number, username=_text(record.get("username")) or None)
+    problems = []
+    if not row.username:
+        problems.append("username is required")
+    full_name = _text(record.get("full_name"))
+    if not full_name:
+        problems.append("full_name is required")
+
+    role_value = _text(record.get("role")).lower() or Role.STUDENT.value
+    try:
+        role = Role(role_value)
+    except ValueError:
+        problems.append(f"unknown role '{role_value}'")
+        role = None
+
+    active_value = record.get("is_active")
+    if isinstance(active_value, bool):
+        is_active = active_value
+    else:
+        active_text = _text(active_value).lower()
+        is_active = True if not active_text else active_text in _TRUE
+        if active_text and active_text not in _TRUE | _FALSE:
+            problems.append(f"is_active must be true/false, got '{active_text}'")
+
+    if problems:
+        row.status, row.detail = INVALID, "; ".join(problems)
+        return row
+
+    password = _text(record.get("password"))
+    if not password:
+        password = row.password = secrets.token_hex(8)
+    row.values = {
+        "username": row.username,
+        "full_name": full_name,
+        "password": password,
+        "role": role,
+        "is_active": is_active,
+    }
+    return row
+
+
+# ---------------------------------------------------------------------------
+# Import
+# ---------------------------------------------------------------------------
+
+async def _import_batch(session: AsyncSession, batch: List[ImportRow], group_id: int | None) -> None:
+    pending = [row for row in batch if row.status == CREATED]
+    if not pending:
+        return
+
+    existing = dict(
+        (
+            await session.execute(
+                select(User.username, User.id).where(User.username.in_([row.username for row in pending]))
+            )
+        ).all()
+    )
+    for row in pending:
+        if row.username in existing:
+            row.status, row.user_id, row.password = EXISTS, existing[row.username], None
+    pending = [row for row in pending if row.status == CREATED]
+
+    if pending:
+        hashed = await hash_passwords([row.values["password"] for row in pending])
+        now = datetime.now()
+        values = [
+            {**row.values, "password": password, "created_at": now, "is_archived": False}
+            for row, password in zip(pending, hashed)
+        ]
+        inserted = dict(
+            (
+                await session.execute(
+                    dialect_insert(session, User)
+                    .values(values)
+                    .on_conflict_do_nothing(index_elements=[User.username])
+                    .returning(User.username, User.id)
+                )
+            ).all()
+        )
+        for row in pending:
+            if row.username in inserted:
+                row.user_id = inserted[row.username]
+            else:
+                # Логин заняли параллельно — между проверкой и вставкой
+                row.status, row.password = EXISTS, None
+
+    if group_id is not None:
+        members = [row for row in batch if row.user_id is not None]
+        outcomes = await add_members_bulk(session, group_id, [row.user_id for row in members])
+        for row in members:
+            row.group = outcomes[row.user_id]
+    # add_members_bulk не фиксирует, если зачислять некого (например, одни
+    # преподаватели) — вставка пользователей фиксируется здесь в любом случае
+    await session.commit()
+
+
+async def import_users(
+    session: AsyncSession,
+    records: Iterator[Dict[str, Any]],
+    group_id: int | None = None,
+    batch_size: int | None = None,
+) -> List[ImportRow]:
+    """
+    Импортирует пользователей пачками и возвращает отчёт по каждой строке
+    (номер строки — как в таблице, заголовок — строка 1).
+    """
+    batch_size = batch_size or settings.user_import_batch_size
+    if group_id is not None:
+        await get_item(session, Group, group_id)
+
+    report: List[ImportRow] = []
+    batch: List[ImportRow] = []
+    seen: set[str] = set()
+    for number, record in enumerate(records, start=2):
+        if not record:
+            continue
+        row = _parse_row(number, record)
+        if row.status == CREATED:
+            if row.username in seen:
+                row.status, row.password, row.detail = DUPLICATE, None, "username repeated in the file"
+            seen.add(row.username)
+        report.append(row)
+        batch.append(row)
+        if len(batch) >= batch_size:
+            await _import_batch(session, batch, group_id)
+            batch = []
+    if batch:
+        await _import_batch(session, batch, group_id)
+
+    created = sum(1 for row in report if row.status == CREATED)
+    logger.info(
+        "User import: {} rows, {} created, {} skipped{}",
+        len(report), created, len(report) - created, f", group {group_id}" if group_id is not None else "",
+    )
+    return report
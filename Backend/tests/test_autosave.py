@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Buffered autosave deltas must survive a submit or sweep that fails to commit.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.config.settings import settings
+from src.domain import enums, models
+from src.repository.question import create_question
+from src.repository.test import create_test, create_test_attempt
+from src.repository.topic import create_section, create_topic
+from src.service import autosave, expiry
+from src.service import tests as test_service
+
+
+@pytest.fixture
+async def buffered_attempt(session, student, teacher, monkeypatch):
+    """An open attempt whose only (correct) answer sits in the autosave buffer."""
+    monkeypatch.setattr(settings, "autosave_write_through", False)
+    topic = await create_topic(session, "Topic", creator_id=teacher.id)
+    section = await create_section(session, topic.id, "Section")
+    test = await create_test(session, "Final", enums.TestType.SECTION_FINAL, section_id=section.id, duration=1)
+    question = await create_question(
+        session, test.id, "Pick b", enums.QuestionType.SINGLE_CHOICE, options=["a", "b"], correct_answer="b"
+    )
+    attempt = await create_test_attempt(session, student.id, test.id)
+    assert await autosave.save_answers(session, student.id, attempt.id, {question.id: "b"}) == 1
+    yield attempt, question
+    autosave._pending.clear()
+
+
+def _fail(*args, **kwargs):
+    raise RuntimeError("database went away")
+
+
+async def test_failed_submit_keeps_buffered_answers(session, buffered_attempt, monkeypatch):
+    attempt_id, question_id = (obj.id for obj in buffered_attempt)
+    with monkeypatch.context() as patch:
+        patch.setattr(test_service, "submit_test_crud", _fail)
+        with pytest.raises(RuntimeError):
+            await test_service.submit_test(session, attempt_id, {})
+    await session.rollback()
+
+    assert await autosave.get_saved_answers(session, attempt_id) == {question_id: "b"}
+    submitted = await test_service.submit_test(session, attempt_id, {})
+    assert submitted.score == 100.0
+    assert autosave._pending == {}
+
+
+async def test_failed_sweep_keeps_buffered_answers(session, buffered_attempt, monkeypatch):
+    attempt_id, question_id = (obj.id for obj in buffered_attempt)
+    now = datetime.now() + timedelta(minutes=10)
+    with monkeypatch.context() as patch:
+        patch.setattr(expiry, "apply_attempt_submitted", _fail)
+        with pytest.raises(RuntimeError):
+            await expiry.close_attempts(session, {attempt_id: 1}, now)
+    await session.rollback()
+
+    assert await autosave.get_saved_answers(session, attempt_id) == {question_id: "b"}
+    assert await expiry.close_attempts(session, {attempt_id: 1}, now) == 1
+    session.expunge_all()
+    assert (await session.get(models.TestAttempt, attempt_id)).score == 100.0
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Smoke tests of the dialect-specific database code: ``ON CONFLICT`` inserts and
+upserts, JSON/JSONB columns and date arithmetic in SQL. They run on SQLite by
+default and on asyncpg with ``TEST_DATABASE_URL`` (see ``conftest.py``).
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select, text, update
+
+from src.domain import enums, models
+from src.domain.enums import QuestionType, Role
+from src.repository.group import ADDED, UNCHANGED, add_members_bulk, create_group
+from src.repository.question import create_question
+from src.repository.test import create_test, create_test_attempt
+from src.repository.topic import create_section, create_subsection, create_topic
+from src.repository.user import create_user
+from src.service.expiry import sweep_expired_attempts
+from src.service.progress import _ensure_section_progress, recompute_progress_bulk
+
+
+@pytest.fixture
+async def section(session, teacher):
+    topic = await create_topic(session, "Topic", creator_id=teacher.id)
+    return await create_section(session, topic.id, "Section")
+
+
+async def test_insert_on_conflict_do_nothing(session, student, section):
+    first = await _ensure_section_progress(session, student.id, section.id)
+    second = await _ensure_section_progress(session, student.id, section.id)
+    await session.commit()
+
+    assert first.id == second.id
+    count = await session.scalar(
+        select(func.count()).select_from(models.SectionProgress).where(models.SectionProgress.user_id == student.id)
+    )
+    assert count == 1
+
+
+async def test_bulk_upsert_updates_existing_rows(session, student, section):
+    subsection = await create_subsection(session, section.id, "Subsection")
+    await recompute_progress_bulk(session, [student.id], [section.topic_id])
+    session.add(models.SubsectionProgress(user_id=student.id, subsection_id=subsection.id, is_viewed=True))
+    await session.commit()
+    await recompute_progress_bulk(session, [student.id], [section.topic_id])
+
+    rows = (
+        await session.execute(
+            select(models.SectionProgress.viewed_subsections).where(models.SectionProgress.user_id == student.id)
+        )
+    ).scalars().all()
+    assert rows == [1]
+
+
+async def test_attempt_insert_returns_open_attempt(session, student, section):
+    test = await create_test(session, "Final", enums.TestType.SECTION_FINAL, section_id=section.id)
+    first = await create_test_attempt(session, student.id, test.id)
+    second = await create_test_attempt(session, student.id, test.id)
+
+    assert first.id == second.id
+    assert first.attempt_number == 1
+
+
+async def test_group_bulk_insert_skips_existing_links(session, student):
+    group = await create_group(session, "G-1", 2024, 2028)
+    other = await create_user(session, "other", "Other", "pw", Role.STUDENT)
+
+    assert await add_members_bulk(session, group.id, [student.id]) == {student.id: ADDED}
+    assert await add_members_bulk(session, group.id, [student.id, other.id]) == {
+        student.id: UNCHANGED,
+        other.id: ADDED,
+    }
+
+
+async def test_json_columns_round_trip(session, student, section):
+    test = await create_test(session, "Final", enums.TestType.SECTION_FINAL, section_id=section.id)
+    question = await create_question(
+        session,
+        test.id,
+        "2 + 2?",
+        QuestionType.MULTIPLE_CHOICE,
+        options=["3", "4", "четыре"],
+        correct_answer=["4", "четыре"],
+    )
+    attempt = await create_test_attempt(session, student.id, test.id)
+    await session.execute(
+        update(models.TestAttempt)
+        .where(models.TestAttempt.id == attempt.id)
+        .values(answers={str(question.id): ["4"], "meta": {"flagged": True, "n": 1.5}})
+    )
+    await session.commit()
+    session.expunge_all()
+
+    question = await session.get(models.Question, question.id)
+    attempt = await session.get(models.TestAttempt, attempt.id)
+    assert question.options == ["3", "4", "четыре"]
+    assert question.correct_answer == ["4", "четыре"]
+    assert attempt.answers == {str(question.id): ["4"], "meta": {"flagged": True, "n": 1.5}}
+
+
+@pytest.mark.postgres
+async def test_json_columns_are_jsonb(session):
+    rows = await session.execute(
+        text(
+            "SELECT table_name, column_name, data_type FROM information_schema.columns "
+            "WHERE (table_name, column_name) IN "
+            "(('questions', 'options'), ('questions', 'correct_answer'), ('test_attempts', 'answers'))"
+        )
+    )
+    types = {(table, column): data_type for table, column, data_type in rows}
+    assert len(types) == 3
+    assert set(types.values()) == {"jsonb"}
+
+
+async def test_sweeper_deadline_is_checked_in_sql(session, student, section):
+    test = await create_test(session, "Timed", enums.TestType.SECTION_FINAL, section_id=section.id, duration=3)
+    attempt = await create_test_attempt(session, student.id, test.id)
+    now = datetime.now()
+    await session.execute(
+        update(models.TestAttempt)
+        .where(models.TestAttempt.id == attempt.id)
+        .values(started_at=now - timedelta(minutes=5))
+    )
+    await session.commit()
+
+    assert await sweep_expired_attempts(session, now=now - timedelta(minutes=2, seconds=30), grace_seconds=0) == 0
+    assert await sweep_expired_attempts(session, now=now, grace_seconds=0) == 1
+    session.expunge_all()
+    assert (await session.get(models.TestAttempt, attempt.id)).completed_at is not None
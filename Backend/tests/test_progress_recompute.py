@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+Scope checks of the bulk progress recompute (``POST /api/v1/progress/recompute``).
+"""
+
+import pytest
+from sqlalchemy import func, select
+
+from src.api.v1.progress.routes import recompute_progress
+from src.api.v1.progress.schemas import ProgressRecomputeRequest
+from src.domain.models import SectionProgress, TopicProgress
+from src.repository.topic import create_section, create_subsection, create_topic, mark_subsection_viewed
+from src.utils.exceptions import NotFoundError
+
+
+async def _progress_rows(session, model, user_id: int) -> int:
+    return await session.scalar(select(func.count()).select_from(model).where(model.user_id == user_id))
+
+
+async def test_unknown_user_ids_are_rejected(session, student, teacher):
+    topic = await create_topic(session, "Topic", creator_id=teacher.id)
+    await create_section(session, topic.id, "Section")
+
+    with pytest.raises(NotFoundError):
+        await recompute_progress(ProgressRecomputeRequest(user_ids=[student.id, 999_999]), session)
+
+    assert await _progress_rows(session, TopicProgress, student.id) == 0
+    assert await _progress_rows(session, SectionProgress, student.id) == 0
+
+
+async def test_user_ids_only_recompute_opened_topics(session, student, teacher):
+    opened = await create_topic(session, "Opened", creator_id=teacher.id)
+    section = await create_section(session, opened.id, "Section")
+    subsection = await create_subsection(session, section.id, "Intro")
+    untouched = await create_topic(session, "Untouched", creator_id=teacher.id)
+    await create_section(session, untouched.id, "Section")
+    await mark_subsection_viewed(session, student.id, subsection.id)
+
+    result = await recompute_progress(ProgressRecomputeRequest(user_ids=[student.id]), session)
+
+    assert result.topics == 1
+    assert [row.topic_id for row in result.topic_progress] == [opened.id]
+    assert await _progress_rows(session, TopicProgress, student.id) == 1
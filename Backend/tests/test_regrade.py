@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+Job bookkeeping of the background regrade.
+"""
+
+import asyncio
+
+import pytest
+
+from src.service import regrade
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    monkeypatch.setattr(regrade, "_jobs", regrade.OrderedDict())
+    return regrade._jobs
+
+
+async def test_running_jobs_are_not_evicted(jobs):
+    running = regrade.RegradeJob(id="running", test_id=1, status="running")
+    jobs[running.id] = running
+    for n in range(regrade._MAX_JOBS):
+        jobs[f"done-{n}"] = regrade.RegradeJob(id=f"done-{n}", test_id=100 + n, status="completed")
+
+    job = regrade.start_regrade(999_999)
+    await asyncio.gather(*regrade._tasks)
+
+    assert len(jobs) == regrade._MAX_JOBS
+    assert regrade.get_regrade_job("running") is running
+    assert regrade.get_regrade_job(job.id) is job
+    assert regrade.get_regrade_job("done-0") is None
+    assert regrade.get_regrade_job("done-1") is None
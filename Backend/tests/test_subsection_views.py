@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Concurrent first views of a subsection must be counted once.
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from src.database.db import SessionLocal
+from src.domain.models import SectionProgress, SubsectionProgress
+from src.repository.topic import create_section, create_subsection, create_topic, mark_subsection_viewed
+from src.service.progress import _ensure_subsection_progress
+
+
+async def _view_concurrently(user_id: int, subsection_id: int) -> list[SubsectionProgress]:
+    async def view() -> SubsectionProgress:
+        async with SessionLocal() as session:
+            return await mark_subsection_viewed(session, user_id, subsection_id)
+
+    return await asyncio.gather(view(), view())
+
+
+@pytest.mark.parametrize("existing_row", [False, True], ids=["first-view", "not-viewed-row"])
+async def test_concurrent_views_count_once(session, student, teacher, existing_row):
+    topic = await create_topic(session, "Topic", creator_id=teacher.id)
+    section = await create_section(session, topic.id, "Section")
+    subsection = await create_subsection(session, section.id, "Intro")
+    await create_subsection(session, section.id, "Details", order=1)
+    if existing_row:
+        await _ensure_subsection_progress(session, student.id, subsection.id)
+        await session.commit()
+
+    views = await _view_concurrently(student.id, subsection.id)
+
+    assert all(progress.is_viewed for progress in views)
+    assert views[0].id == views[1].id
+    rows = await session.scalar(
+        select(func.count()).select_from(SubsectionProgress).where(SubsectionProgress.user_id == student.id)
+    )
+    assert rows == 1
+    section_progress = (
+        await session.execute(
+            select(SectionProgress).where(
+                SectionProgress.user_id == student.id, SectionProgress.section_id == section.id
+            )
+        )
+    ).scalar_one()
+    assert section_progress.viewed_subsections == 1
+    assert section_progress.completion_percentage == 50.0